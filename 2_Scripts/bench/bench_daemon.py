@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Decision daemon latency benchmark
+Measures end-to-end PreToolUse latency of a hook in three setups:
+  cold   - a fresh interpreter evaluates in-process (today's default path)
+  client - a fresh interpreter forwards stdin to a running daemon (--serve)
+  socket - the bare daemon round trip, without interpreter start-up
+each with a new command per run (decision cache misses) and with one
+repeated command (hits), and checks that concurrent clients all get the
+in-process decision. --build release runs the bytecode build of
+build_hooks.py instead of the rendered source, --policy grows the policy
+like bench_suite.py.
+Run with: python3 2_Scripts/bench/bench_daemon.py [--runs 50] [--build release] [--policy 10k]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import shutil
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import build_hooks  # noqa: E402
+from bench_suite import DEFAULT_POLICIES, build_policy  # noqa: E402
+from hook_loader import load_hook, make_claude_dir  # noqa: E402
+
+COMMAND = "git status && npm run build 2>&1 | tail -20"
+
+
+def payload(command=COMMAND):
+    return json.dumps({
+        "hook_event_name": "PreToolUse",
+        "tool_name": "Bash",
+        "permission_mode": "default",
+        "cwd": "/tmp/project",
+        "tool_input": {"command": command},
+    }).encode("utf-8")
+
+
+PAYLOAD = payload()
+
+
+def summarize(samples):
+    """Return mean/p50/p95 in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+def time_spawn(script_path, runs, miss=False):
+    """
+    Time full hook invocations in fresh interpreters
+    miss: a different command per run, so the decision cache never answers
+    """
+    samples = []
+    output = None
+    for i in range(runs):
+        data = payload(f"{COMMAND} && ls ./run{time.perf_counter_ns()}-{i}") if miss else PAYLOAD
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, script_path], input=data, capture_output=True)
+        samples.append(time.perf_counter() - start)
+        if not miss:
+            output = result.stdout
+    return samples, output
+
+
+def make_hook(build, policy):
+    """Hook script in a scratch .claude directory: the rendered source or the release build"""
+    script_path = make_claude_dir(build_policy(policy))
+    if build == "release":
+        out_dir = tempfile.mkdtemp(prefix="cc-hook-build-")
+        launcher = build_hooks.build(out_dir, ["en_US"])[1]["launcher"]
+        hooks_dir = os.path.dirname(script_path)
+        shutil.rmtree(hooks_dir)
+        shutil.copytree(os.path.dirname(launcher), hooks_dir)
+    return script_path
+
+
+def wait_for_socket(path, timeout=10.0):
+    """Wait until the daemon socket appears"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if os.path.exists(path):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the decision daemon against cold spawns")
+    parser.add_argument("--runs", type=int, default=50, help="invocations per setup")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients in the concurrency check")
+    parser.add_argument("--build", choices=["source", "release"], default="source",
+                        help="rendered template source, or the precompiled release build")
+    parser.add_argument("--policy", choices=DEFAULT_POLICIES, default="template", help="policy to load")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    script_path = make_hook(args.build, args.policy)
+    hook = load_hook(script_path=script_path)
+    socket_path = hook.daemon_socket_path()
+    if socket_path is None:
+        print("Unix domain sockets are not available on this platform")
+        sys.exit(1)
+
+    # Warm the compiled policy sidecar so both paths start from the same state
+    subprocess.run([sys.executable, script_path], input=PAYLOAD, capture_output=True)
+
+    cold_samples, cold_output = time_spawn(script_path, args.runs)
+    cold_miss_samples, _ = time_spawn(script_path, args.runs, miss=True)
+
+    daemon = subprocess.Popen([sys.executable, script_path, "--serve", "120"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_socket(socket_path):
+            print("Daemon did not start")
+            sys.exit(1)
+
+        client_samples, client_output = time_spawn(script_path, args.runs)
+        client_miss_samples, _ = time_spawn(script_path, args.runs, miss=True)
+
+        socket_samples = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            socket_output = hook.query_daemon(PAYLOAD, socket_path)
+            socket_samples.append(time.perf_counter() - start)
+
+        # Concurrency check: every client must get the in-process answer
+        replies = []
+        lock = threading.Lock()
+
+        def client_worker():
+            for _ in range(args.runs):
+                reply = hook.query_daemon(PAYLOAD, socket_path)
+                with lock:
+                    replies.append(reply)
+
+        threads = [threading.Thread(target=client_worker) for _ in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        concurrent_elapsed = time.perf_counter() - start
+    finally:
+        daemon.terminate()
+        daemon.wait(timeout=10)
+
+    consistent = (cold_output == client_output == socket_output
+                  and all(reply == cold_output for reply in replies))
+
+    results = {
+        "benchmark": "daemon",
+        "build": args.build,
+        "policy": args.policy,
+        "cold": summarize(cold_samples),
+        "cold-miss": summarize(cold_miss_samples),
+        "client": summarize(client_samples),
+        "client-miss": summarize(client_miss_samples),
+        "socket": summarize(socket_samples),
+        "concurrent": {
+            "clients": args.clients,
+            "requests": len(replies),
+            "requests_per_second": len(replies) / concurrent_elapsed,
+        },
+        "consistent": consistent,
+    }
+
+    print(f"{args.build} build, {args.policy} policy")
+    print(f"{'setup':<14}{'mean (ms)':>12}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    for name in ("cold", "cold-miss", "client", "client-miss", "socket"):
+        row = results[name]
+        print(f"{name:<14}{row['mean_ms']:>12.2f}{row['p50_ms']:>12.2f}{row['p95_ms']:>12.2f}")
+    print(f"\n{args.clients} concurrent clients: {results['concurrent']['requests_per_second']:.0f} requests/s")
+    print(f"Decisions consistent across setups: {consistent}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if not consistent:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
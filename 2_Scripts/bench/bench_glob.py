@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Glob engine benchmark
+Compares the hook's match_glob (segment matcher, no backtracking) with the
+previous regex translation (* -> .*) on long commands such as heredocs and
+long sed scripts.
+Run with: python3 2_Scripts/bench/bench_glob.py [--json results.json]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook  # noqa: E402
+
+
+def regex_match_glob(text, pattern):
+    """Previous match_glob implementation (backtracking regex)"""
+    regex_pattern = re.escape(pattern)
+    regex_pattern = regex_pattern.replace(r'\*', '.*').replace(r'\?', '.')
+    return bool(re.match(f"^{regex_pattern}$", text, re.DOTALL))
+
+
+def repeat_to(chunk, size):
+    """Repeat chunk until the text is size characters long"""
+    return (chunk * (size // len(chunk) + 1))[:size]
+
+
+# (name, pattern, text builder)
+CASES = [
+    ("near-miss find/-delete", "* find * -delete*",
+     lambda size: repeat_to(" find x", size)),
+    ("heredoc rm", "* rm *",
+     lambda size: "cat <<'EOF' > notes.txt\n" + repeat_to("remove the old files by hand\n", size) + "EOF"),
+    ("long sed script", "sed -i*",
+     lambda size: "sed -n '" + repeat_to("s/foo/bar/g;", size) + "' file.txt"),
+    ("three wildcards", "* git * push * --force*",
+     lambda size: repeat_to(" git x push y", size)),
+]
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def time_call(func, text, pattern, repeat):
+    """Return (best seconds per call, result)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text, pattern)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark match_glob against the regex implementation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="command lengths in characters")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is reported)")
+    parser.add_argument("--regex-budget", type=float, default=10.0,
+                        help="skip regex runs estimated to take longer than this many seconds")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    hook = load_hook()
+    results = []
+
+    print(f"{'case':<26}{'size':>9}{'glob (ms)':>12}{'regex (ms)':>13}")
+    for name, pattern, build in CASES:
+        # Backtracking cost grows roughly like size ** (wildcards - 1)
+        exponent = max(1, pattern.count("*") - 1)
+        previous = None
+        for size in args.sizes:
+            text = build(size)
+            glob_time, glob_result = time_call(hook.match_glob, text, pattern, args.repeat)
+
+            regex_time = None
+            estimate = 0.0
+            if previous is not None:
+                estimate = previous[1] * (size / previous[0]) ** exponent
+            if estimate <= args.regex_budget:
+                regex_time, regex_result = time_call(regex_match_glob, text, pattern, 1)
+                if regex_result != glob_result:
+                    print(f"Result mismatch: {name} size={size}")
+                    sys.exit(1)
+                previous = (size, regex_time)
+
+            regex_text = f"{regex_time * 1000:>13.3f}" if regex_time is not None else f"{f'>{estimate:.0f}s est.':>13}"
+            print(f"{name:<26}{size:>9}{glob_time * 1000:>12.3f}{regex_text}")
+            results.append({
+                "case": name,
+                "pattern": pattern,
+                "size": size,
+                "glob_seconds": glob_time,
+                "regex_seconds": regex_time,
+                "regex_estimated_seconds": None if regex_time is not None else estimate,
+                "matched": glob_result,
+            })
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "glob", "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
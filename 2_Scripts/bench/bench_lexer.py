@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shell lexer benchmark
+Compares the hook's single-pass lex_command with the previous pipeline
+(split_command character copy + seven re.findall passes per sub-command in
+extract_paths_from_command) on long multi-stage commands.
+Run with: python3 2_Scripts/bench/bench_lexer.py [--json results.json]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook  # noqa: E402
+
+
+def previous_split_command(command):
+    """Previous split_command implementation (&&, ||, ; only)"""
+    sub_commands = []
+    current_cmd = []
+    in_single_quote = False
+    in_double_quote = False
+    i = 0
+
+    while i < len(command):
+        char = command[i]
+        if char == '\\' and i + 1 < len(command):
+            current_cmd.append(char)
+            current_cmd.append(command[i + 1])
+            i += 2
+            continue
+        if char == '"' and not in_single_quote:
+            in_double_quote = not in_double_quote
+            current_cmd.append(char)
+            i += 1
+            continue
+        if char == "'" and not in_double_quote:
+            in_single_quote = not in_single_quote
+            current_cmd.append(char)
+            i += 1
+            continue
+        if in_single_quote or in_double_quote:
+            current_cmd.append(char)
+            i += 1
+            continue
+        if i + 1 < len(command) and command[i:i+2] in ['&&', '||']:
+            cmd = ''.join(current_cmd).strip()
+            if cmd:
+                sub_commands.append(cmd)
+            current_cmd = []
+            i += 2
+            continue
+        if char == ';':
+            cmd = ''.join(current_cmd).strip()
+            if cmd:
+                sub_commands.append(cmd)
+            current_cmd = []
+            i += 1
+            continue
+        current_cmd.append(char)
+        i += 1
+
+    cmd = ''.join(current_cmd).strip()
+    if cmd:
+        sub_commands.append(cmd)
+    return sub_commands if sub_commands else [command]
+
+
+def previous_extract_paths(command):
+    """Previous extract_paths_from_command implementation (regex scans)"""
+    args = re.sub(r'^[^\s]+\s+', '', command)
+    path_patterns = [
+        r'[A-Za-z]:[/\\][^\s]*',
+        r'\\\\[^\s]+\\[^\s]*',
+        r'//[^\s]+/[^\s]*',
+        r'/[^\s]*',
+        r'~[^\s]*',
+        r'\./[^\s]*',
+        r'\.\./[^\s]*'
+    ]
+    paths = []
+    for pattern in path_patterns:
+        paths.extend(re.findall(pattern, args))
+    return paths
+
+
+def previous_pipeline(command):
+    """Sub-commands and their paths, the way the hook used to compute them"""
+    return [(sub, previous_extract_paths(sub)) for sub in previous_split_command(command)]
+
+
+def lexer_pipeline(hook):
+    def run(command):
+        return [(cmd.text, cmd.paths) for cmd in hook.lex_command(command)]
+    return run
+
+
+# (name, one stage, joiner)
+CASES = [
+    ("&& chain", "cd ./src/pkg && ls -la ../lib /tmp/out", " && "),
+    ("pipeline", "grep -rn 'TODO' ./src | sort -k2 | uniq -c", " | "),
+    ("substitutions", "echo \"$(git rev-parse HEAD)\" $(date +%s) > ./build/stamp.txt", "; "),
+    ("heredoc", "cat <<'EOF' > ./notes.md\n# heading; not | a && command\nEOF\n", ""),
+]
+
+DEFAULT_STAGES = [10, 100, 1000]
+
+
+def time_call(func, command, repeat):
+    """Return (best seconds per call, result)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(command)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lex_command against split_command + regex path extraction")
+    parser.add_argument("--stages", type=int, nargs="+", default=DEFAULT_STAGES, help="sub-commands per command line")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best is reported)")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    hook = load_hook()
+    lexer = lexer_pipeline(hook)
+    results = []
+
+    print(f"{'case':<16}{'stages':>8}{'chars':>10}{'lexer (ms)':>12}{'previous (ms)':>15}{'commands':>10}")
+    for name, stage, joiner in CASES:
+        for stages in args.stages:
+            command = joiner.join([stage] * stages)
+            lexer_time, lexed = time_call(lexer, command, args.repeat)
+            previous_time, previous = time_call(previous_pipeline, command, args.repeat)
+            print(f"{name:<16}{stages:>8}{len(command):>10}{lexer_time * 1000:>12.3f}"
+                  f"{previous_time * 1000:>15.3f}{len(lexed):>10}")
+            results.append({
+                "case": name,
+                "stages": stages,
+                "length": len(command),
+                "lexer_seconds": lexer_time,
+                "previous_seconds": previous_time,
+                "lexer_commands": len(lexed),
+                "previous_commands": len(previous),
+            })
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "lexer", "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
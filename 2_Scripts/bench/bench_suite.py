@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hook benchmark suite
+Microbenchmarks for the hot helpers (match_glob, split_command,
+extract_paths_from_command, check_in_list, is_path_outside_workspace) and
+end-to-end timings of rendered hook subprocesses (PreToolUse, Stop,
+PermissionRequest), each against the shipped permissions.json template and
+synthetic policies scaled to 1k, 10k and 100k patterns.
+split_command and extract_paths_from_command do not read the policy, so they
+are measured once rather than per policy.
+Run with: python3 2_Scripts/bench/bench_suite.py [--policies template 1k] [--json results.json]
+Compare two runs with: python3 2_Scripts/bench/bench_suite.py --compare old.json new.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template, make_claude_dir  # noqa: E402
+
+WORK_DIR = "/tmp/project"
+
+# Commands a Claude Code session typically runs
+COMMANDS = [
+    "git status",
+    "git status && git diff && git log --oneline | head -5",
+    "ls -la ./src && cat package.json | head -5",
+    "npm run build 2>&1 | tail -20",
+    "pnpm typecheck",
+    "cd /tmp && pwd && ls -la | head -5",
+    "echo \"test content\" > /tmp/test-echo.txt && cat /tmp/test-echo.txt",
+    "grep -rn \"TODO\" ./src --include=*.ts | wc -l",
+    "find . -name '*.pyc' -delete",
+    "rm -rf ./build ../dist",
+    "python3 -m pytest -q tests/ && echo done",
+    "curl -s https://example.com/api | jq '.items[] | .name'",
+    "sed -i 's/foo/bar/g' ./src/main.py && git add -A && git commit -m \"rename\"",
+    "docker compose up -d && docker ps",
+    "cat <<'EOF' > notes.txt\nremove the old files by hand\nEOF",
+]
+
+PATHS = [
+    "./src/main.py",
+    "src/components/App.tsx",
+    "../sibling/README.md",
+    "/tmp/project/build/out.js",
+    "/etc/hosts",
+    "~/.ssh/config",
+    "/tmp/project/../other/secret.txt",
+    "node_modules/.bin/tsc",
+]
+
+# Synthetic pattern shapes, filled with a tool name and a number
+PATTERN_SHAPES = [
+    "{tool} *",
+    "{tool} {n}*",
+    "* {tool} *",
+    "{tool} sub{n} --flag*",
+    "{tool}",
+    "{tool} * --out *",
+]
+SCALED_CATEGORIES = ["read", "edit", "risky", "globalAllow", "globalDeny"]
+
+POLICY_SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+DEFAULT_POLICIES = ["template", "1k", "10k", "100k"]
+EVENTS = ["PreToolUse", "PreToolUse-cached", "Stop", "PermissionRequest"]
+
+
+def policy_patterns(permissions):
+    """All command and tool patterns of a policy"""
+    return [pattern for category in permissions["categories"].values()
+            for list_type in ("tools", "commands") for pattern in category.get(list_type, [])]
+
+
+def build_policy(name, notifications=False):
+    """
+    The shipped template, or the template grown to a total pattern count
+    Synthetic command patterns are spread over the categories; additionalRoots
+    grows with the policy too (one root per hundred patterns)
+    """
+    permissions = load_permissions_template()
+    permissions["logging"] = {"logLevel": "off"}
+    if not notifications:
+        permissions["notifications"]["enabled"] = 0
+    if name == "template":
+        return permissions
+    rng = random.Random(name)
+    missing = POLICY_SIZES[name] - len(policy_patterns(permissions))
+    categories = permissions["categories"]
+    for i in range(max(missing, 0)):
+        shape = PATTERN_SHAPES[i % len(PATTERN_SHAPES)]
+        pattern = shape.format(tool=f"tool{rng.randrange(POLICY_SIZES[name])}", n=i)
+        categories[SCALED_CATEGORIES[i % len(SCALED_CATEGORIES)]]["commands"].append(pattern)
+    permissions["workspace"]["additionalRoots"] = [f"/srv/root{i}/project" for i in range(POLICY_SIZES[name] // 100)]
+    return permissions
+
+
+def time_micro(func, inputs, min_time):
+    """
+    Best microseconds per call over several rounds of calls on inputs
+    Each round runs the inputs enough times to last about min_time / 5
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            for args in inputs:
+                func(*args)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 5 or number >= 1_000_000:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / 5 / elapsed) + 1))
+    best = elapsed
+    for _ in range(4):
+        start = time.perf_counter()
+        for _ in range(number):
+            for args in inputs:
+                func(*args)
+        best = min(best, time.perf_counter() - start)
+    calls = number * len(inputs)
+    return {"calls": calls, "us_per_call": best / calls * 1_000_000}
+
+
+def micro_cases(hook, permissions, policy_name):
+    """(case, function, argument tuples) for one policy"""
+    engine = hook.PolicyEngine(permissions)
+    policy = engine.policy
+    roots = engine.root_index()
+    # match_glob: every command against every risky pattern, the naive scan
+    risky = permissions["categories"]["risky"]["commands"]
+    cases = [
+        ("match_glob", hook.match_glob, [(command, pattern) for command in COMMANDS[:3] for pattern in risky]),
+        ("check_in_list", hook.check_in_list,
+         [(command, policy, category, "commands") for command in COMMANDS for category in SCALED_CATEGORIES]),
+        ("is_path_outside_workspace", hook.is_path_outside_workspace,
+         [(path, WORK_DIR, roots) for path in PATHS]),
+    ]
+    if policy_name == DEFAULT_POLICIES[0]:
+        cases += [
+            ("split_command", hook.split_command, [(command,) for command in COMMANDS]),
+            ("extract_paths_from_command", hook.extract_paths_from_command, [(command,) for command in COMMANDS]),
+        ]
+    return cases
+
+
+def payload(event, index):
+    """Hook payload for an event; PreToolUse commands differ per index so the decision cache misses"""
+    if event == "PreToolUse":
+        command = f"{COMMANDS[index % len(COMMANDS)]} && ls ./bench{index}"
+        return {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": "default",
+                "cwd": WORK_DIR, "tool_input": {"command": command}}
+    if event == "PreToolUse-cached":
+        return {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": "default",
+                "cwd": WORK_DIR, "tool_input": {"command": COMMANDS[1]}}
+    return {"hook_event_name": event, "tool_name": "Bash", "permission_mode": "default", "cwd": WORK_DIR}
+
+
+def summarize(samples):
+    """Return mean/p50/p95 in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+def time_end_to_end(script_path, event, runs):
+    """Time full hook invocations in fresh interpreters"""
+    samples = []
+    for i in range(runs):
+        data = json.dumps(payload(event, i)).encode("utf-8")
+        start = time.perf_counter()
+        subprocess.run([sys.executable, script_path], input=data, capture_output=True)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def run_policy(hook, name, args, results):
+    """Run every selected case against one policy"""
+    permissions = build_policy(name, args.notifications)
+    patterns = len(policy_patterns(permissions))
+    results["policies"][name] = {"patterns": patterns,
+                                 "additional_roots": len(permissions["workspace"]["additionalRoots"])}
+    print(f"\n[{name}] {patterns} patterns")
+
+    if args.only in (None, "micro"):
+        start = time.perf_counter()
+        cases = micro_cases(hook, permissions, name)
+        print(f"  {'policy compile':<30}{(time.perf_counter() - start) * 1000:>12.1f} ms")
+        for case, func, inputs in cases:
+            row = time_micro(func, inputs, args.min_time)
+            row.update({"case": case, "policy": name if case not in ("split_command", "extract_paths_from_command")
+                        else None, "inputs": len(inputs)})
+            results["micro"].append(row)
+            print(f"  {case:<30}{row['us_per_call']:>12.3f} us/call")
+
+    if args.only in (None, "e2e"):
+        script_path = make_claude_dir(permissions)
+        # First invocation compiles the policy sidecar
+        start = time.perf_counter()
+        subprocess.run([sys.executable, script_path], input=json.dumps(payload("Stop", 0)).encode("utf-8"),
+                       capture_output=True)
+        compile_ms = (time.perf_counter() - start) * 1000
+        results["end_to_end"].append({"event": "first-run", "policy": name, "runs": 1, "mean_ms": compile_ms,
+                                      "p50_ms": compile_ms, "p95_ms": compile_ms})
+        print(f"  {'first run (sidecar compile)':<30}{compile_ms:>12.2f} ms")
+        for event in EVENTS:
+            row = time_end_to_end(script_path, event, args.runs)
+            row.update({"event": event, "policy": name})
+            results["end_to_end"].append(row)
+            print(f"  {event:<30}{row['p50_ms']:>12.2f} ms p50{row['p95_ms']:>10.2f} ms p95")
+
+
+def row_key(section, row):
+    return (section, row.get("case") or row.get("event"), row.get("policy"))
+
+
+def compare(old_path, new_path):
+    """Print the change between two --json result files"""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    old_rows = {row_key(section, row): row for section in ("micro", "end_to_end") for row in old.get(section, [])}
+    print(f"{'case':<30}{'policy':>10}{'old':>12}{'new':>12}{'change':>10}")
+    for section, metric, unit in (("micro", "us_per_call", "us"), ("end_to_end", "p50_ms", "ms")):
+        for row in new.get(section, []):
+            previous = old_rows.get(row_key(section, row))
+            if previous is None:
+                continue
+            name = row.get("case") or row.get("event")
+            change = (row[metric] / previous[metric] - 1) * 100 if previous[metric] else 0.0
+            print(f"{name:<30}{str(row['policy'] or '-'):>10}{previous[metric]:>10.3f}{unit}"
+                  f"{row[metric]:>10.3f}{unit}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hook helpers and full hook invocations")
+    parser.add_argument("--policies", nargs="+", choices=DEFAULT_POLICIES, default=DEFAULT_POLICIES,
+                        help="policies to run against")
+    parser.add_argument("--only", choices=["micro", "e2e"], help="run only the micro or end-to-end cases")
+    parser.add_argument("--runs", type=int, default=20, help="hook invocations per end-to-end case")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent per microbenchmark")
+    parser.add_argument("--notifications", action="store_true",
+                        help="keep desktop notifications on for Stop/PermissionRequest")
+    parser.add_argument("--json", help="write results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two --json result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    hook = load_hook()
+    hook.configure_logging(hook.log_settings({"logLevel": "off"}))
+    results = {
+        "benchmark": "suite",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "policies": {},
+        "micro": [],
+        "end_to_end": [],
+    }
+    for name in args.policies:
+        run_policy(hook, name, args, results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
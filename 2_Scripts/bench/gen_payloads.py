@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic hook workload generator
+Writes a stream of PreToolUse payloads, one JSON object per line, with a
+configurable mix of single Bash commands, compound commands, MCP tools and
+file tools. The stream has the format of the hook's payload recorder
+(hooks/payloads.jsonl), so both can be replayed the same way:
+  python3 2_Scripts/bench/gen_payloads.py --count 1000000 --output workload.jsonl
+  python3 .claude/hooks/unified-hook.py --batch workload.jsonl > decisions.jsonl
+or evaluated in-process with decision counts and throughput:
+  python3 2_Scripts/bench/gen_payloads.py --count 100000 --evaluate [--input payloads.jsonl]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template  # noqa: E402
+
+KINDS = ["bash", "compound", "mcp", "file"]
+DEFAULT_MIX = "bash=45,compound=25,mcp=10,file=20"
+MODES = ["default", "plan", "acceptEdits", "bypassPermissions"]
+DEFAULT_MODES = "default=70,acceptEdits=15,plan=10,bypassPermissions=5"
+
+WORK_DIR = "/home/user/project"
+DIRECTORIES = ["src", "src/components", "src/lib", "tests", "docs", "scripts", "build", "node_modules/.bin"]
+NAMES = ["main", "app", "index", "utils", "config", "README", "server", "client", "types", "notes"]
+EXTENSIONS = [".py", ".ts", ".tsx", ".js", ".json", ".md", ".txt", ".yml", ".sh", ".env"]
+OUTSIDE = ["/etc/hosts", "/tmp/out.log", "~/.ssh/config", "../sibling/README.md", "/var/log/syslog"]
+WORDS = ["fix", "update", "refactor", "bug", "feature", "release", "cleanup", "docs", "tests", "typo"]
+
+# Single commands: a template filled by fill()
+BASH_TEMPLATES = [
+    "git status", "git diff {path}", "git log --oneline -{n}", "git add {path}", "git commit -m \"{words}\"",
+    "git push origin {word}", "git checkout -b {word}", "ls -la {dir}", "cat {path}", "head -{n} {path}",
+    "grep -rn \"{word}\" {dir}", "find {dir} -name '*{ext}'", "wc -l {path}", "npm run {word}", "pnpm install",
+    "python3 {path}", "pytest -q {dir}", "rm -rf {dir}", "rm {path}", "mkdir -p {dir}/{word}", "cp {path} {path}",
+    "mv {path} {path}", "sed -i 's/{word}/{word}/g' {path}", "echo \"{words}\" > {path}", "curl -s {url}",
+    "docker ps", "docker compose up -d", "chmod +x {path}", "touch {path}", "cd {dir}",
+]
+SEPARATORS = [" && ", " && ", " | ", " ; ", " || "]
+MCP_TOOLS = ["mcp__github__create_issue", "mcp__github__list_pulls", "mcp__filesystem__read_file",
+             "mcp__slack__post_message", "mcp__postgres__query", "mcp__browser__navigate"]
+FILE_TOOLS = ["Read", "Read", "Edit", "Write", "Glob", "Grep", "NotebookEdit"]
+
+
+def parse_mix(text, names):
+    """"a=1,b=2" -> weights in names order"""
+    weights = dict.fromkeys(names, 0.0)
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in weights:
+            raise argparse.ArgumentTypeError(f"unknown name {name.strip()!r} (expected {', '.join(names)})")
+        weights[name.strip()] = float(weight)
+    if not any(weights.values()):
+        raise argparse.ArgumentTypeError("the mix has no positive weight")
+    return [weights[name] for name in names]
+
+
+class WorkloadGenerator:
+    """Random PreToolUse payloads, reproducible for one seed"""
+
+    def __init__(self, seed, mix, modes, sessions):
+        self.rng = random.Random(seed)
+        self.mix = mix
+        self.modes = modes
+        self.sessions = [f"session-{i:04d}" for i in range(sessions)]
+
+    def path(self):
+        rng = self.rng
+        if rng.random() < 0.1:
+            return rng.choice(OUTSIDE)
+        prefix = rng.choice(("", "./", f"{WORK_DIR}/"))
+        return f"{prefix}{rng.choice(DIRECTORIES)}/{rng.choice(NAMES)}{rng.choice(EXTENSIONS)}"
+
+    def fill(self, template):
+        rng = self.rng
+        return template.format_map({
+            "path": self.path(),
+            "dir": rng.choice(DIRECTORIES) if rng.random() < 0.9 else rng.choice(("/tmp", "..", "~")),
+            "ext": rng.choice(EXTENSIONS),
+            "word": rng.choice(WORDS),
+            "words": " ".join(rng.choices(WORDS, k=rng.randint(1, 5))),
+            "n": rng.randint(1, 50),
+            "url": f"https://{rng.choice(WORDS)}.example.com/api/{rng.choice(WORDS)}",
+        })
+
+    def bash(self):
+        return {"command": self.fill(self.rng.choice(BASH_TEMPLATES))}
+
+    def compound(self):
+        rng = self.rng
+        parts = [self.fill(rng.choice(BASH_TEMPLATES)) for _ in range(rng.randint(2, 4))]
+        command = parts[0]
+        for part in parts[1:]:
+            command += rng.choice(SEPARATORS) + part
+        if rng.random() < 0.1:
+            command = f"echo $({command})"
+        return {"command": command, "description": " ".join(rng.choices(WORDS, k=3))}
+
+    def mcp(self):
+        rng = self.rng
+        return {"path": self.path(), "query": " ".join(rng.choices(WORDS, k=rng.randint(1, 6))),
+                "limit": rng.randint(1, 100)}
+
+    def file(self, tool_name):
+        rng = self.rng
+        if tool_name == "Glob":
+            return {"pattern": f"**/*{rng.choice(EXTENSIONS)}", "path": rng.choice(DIRECTORIES)}
+        if tool_name == "Grep":
+            return {"pattern": rng.choice(WORDS), "path": rng.choice(DIRECTORIES), "glob": f"*{rng.choice(EXTENSIONS)}"}
+        if tool_name == "NotebookEdit":
+            return {"notebook_path": f"{WORK_DIR}/notebooks/{rng.choice(NAMES)}.ipynb", "new_source": "x = 1"}
+        tool_input = {"file_path": self.path()}
+        if tool_name == "Edit":
+            tool_input.update(old_string=rng.choice(WORDS), new_string=rng.choice(WORDS))
+        elif tool_name == "Write":
+            tool_input["content"] = "\n".join(" ".join(rng.choices(WORDS, k=8)) for _ in range(rng.randint(1, 40)))
+        return tool_input
+
+    def payload(self):
+        rng = self.rng
+        kind = rng.choices(KINDS, self.mix)[0]
+        if kind in ("bash", "compound"):
+            tool_name = "Bash"
+            tool_input = self.bash() if kind == "bash" else self.compound()
+        elif kind == "mcp":
+            tool_name = rng.choice(MCP_TOOLS)
+            tool_input = self.mcp()
+        else:
+            tool_name = rng.choice(FILE_TOOLS)
+            tool_input = self.file(tool_name)
+        session = rng.choice(self.sessions)
+        return {
+            "session_id": session,
+            "transcript_path": f"/home/user/.claude/projects/project/{session}.jsonl",
+            "cwd": WORK_DIR,
+            "permission_mode": rng.choices(MODES, self.modes)[0],
+            "hook_event_name": "PreToolUse",
+            "tool_name": tool_name,
+            "tool_input": tool_input,
+        }
+
+
+def evaluate(lines):
+    """Run payload lines through a PolicyEngine built from the shipped template"""
+    hook = load_hook()
+    hook.configure_logging(hook.log_settings({"logLevel": "off"}))
+    engine = hook.PolicyEngine(load_permissions_template())
+    decisions = {}
+    count = 0
+    start = time.perf_counter()
+    for line in lines:
+        result = engine.evaluate(json.loads(line))
+        decision = result.decision if result is not None else "none"
+        decisions[decision] = decisions.get(decision, 0) + 1
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"{count} payloads in {elapsed:.2f} s ({count / elapsed:.0f} payloads/s)" if count else "No payloads")
+    for decision, number in sorted(decisions.items()):
+        print(f"  {decision:<6}{number:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic PreToolUse payload streams")
+    parser.add_argument("--count", type=int, default=100_000, help="payloads to generate")
+    parser.add_argument("--mix", type=lambda text: parse_mix(text, KINDS), default=DEFAULT_MIX,
+                        help=f"weights of {', '.join(KINDS)} (default {DEFAULT_MIX})")
+    parser.add_argument("--modes", type=lambda text: parse_mix(text, MODES), default=DEFAULT_MODES,
+                        help=f"weights of the permission modes (default {DEFAULT_MODES})")
+    parser.add_argument("--sessions", type=int, default=20, help="distinct session ids")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (same seed, same stream)")
+    parser.add_argument("--output", help="write to this file instead of stdout")
+    parser.add_argument("--evaluate", action="store_true",
+                        help="evaluate in-process and print decision counts instead of writing payloads")
+    parser.add_argument("--input", help="with --evaluate: read payloads from this file (e.g. a recorded corpus)")
+    args = parser.parse_args()
+
+    if args.input:
+        if not args.evaluate:
+            parser.error("--input requires --evaluate")
+        with open(args.input, "r", encoding="utf-8") as f:
+            evaluate(line for line in f if line.strip())
+        return
+
+    generator = WorkloadGenerator(args.seed, args.mix, args.modes, args.sessions)
+    lines = (json.dumps(generator.payload(), ensure_ascii=False) + "\n" for _ in range(args.count))
+    if args.evaluate:
+        evaluate(lines)
+        return
+    out = open(args.output, "w", encoding="utf-8", newline="\n") if args.output else sys.stdout
+    try:
+        out.writelines(lines)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
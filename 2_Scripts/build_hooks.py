@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hook build script for CC Permission Manager
+Builds src/public/templates/hooks/unified-hook.py for every locale in
+src/public/templates/locales/*.json, in two variants:
+  debug   - translations baked in exactly like the installer does it
+            (generateHookScript in src/src/lib/config-generator.ts)
+  release - same, with every trace-level logging statement (log_debug and
+            log_block_start calls) removed at the AST level; the
+            decision-level line (log_decision) stays
+Each variant is written as a unified_hook.py module with its bytecode
+precompiled into __pycache__ (hash-checked, so it stays valid when the files
+are copied), plus the unified-hook.py launcher the installer ships
+(src/public/templates/hooks/hook-launcher.py) that imports it. Python never
+caches the bytecode of the script it is started with, only of modules, so the
+launcher is what lets the hook skip compile-on-load.
+With --templates only the release modules are built, into
+src/public/templates/hooks/release/<locale>/ with a manifest.json naming the
+bytecode file; the app bundles them and the installer installs them (the app
+build scripts run this before `pnpm tauri build`).
+Run with: python3 2_Scripts/build_hooks.py [--out DIR | --templates] [--locale en_US ...]
+"""
+
+import os
+import ast
+import sys
+import json
+import argparse
+import py_compile
+import importlib.util
+
+from hook_loader import replace_hook_translations
+
+# Get script directory and project root
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+TEMPLATES_DIR = os.path.join(PROJECT_ROOT, "src", "public", "templates")
+
+HOOK_TEMPLATE = os.path.join(TEMPLATES_DIR, "hooks", "unified-hook.py")
+LAUNCHER_TEMPLATE = os.path.join(TEMPLATES_DIR, "hooks", "hook-launcher.py")
+LOCALES_DIR = os.path.join(TEMPLATES_DIR, "locales")
+DEFAULT_OUT_DIR = os.path.join(PROJECT_ROOT, "build", "hooks")
+RELEASE_TEMPLATES_DIR = os.path.join(TEMPLATES_DIR, "hooks", "release")
+MANIFEST_NAME = "manifest.json"
+
+VARIANTS = ("debug", "release")
+MODULE_NAME = "unified_hook"
+LAUNCHER_NAME = "unified-hook.py"
+
+# Trace-level logging calls removed from the release variant
+LOG_FUNCTIONS = ("log_debug", "log_block_start")
+
+
+def _is_log_call(node):
+    """True for a trace logging call statement"""
+    return isinstance(node, ast.Expr) and isinstance(node.value, ast.Call) \
+        and isinstance(node.value.func, ast.Name) and node.value.func.id in LOG_FUNCTIONS
+
+
+def _is_pure(node):
+    """True for an expression without side effects: names, constants, attribute chains, plain f-strings"""
+    if isinstance(node, (ast.Name, ast.Constant)):
+        return True
+    if isinstance(node, ast.Attribute):
+        return _is_pure(node.value)
+    if isinstance(node, ast.JoinedStr):
+        return all(_is_pure(value) for value in node.values)
+    if isinstance(node, ast.FormattedValue):
+        return _is_pure(node.value) and (node.format_spec is None or _is_pure(node.format_spec))
+    return False
+
+
+class LogStripper(ast.NodeTransformer):
+    """
+    Remove trace logging statements (see _is_log_call), then assignments to local names that
+    only existed to be logged (e.g. label = f"{mode}:{tool_name}"); when the assigned value may
+    have side effects (calls, subscripts) it is kept as an expression statement.
+    Emptied blocks get a pass statement.
+    """
+
+    def __init__(self):
+        self.removed = 0
+
+    def _strip_block(self, body, logged_names):
+        kept = []
+        for node in body:
+            if _is_log_call(node):
+                self.removed += 1
+                for child in ast.walk(node):
+                    if isinstance(child, ast.Name):
+                        logged_names.add(child.id)
+                continue
+            kept.append(node)
+        return kept
+
+    def _visit_body(self, node, logged_names):
+        for field in ("body", "orelse", "finalbody"):
+            block = getattr(node, field, None)
+            if isinstance(block, list) and block and isinstance(block[0], ast.stmt):
+                block = self._strip_block(block, logged_names)
+                if not block and field == "body":
+                    block = [ast.Pass()]
+                setattr(node, field, block)
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.stmt) or isinstance(child, ast.ExceptHandler):
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    self.visit(child)
+                else:
+                    self._visit_body(child, logged_names)
+
+    def _drop_dead_stores(self, function, logged_names):
+        loaded = set()
+        for node in ast.walk(function):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+                loaded.add(node.id)
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                loaded.update(node.names)  # stores outside the function are never dead
+        dead = logged_names - loaded
+
+        def prune(block):
+            kept = []
+            for stmt in block:
+                if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1
+                        and isinstance(stmt.targets[0], ast.Name) and stmt.targets[0].id in dead):
+                    kept.append(stmt)
+                elif not _is_pure(stmt.value):
+                    kept.append(ast.copy_location(ast.Expr(stmt.value), stmt))
+            return kept
+
+        for node in ast.walk(function):
+            for field in ("body", "orelse", "finalbody"):
+                block = getattr(node, field, None)
+                if isinstance(block, list) and block and isinstance(block[0], ast.stmt):
+                    setattr(node, field, prune(block) or ([ast.Pass()] if field == "body" else []))
+
+    def visit_FunctionDef(self, node):
+        logged_names = set()
+        self._visit_body(node, logged_names)
+        if logged_names:
+            self._drop_dead_stores(node, logged_names)
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Module(self, node):
+        self._visit_body(node, set())
+        return node
+
+
+def strip_debug_logging(source):
+    """Return (release source, number of trace logging statements removed)"""
+    tree = ast.parse(source)
+    stripper = LogStripper()
+    tree = ast.fix_missing_locations(stripper.visit(tree))
+    return ast.unparse(tree) + "\n", stripper.removed
+
+
+def check_translated(source, label):
+    """Fail if a t() call survived translation (it would raise NameError at runtime)"""
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "t":
+            raise ValueError(f"{label}: untranslated t() call on line {node.lineno}")
+
+
+def write_module(out_dir, source):
+    """Write the hook module and its bytecode; returns the bytecode path"""
+    os.makedirs(out_dir, exist_ok=True)
+    module_path = os.path.join(out_dir, f"{MODULE_NAME}.py")
+    with open(module_path, "w", encoding="utf-8") as f:
+        f.write(source)
+    cache_path = importlib.util.cache_from_source(module_path)
+    py_compile.compile(module_path, cfile=cache_path, doraise=True,
+                       invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH)
+    return cache_path
+
+
+def write_variant(out_dir, source, launcher):
+    """Write module, bytecode and launcher; returns the launcher path"""
+    write_module(out_dir, source)
+    launcher_path = os.path.join(out_dir, LAUNCHER_NAME)
+    with open(launcher_path, "w", encoding="utf-8") as f:
+        f.write(launcher)
+    return launcher_path
+
+
+def list_locales():
+    """Every locale with a translation file"""
+    return sorted(name[:-5] for name in os.listdir(LOCALES_DIR) if name.endswith(".json"))
+
+
+def localized_sources(template, locale):
+    """Return (debug source, release source, trace logging statements removed) for a locale"""
+    with open(os.path.join(LOCALES_DIR, f"{locale}.json"), "r", encoding="utf-8") as f:
+        translations = json.load(f)
+    debug_source = replace_hook_translations(template, translations)
+    check_translated(debug_source, locale)
+    release_source, removed = strip_debug_logging(debug_source)
+    return debug_source, release_source, removed
+
+
+def build(out_dir=DEFAULT_OUT_DIR, locales=None):
+    """
+    Build every locale and variant into out_dir/<locale>/<variant>/
+    Returns [{"locale", "variant", "launcher", "bytes", "removed"}]
+    """
+    with open(HOOK_TEMPLATE, "r", encoding="utf-8") as f:
+        template = f.read()
+    with open(LAUNCHER_TEMPLATE, "r", encoding="utf-8") as f:
+        launcher = f.read()
+
+    results = []
+    for locale in locales or list_locales():
+        debug_source, release_source, removed = localized_sources(template, locale)
+        for variant, source in (("debug", debug_source), ("release", release_source)):
+            launcher_path = write_variant(os.path.join(out_dir, locale, variant), source, launcher)
+            results.append({
+                "locale": locale,
+                "variant": variant,
+                "launcher": launcher_path,
+                "bytes": len(source.encode("utf-8")),
+                "removed": removed if variant == "release" else 0,
+            })
+    return results
+
+
+def build_templates(templates_dir=RELEASE_TEMPLATES_DIR, locales=None):
+    """
+    Build the release module of every locale into templates_dir/<locale>/ for the installer,
+    plus templates_dir/manifest.json: {"bytecode": bytecode file name under __pycache__, "locales": [...]}
+    The bytecode only loads on the Python version that built it; other versions compile the module
+    Returns [{"locale", "variant", "launcher", "bytes", "removed"}] like build() (launcher is None)
+    """
+    with open(HOOK_TEMPLATE, "r", encoding="utf-8") as f:
+        template = f.read()
+    locales = locales or list_locales()
+
+    results = []
+    bytecode = None
+    for locale in locales:
+        _debug_source, release_source, removed = localized_sources(template, locale)
+        bytecode = os.path.basename(write_module(os.path.join(templates_dir, locale), release_source))
+        results.append({
+            "locale": locale,
+            "variant": "release",
+            "launcher": None,
+            "bytes": len(release_source.encode("utf-8")),
+            "removed": removed,
+        })
+    with open(os.path.join(templates_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"bytecode": bytecode, "locales": locales}, f, indent=2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build localized debug/release hook variants with precompiled bytecode")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="output directory")
+    parser.add_argument("--templates", action="store_true",
+                        help="build only the release modules the installer ships, into src/public/templates/hooks/release")
+    parser.add_argument("--locale", nargs="+", help="locales to build (default: all in locales/)")
+    args = parser.parse_args()
+
+    try:
+        results = build_templates(locales=args.locale) if args.templates else build(args.out, args.locale)
+    except (OSError, SyntaxError, ValueError) as e:
+        print(f"Build failed: {e}")
+        sys.exit(1)
+
+    for result in results:
+        removed = f", {result['removed']} trace logging statements removed" if result["variant"] == "release" else ""
+        print(f"{result['locale']:<8}{result['variant']:<9}{result['bytes']:>8} bytes{removed}  {result['launcher'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
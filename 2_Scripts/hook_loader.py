@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hook template loader for test and benchmark scripts
+Loads src/public/templates/hooks/unified-hook.py as an importable module.
+The template calls t('key', ...) which the installer bakes into hardcoded
+text; here t() is provided at runtime from the selected locale file.
+"""
+
+import os
+import re
+import json
+import types
+import tempfile
+
+# Get script directory and project root
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+TEMPLATES_DIR = os.path.join(PROJECT_ROOT, "src", "public", "templates")
+
+HOOK_TEMPLATE = os.path.join(TEMPLATES_DIR, "hooks", "unified-hook.py")
+LAUNCHER_TEMPLATE = os.path.join(TEMPLATES_DIR, "hooks", "hook-launcher.py")
+# Installed names: the launcher settings.json runs, and the hook module it imports
+LAUNCHER_NAME = "unified-hook.py"
+MODULE_NAME = "unified_hook.py"
+PERMISSIONS_TEMPLATE = os.path.join(TEMPLATES_DIR, "permissions.json")
+LOCALES_DIR = os.path.join(TEMPLATES_DIR, "locales")
+
+
+def load_translations(locale="en_US"):
+    """Load the translation table for a locale"""
+    with open(os.path.join(LOCALES_DIR, f"{locale}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_translator(translations):
+    """Build a t(key, **params) function equivalent to the installer's substitution"""
+    def t(key, **params):
+        value = translations
+        for part in key.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is None:
+            return key
+        for param_key, param_value in params.items():
+            value = value.replace(f"{{{param_key}}}", str(param_value))
+        return value
+    return t
+
+
+def get_nested_value(obj, path):
+    """Get nested value from dict using dot notation"""
+    result = obj
+    for key in path.split("."):
+        if not isinstance(result, dict):
+            return None
+        result = result.get(key)
+    return result
+
+
+def replace_hook_translations(script_content, translations):
+    """
+    Replace t() calls with hardcoded translations
+    Python port of replaceHookTranslations in src/src/lib/config-generator.ts,
+    used by build_hooks.py; keep the two in sync
+    (2_Scripts/test/test_translation_replacement.py checks it against a
+    reference copy of the TypeScript algorithm)
+    """
+    last_index = 0
+    output = []
+
+    while last_index < len(script_content):
+        t_call_start = script_content.find("t('", last_index)
+        if t_call_start == -1:
+            output.append(script_content[last_index:])
+            break
+
+        # Check if t() is inside f-string {...}
+        is_in_fstring = False
+        opening_brace_pos = -1
+        search_pos = t_call_start - 1
+        brace_depth = 0
+
+        while search_pos >= 0:
+            char = script_content[search_pos]
+            if char == "}":
+                brace_depth += 1
+            elif char == "{":
+                if brace_depth == 0:
+                    # Found opening brace containing t(); look backwards for f" or f'
+                    opening_brace_pos = search_pos
+                    fstring_pos = search_pos - 1
+                    while fstring_pos >= 0 and script_content[fstring_pos].isspace():
+                        fstring_pos -= 1
+                    if fstring_pos >= 1:
+                        before_quote = script_content[max(0, fstring_pos - 10):fstring_pos + 1]
+                        if re.search(r"f[\"']$", before_quote):
+                            is_in_fstring = True
+                    break
+                brace_depth -= 1
+            elif char in ('"', "'") and brace_depth == 0:
+                break
+            search_pos -= 1
+
+        # Add content before t() (or before the opening brace if in f-string)
+        if is_in_fstring and opening_brace_pos >= 0:
+            output.append(script_content[last_index:opening_brace_pos])
+        else:
+            output.append(script_content[last_index:t_call_start])
+
+        # Extract key
+        key_start = t_call_start + 3  # len("t('")
+        key_end = script_content.find("'", key_start)
+        if key_end == -1:
+            output.append(script_content[t_call_start:])
+            break
+        key = script_content[key_start:key_end]
+
+        # Find matching closing paren
+        paren_count = 1
+        pos = key_end + 1
+        found_closing = False
+        while pos < len(script_content) and (script_content[pos].isspace() or script_content[pos] == ","):
+            pos += 1
+        while pos < len(script_content):
+            if script_content[pos] == "(":
+                paren_count += 1
+            elif script_content[pos] == ")":
+                paren_count -= 1
+                if paren_count == 0:
+                    found_closing = True
+                    break
+            pos += 1
+
+        if not found_closing:
+            output.append(script_content[t_call_start:])
+            break
+
+        # If in f-string, skip the closing } after t()
+        closing_brace_pos = pos + 1
+        if is_in_fstring:
+            while closing_brace_pos < len(script_content) and script_content[closing_brace_pos].isspace():
+                closing_brace_pos += 1
+            if closing_brace_pos < len(script_content) and script_content[closing_brace_pos] == "}":
+                closing_brace_pos += 1
+            else:
+                closing_brace_pos = pos + 1
+
+        after_key = script_content[key_end + 1:pos].strip()
+        has_params = after_key.startswith(",")
+        translation_text = get_nested_value(translations, key)
+
+        if translation_text is None:
+            print(f"Warning: Translation key not found in hook script: {key}")
+            output.append(script_content[t_call_start:pos + 1])
+            last_index = pos + 1
+            continue
+
+        if not has_params:
+            output.append(translation_text if is_in_fstring else f'"{translation_text}"')
+        else:
+            # Parse key=value params
+            params_str = after_key[1:].strip()
+            param_map = {}
+            param_start = 0
+            current_key = ""
+            current_value = ""
+            in_value = False
+            paren_depth = 0
+
+            for i, char in enumerate(params_str):
+                if char == "(":
+                    paren_depth += 1
+                    if in_value:
+                        current_value += char
+                elif char == ")":
+                    paren_depth -= 1
+                    if in_value:
+                        current_value += char
+                elif char == "=" and paren_depth == 0 and not in_value:
+                    current_key = params_str[param_start:i].strip()
+                    in_value = True
+                    current_value = ""
+                elif char == "," and paren_depth == 0 and in_value:
+                    param_map[current_key] = current_value.strip()
+                    in_value = False
+                    param_start = i + 1
+                elif in_value:
+                    current_value += char
+            if in_value and current_key:
+                param_map[current_key] = current_value.strip()
+
+            result = translation_text
+            for param_key, param_value in param_map.items():
+                if param_value.startswith('f"') or param_value.startswith("f'"):
+                    # f-string value: splice its content in directly
+                    result = result.replace(f"{{{param_key}}}", param_value[2:-1])
+                else:
+                    result = result.replace(f"{{{param_key}}}", f"{{{param_value}}}")
+
+            if is_in_fstring:
+                output.append(result)
+            elif "{" in result:
+                output.append(f'f"{result}"')
+            else:
+                output.append(f'"{result}"')
+
+        last_index = closing_brace_pos if is_in_fstring else pos + 1
+
+    return "".join(output)
+
+
+def load_hook(locale="en_US", script_path=None):
+    """
+    Load the hook template as a module
+    script_path overrides __file__, which decides SCRIPT_DIR and therefore where
+    hook-debug.log is written; by default a scratch .claude/hooks directory is
+    created so the template directory is never written to, holding a copy of
+    the template so the script's own mtime can be read like an installed hook's
+    """
+    with open(HOOK_TEMPLATE, "r", encoding="utf-8") as f:
+        source = f.read()
+    if script_path is None:
+        hooks_dir = os.path.join(tempfile.mkdtemp(prefix="cc-hook-"), ".claude", "hooks")
+        os.makedirs(hooks_dir)
+        script_path = os.path.join(hooks_dir, MODULE_NAME)
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(source)
+    module = types.ModuleType("unified_hook")
+    module.__file__ = script_path
+    module.t = make_translator(load_translations(locale))
+    exec(compile(source, HOOK_TEMPLATE, "exec"), module.__dict__)
+    return module
+
+
+def load_permissions_template():
+    """Load the shipped permissions.json template"""
+    with open(PERMISSIONS_TEMPLATE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def render_hook_script(dest_path, locale="en_US"):
+    """
+    Write a runnable copy of the hook template to dest_path
+    The translation table is embedded with a small t() so the script runs
+    standalone, like an installed hook
+    """
+    import ast
+
+    with open(HOOK_TEMPLATE, "r", encoding="utf-8") as f:
+        source = f.read()
+    # Insert right after the module docstring
+    docstring_end = ast.parse(source).body[0].end_lineno
+    lines = source.splitlines(keepends=True)
+    shim = (
+        f"\n_TRANSLATIONS = {load_translations(locale)!r}\n\n\n"
+        "def t(key, **params):\n"
+        "    value = _TRANSLATIONS\n"
+        "    for part in key.split('.'):\n"
+        "        value = value.get(part) if isinstance(value, dict) else None\n"
+        "    if value is None:\n"
+        "        return key\n"
+        "    for param_key, param_value in params.items():\n"
+        "        value = value.replace('{' + param_key + '}', str(param_value))\n"
+        "    return value\n"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+    with open(dest_path, "w", encoding="utf-8") as f:
+        f.write("".join(lines[:docstring_end]) + shim + "".join(lines[docstring_end:]))
+    return dest_path
+
+
+def make_claude_dir(permissions=None, locale="en_US"):
+    """
+    Create a scratch .claude directory laid out like an installed hook: the
+    launcher, the rendered hook module it imports, and permissions.json
+    Returns the path of the launcher
+    """
+    claude_dir = os.path.join(tempfile.mkdtemp(prefix="cc-hook-"), ".claude")
+    hooks_dir = os.path.join(claude_dir, "hooks")
+    render_hook_script(os.path.join(hooks_dir, MODULE_NAME), locale)
+    script_path = os.path.join(hooks_dir, LAUNCHER_NAME)
+    with open(LAUNCHER_TEMPLATE, "r", encoding="utf-8") as src, open(script_path, "w", encoding="utf-8") as dst:
+        dst.write(src.read())
+    with open(os.path.join(claude_dir, "permissions.json"), "w", encoding="utf-8") as f:
+        json.dump(permissions if permissions is not None else load_permissions_template(), f, indent=2)
+    return script_path
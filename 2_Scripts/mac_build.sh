@@ -90,6 +90,15 @@ elif [ "$BUILD_TYPE" = "universal" ]; then
     echo ""
 fi
 
+# 生成安装器使用的 release hook 模块（src/public/templates/hooks/release）
+python3 "$SCRIPT_DIR/build_hooks.py" --templates
+if [ $? -ne 0 ]; then
+    echo ""
+    echo "[ERROR] Hook build failed!"
+    exit 1
+fi
+echo ""
+
 # 开始构建
 echo "[INFO] Starting build process..."
 echo "[INFO] This may take several minutes..."
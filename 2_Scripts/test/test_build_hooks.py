@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test script for the hook build (2_Scripts/build_hooks.py)
+Run with: python3 2_Scripts/test/test_build_hooks.py
+"""
+
+import os
+import ast
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import build_hooks  # noqa: E402
+from hook_loader import load_permissions_template  # noqa: E402
+
+out_dir = tempfile.mkdtemp(prefix="cc-build-")
+results = build_hooks.build(out_dir, ["en_US"])
+
+
+def variant_dir(variant):
+    return os.path.join(out_dir, "en_US", variant)
+
+
+def install(variant, permissions=None):
+    """Copy a built variant into a scratch .claude/hooks directory"""
+    claude_dir = os.path.join(tempfile.mkdtemp(prefix="cc-hook-"), ".claude")
+    shutil.copytree(variant_dir(variant), os.path.join(claude_dir, "hooks"))
+    with open(os.path.join(claude_dir, "permissions.json"), "w", encoding="utf-8") as f:
+        json.dump(permissions if permissions is not None else load_permissions_template(), f)
+    return os.path.join(claude_dir, "hooks", build_hooks.LAUNCHER_NAME)
+
+
+def log_lines(script_path):
+    """Lines of the installed hook's hook-debug.log without their timestamps"""
+    log_file = os.path.join(os.path.dirname(script_path), "hook-debug.log")
+    if not os.path.exists(log_file):
+        return []
+    with open(log_file, "r", encoding="utf-8") as f:
+        return [line[19:] for line in f.read().splitlines()]
+
+
+def run(script_path, payload):
+    result = subprocess.run([sys.executable, script_path], input=json.dumps(payload).encode("utf-8"),
+                            capture_output=True)
+    return result.returncode, result.stdout, result.stderr
+
+
+def check_layout():
+    for variant in build_hooks.VARIANTS:
+        module = os.path.join(variant_dir(variant), "unified_hook.py")
+        cache = build_hooks.importlib.util.cache_from_source(module)
+        if not (os.path.exists(module) and os.path.exists(cache)
+                and os.path.exists(os.path.join(variant_dir(variant), build_hooks.LAUNCHER_NAME))):
+            return False
+    return len(results) == 2
+
+
+def check_templates():
+    # The installer reads <locale>/unified_hook.py and __pycache__/<manifest bytecode>
+    templates_dir = tempfile.mkdtemp(prefix="cc-templates-")
+    build_hooks.build_templates(templates_dir, ["en_US"])
+    with open(os.path.join(templates_dir, build_hooks.MANIFEST_NAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    module = os.path.join(templates_dir, "en_US", "unified_hook.py")
+    with open(module, "r", encoding="utf-8") as f, \
+            open(os.path.join(variant_dir("release"), "unified_hook.py"), "r", encoding="utf-8") as release:
+        same_source = f.read() == release.read()
+    bytecode = os.path.join(templates_dir, "en_US", "__pycache__", manifest["bytecode"])
+    return manifest["locales"] == ["en_US"] and same_source \
+        and bytecode == build_hooks.importlib.util.cache_from_source(module) and os.path.exists(bytecode) \
+        and not os.path.exists(os.path.join(templates_dir, "en_US", build_hooks.LAUNCHER_NAME))
+
+
+def check_release_has_no_logging():
+    with open(os.path.join(variant_dir("release"), "unified_hook.py"), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    calls = [node for node in ast.walk(tree) if isinstance(node, ast.Call)
+             and isinstance(node.func, ast.Name) and node.func.id in ("log_debug", "t")]
+    kept = [node for node in ast.walk(tree) if isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name) and node.func.id == "log_decision"]
+    return not calls and kept and results[1]["removed"] > 0
+
+
+def check_strip_snippet():
+    source = (
+        "def f(roots, x):\n"
+        "    label = f'{x.name}'\n"
+        "    root_list = ', '.join(roots)\n"
+        "    log_debug(f'roots {root_list} {label}')\n"
+        "    if x:\n"
+        "        log_debug('x')\n"
+        "    try:\n"
+        "        return x\n"
+        "    except Exception as e:\n"
+        "        log_debug(str(e))\n"
+    )
+    stripped, removed = build_hooks.strip_debug_logging(source)
+    return removed == 3 and "label" not in stripped and "root_list" not in stripped \
+        and "', '.join(roots)" in stripped and "log_debug" not in stripped \
+        and compile(stripped, "<stripped>", "exec") is not None
+
+
+def check_release_keeps_side_effects():
+    # The sound command's result is only logged, the call itself must stay
+    with open(os.path.join(variant_dir("release"), "unified_hook.py"), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    function = next(node for node in ast.walk(tree)
+                    if isinstance(node, ast.FunctionDef) and node.name == "send_notification")
+    return any(isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "run"
+               and isinstance(node.func.value, ast.Name) and node.func.value.id == "subprocess"
+               and "sound_script" in ast.unparse(node)
+               for node in ast.walk(function))
+
+
+def check_untranslated_key_fails():
+    try:
+        build_hooks.check_translated("log_debug(t('hook.missing'))\n", "test")
+    except ValueError:
+        return True
+    return False
+
+
+PAYLOADS = [
+    {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": "default",
+     "cwd": "/repo", "tool_input": {"command": "git status && ls ./src"}},
+    {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": "default",
+     "cwd": "/repo", "tool_input": {"command": "rm -rf /"}},
+    {"hook_event_name": "PreToolUse", "tool_name": "Edit", "permission_mode": "acceptEdits",
+     "cwd": "/repo", "tool_input": {"file_path": "/etc/hosts"}},
+]
+
+
+def check_same_decisions():
+    debug, release = install("debug"), install("release")
+    for payload in PAYLOADS:
+        debug_result, release_result = run(debug, payload), run(release, payload)
+        if debug_result != release_result or not debug_result[1] or debug_result[2]:
+            print(f"  {payload['tool_input']}: debug={debug_result} release={release_result}")
+            return False
+    # The template logs at decision level, which both variants write
+    return len(log_lines(debug)) == len(PAYLOADS) and log_lines(release) == log_lines(debug)
+
+
+def check_release_keeps_decision_lines():
+    permissions = load_permissions_template()
+    permissions["logging"]["logLevel"] = "trace"
+    debug, release = install("debug", permissions), install("release", permissions)
+    for payload in PAYLOADS:
+        run(debug, payload)
+        run(release, payload)
+    decision_lines = [line for line in log_lines(debug) if " -> " in line and "(evaluated; " in line]
+    return len(log_lines(debug)) > len(PAYLOADS) and len(decision_lines) == len(PAYLOADS) \
+        and log_lines(release) == decision_lines
+
+
+test_cases = [
+    ("module, bytecode and launcher per variant", check_layout),
+    ("installer templates hold the release module, its bytecode and a manifest", check_templates),
+    ("release variant has no log_debug or t() calls, keeps log_decision", check_release_has_no_logging),
+    ("log-only locals and emptied blocks are handled", check_strip_snippet),
+    ("release send_notification still runs the sound command", check_release_keeps_side_effects),
+    ("untranslated t() call fails the build", check_untranslated_key_fails),
+    ("debug and release make the same decisions", check_same_decisions),
+    ("release strips trace lines, keeps decision lines", check_release_keeps_decision_lines),
+]
+
+# Run tests
+print("Running hook build tests...\n")
+
+passed = 0
+failed = 0
+
+for name, check in test_cases:
+    if check():
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Test script for the long-lived evaluation modes: --batch and the decision daemon (--serve)
+Run with: python3 2_Scripts/test/test_daemon.py
+"""
+
+import os
+import sys
+import json
+import runpy
+import time
+import tempfile
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import MODULE_NAME, load_hook, load_permissions_template, make_claude_dir  # noqa: E402
+
+# Private runtime directory so the daemon socket never collides with a real one
+os.environ["XDG_RUNTIME_DIR"] = tempfile.mkdtemp(prefix="cc-hook-run-")
+
+COMMANDS = ["git status", "rm -rf /", "cat ./README.md", "echo x > ../out.txt", "curl -s https://example.com"]
+
+
+def payload(command):
+    return {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": "default",
+            "cwd": "/repo", "tool_input": {"command": command}}
+
+
+def run_hook(script_path, data, args=()):
+    result = subprocess.run([sys.executable, script_path, *args], input=data, capture_output=True)
+    return result.stdout
+
+
+def decision(reply):
+    return json.loads(reply)["hookSpecificOutput"]["permissionDecision"] if reply else None
+
+
+# Batch mode
+
+def batch_input():
+    lines = [json.dumps(payload(command)) for command in COMMANDS]
+    lines += [json.dumps({"hook_event_name": "Stop"}), "not json", ""]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def expected_batch(script_path):
+    replies = [run_hook(script_path, json.dumps(payload(command)).encode("utf-8")) for command in COMMANDS]
+    return b"".join(replies) + b"{}\n{}\n"
+
+
+def check_batch_file():
+    script_path = make_claude_dir()
+    input_path = os.path.join(os.path.dirname(script_path), "payloads.jsonl")
+    with open(input_path, "wb") as f:
+        f.write(batch_input())
+    return run_hook(script_path, b"", ["--batch", input_path]) == expected_batch(script_path)
+
+
+def check_batch_stdin():
+    script_path = make_claude_dir()
+    return run_hook(script_path, batch_input(), ["--batch"]) == expected_batch(script_path)
+
+
+# Decision daemon
+
+def start_daemon(script_path, hook):
+    daemon = subprocess.Popen([sys.executable, script_path, "--serve", "60"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and not os.path.exists(hook.daemon_socket_path()):
+        time.sleep(0.05)
+    return daemon
+
+
+def query(hook, command):
+    return hook.query_daemon(json.dumps(payload(command)).encode("utf-8"))
+
+
+def check_daemon_round_trip(script_path, hook, daemon):
+    replies = [query(hook, command) for command in COMMANDS]
+    # --profile always evaluates in-process, never through the daemon
+    cold = [run_hook(script_path, json.dumps(payload(command)).encode("utf-8"), ["--profile"])
+            for command in COMMANDS]
+    return replies == cold and hook.query_daemon(json.dumps({"hook_event_name": "Stop"}).encode("utf-8")) is None
+
+
+def check_hook_forwards_to_daemon(script_path, hook, daemon):
+    def daemon_blocks():
+        with open(hook.DEBUG_LOG, "r", encoding="utf-8") as f:
+            return f.read().count("(daemon) ===")
+    before = daemon_blocks()
+    reply = run_hook(script_path, json.dumps(payload("git status")).encode("utf-8"))
+    return decision(reply) == "allow" and daemon_blocks() == before + 1
+
+
+def check_launcher_skips_module(script_path, hook, daemon):
+    # Answered by the daemon, the launcher never imports the hook module
+    result = subprocess.run([sys.executable, "-X", "importtime", script_path],
+                            input=json.dumps(payload("git status")).encode("utf-8"), capture_output=True)
+    return decision(result.stdout) == "allow" and b"unified_hook" not in result.stderr
+
+
+def check_launcher_socket_path(script_path, hook, daemon):
+    # The launcher keeps its own copy of the client so it never imports the hook;
+    # both must derive the same socket path from every runtime dir fallback
+    launcher = runpy.run_path(script_path, run_name="launcher")
+    saved = {name: os.environ.get(name) for name in ("XDG_RUNTIME_DIR", "TMPDIR")}
+    paths = []
+    try:
+        for env in (saved, {"XDG_RUNTIME_DIR": None, "TMPDIR": saved["XDG_RUNTIME_DIR"]},
+                    {"XDG_RUNTIME_DIR": None, "TMPDIR": None}):
+            for name, value in env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            paths.append((launcher["daemon_socket_path"](), hook.daemon_socket_path()))
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return all(ours == theirs for ours, theirs in paths) \
+        and launcher["DAEMON_TIMEOUT"] == hook.DAEMON_TIMEOUT
+
+
+def check_launcher_rejects_shared_socket_dir(script_path, hook, daemon):
+    # Both clients answer from the daemon only while its socket dir is private
+    launcher = runpy.run_path(script_path, run_name="launcher")
+    data = json.dumps(payload("git status")).encode("utf-8")
+    socket_dir = os.path.dirname(hook.daemon_socket_path())
+    mode = os.stat(socket_dir).st_mode & 0o777
+    private = (launcher["query_daemon"](data), hook.query_daemon(data))
+    os.chmod(socket_dir, mode | 0o050)
+    try:
+        shared = (launcher["query_daemon"](data), hook.query_daemon(data))
+    finally:
+        os.chmod(socket_dir, mode)
+    return decision(private[0]) == decision(private[1]) == "allow" and shared == (None, None)
+
+
+def check_concurrent_clients(script_path, hook, daemon):
+    replies = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(20):
+            reply = query(hook, "git status")
+            with lock:
+                replies.append(reply)
+
+    threads = [threading.Thread(target=client) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(replies) == 320 and len(set(replies)) == 1 and decision(replies[0]) == "allow"
+
+
+def check_daemon_sees_symlink_retarget(script_path, hook, daemon):
+    # Path caches are per request: a retargeted symlink must not keep its old target
+    base = os.path.realpath(tempfile.mkdtemp(prefix="cc-hook-ws-"))
+    workspace, outside = os.path.join(base, "ws"), os.path.join(base, "outside")
+    for directory in (os.path.join(workspace, "inside"), outside):
+        os.makedirs(directory)
+    link = os.path.join(workspace, "link")
+    try:
+        os.symlink(os.path.join(workspace, "inside"), link)
+    except (OSError, NotImplementedError):
+        return True  # symlinks not available
+
+    def decide():
+        data = {"hook_event_name": "PreToolUse", "tool_name": "Edit", "permission_mode": "acceptEdits",
+                "cwd": workspace, "tool_input": {"file_path": os.path.join(link, "a.txt")}}
+        return decision(hook.query_daemon(json.dumps(data).encode("utf-8")))
+
+    before = decide()
+    os.remove(link)
+    os.symlink(outside, link)
+    return before == "allow" and decide() == "ask"
+
+
+def check_daemon_sees_same_size_edit(script_path, hook, daemon):
+    # Same-size edit with the mtime put back: stat data alone would keep the old policy
+    permissions_file = os.path.join(os.path.dirname(os.path.dirname(script_path)), "permissions.json")
+    before = decision(query(hook, "git status"))
+    stat_result = os.stat(permissions_file)
+    with open(permissions_file, "r+b") as f:
+        source = f.read()
+        f.seek(0)
+        f.write(source.replace(b'"git status', b'"git ztatus'))
+    os.utime(permissions_file, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    return before == "allow" and decision(query(hook, "git status")) == "ask"
+
+
+def check_daemon_stops_on_reinstall(script_path, hook, daemon):
+    os.utime(hook.__file__)
+    query(hook, "git status")
+    try:
+        daemon.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        return False
+    return not os.path.exists(hook.daemon_socket_path())
+
+
+batch_cases = [
+    ("--batch file: one line per payload, {} for non-decisions", check_batch_file),
+    ("--batch stdin matches file mode", check_batch_stdin),
+]
+
+daemon_cases = [
+    ("daemon replies match in-process decisions", check_daemon_round_trip),
+    ("hook forwards stdin to a running daemon", check_hook_forwards_to_daemon),
+    ("launcher answers from the daemon without importing the hook", check_launcher_skips_module),
+    ("launcher and hook agree on the daemon socket", check_launcher_socket_path),
+    ("launcher and hook refuse a socket dir others can open", check_launcher_rejects_shared_socket_dir),
+    ("concurrent clients are all answered", check_concurrent_clients),
+    ("daemon resolves a retargeted symlink", check_daemon_sees_symlink_retarget),
+    ("daemon reloads a same-size edit with restored mtime", check_daemon_sees_same_size_edit),
+    ("daemon stops when the hook script changes", check_daemon_stops_on_reinstall),
+]
+
+# Run tests
+print("Running batch and daemon tests...\n")
+
+passed = 0
+failed = 0
+
+
+def report(name, ok):
+    global passed, failed
+    if ok:
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        failed += 1
+
+
+for name, check in batch_cases:
+    report(name, check())
+
+permissions = load_permissions_template()
+permissions["logging"] = {"logLevel": "trace"}
+permissions["modes"]["acceptEdits"]["editAllFiles"] = 0
+daemon_script = make_claude_dir(permissions)
+daemon_hook = load_hook(script_path=os.path.join(os.path.dirname(daemon_script), MODULE_NAME))
+if daemon_hook.daemon_socket_path() is None:
+    print("(daemon cases skipped: Unix domain sockets not available)")
+else:
+    daemon_process = start_daemon(daemon_script, daemon_hook)
+    try:
+        for name, check in daemon_cases:
+            report(name, check(daemon_script, daemon_hook, daemon_process))
+    finally:
+        daemon_process.terminate()
+        daemon_process.wait(timeout=10)
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
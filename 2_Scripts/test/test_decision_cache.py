@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Test script for the hook decision cache (DecisionCache)
+Run with: python3 2_Scripts/test/test_decision_cache.py
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template, make_claude_dir  # noqa: E402
+
+hook = load_hook()
+claude_dir = os.path.dirname(os.path.dirname(make_claude_dir()))
+permissions_file = os.path.join(claude_dir, "permissions.json")
+cache_file = os.path.join(claude_dir, hook.DECISION_CACHE_NAME)
+
+
+def payload(command, mode="default"):
+    return {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": mode,
+            "cwd": "/repo", "tool_input": {"command": command}}
+
+
+def open_cache(capacity=hook.DECISION_CACHE_SIZE):
+    return hook.DecisionCache(cache_file, permissions_file, capacity)
+
+
+def lookup(cache, data):
+    """The cached decision for a payload ("allow", "ask", "deny"), or None"""
+    result = cache.lookup(data)
+    return result.decision if result is not None else None
+
+
+def check_round_trip():
+    cache = open_cache()
+    cache.store(payload("git status"), "allow")
+    return lookup(open_cache(), payload("git status")) == "allow"
+
+
+def check_category_and_pattern():
+    # Hits are journaled with the category and pattern of the evaluation they reuse
+    open_cache().store(payload("git log"), "allow", (), "read", "git log*")
+    result = open_cache().lookup(payload("git log"))
+    return (result.decision, result.category, result.pattern) == ("allow", "read", "git log*")
+
+
+def check_key_parts():
+    cache = open_cache()
+    return lookup(cache, payload("git status", mode="plan")) is None \
+        and lookup(cache, payload("git status ")) is None
+
+
+def check_lru_eviction():
+    cache = open_cache(capacity=2)
+    cache.store(payload("a"), "ask")
+    cache.store(payload("b"), "ask")
+    lookup(cache, payload("a"))  # a becomes most recently used
+    cache.store(payload("c"), "ask")
+    cache = open_cache(capacity=2)
+    return lookup(cache, payload("a")) == "ask" and lookup(cache, payload("b")) is None
+
+
+def check_touch_keeps_entries():
+    open_cache().store(payload("ls"), "allow")
+    stat_result = os.stat(permissions_file)
+    os.utime(permissions_file, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+    return lookup(open_cache(), payload("ls")) == "allow"
+
+
+def check_edit_invalidates():
+    open_cache().store(payload("ls"), "allow")
+    with open(permissions_file, "r", encoding="utf-8") as f:
+        permissions = json.load(f)
+    permissions["modes"]["default"]["read"] = 0
+    with open(permissions_file, "w", encoding="utf-8") as f:
+        json.dump(permissions, f, indent=4)
+    return lookup(open_cache(), payload("ls")) is None
+
+
+def check_same_size_edit_invalidates():
+    # Edited in the same timestamp tick as the cache write, mtime put back
+    open_cache().store(payload("ls"), "allow")
+    stat_result = os.stat(permissions_file)
+    with open(permissions_file, "r+b") as f:
+        source = f.read()
+        f.seek(0)
+        f.write(source.replace(b'"ls', b'"lz', 1))
+    os.utime(permissions_file, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    return lookup(open_cache(), payload("ls")) is None
+
+
+def counted(lookups, metrics=1):
+    """Run lookups as one hook invocation with logging.metrics set; returns the stats afterwards"""
+    hook.configure_logging(hook.log_settings({"metrics": metrics}))
+    hook.start_metrics(payload("true"), hook.time.perf_counter())
+    lookups()
+    hook.flush_metrics()
+    hook.configure_logging(None)
+    return open_cache().stats()
+
+
+def check_counters():
+    cache = open_cache()
+    stats = cache.stats()
+    cache.store(payload("pwd"), "allow")
+
+    def lookups():
+        lookup(cache, payload("pwd"))
+        lookup(cache, payload("whoami"))
+    updated = counted(lookups)
+    return updated["hits"] == stats["hits"] + 1 and updated["misses"] == stats["misses"] + 1
+
+
+def check_counters_need_metrics():
+    # Without logging.metrics a lookup does no counting I/O at all
+    cache = open_cache()
+    cache.store(payload("true"), "allow")
+    stats = cache.stats()
+    updated = counted(lambda: [lookup(cache, payload("true")) for _ in range(5)], metrics=0)
+    return (updated["hits"], updated["misses"]) == (stats["hits"], stats["misses"]) \
+        and not os.path.exists(cache_file + ".stats")
+
+
+def check_counters_are_exported():
+    text = hook.metrics_text()
+    return 'cc_permission_hook_decision_cache_lookups_total{outcome="hit"}' in text
+
+
+def check_disabled_cache_is_removed():
+    # decisionCache.enabled 0: the hook removes the cache files and answers every call from the policy
+    permissions = load_permissions_template()
+    permissions["decisionCache"]["enabled"] = 0
+    script_path = make_claude_dir(permissions)
+    disabled_cache = os.path.join(os.path.dirname(os.path.dirname(script_path)), hook.DECISION_CACHE_NAME)
+    with open(disabled_cache, "wb") as f:
+        f.write(b"stale cache")
+    data = json.dumps(payload("git status")).encode("utf-8")
+    outputs = [subprocess.run([sys.executable, script_path], input=data, capture_output=True).stdout
+               for _ in range(2)]
+    return all(b'"allow"' in output for output in outputs) and not os.path.exists(disabled_cache)
+
+
+def check_hits_do_not_write():
+    open_cache().store(payload("uname"), "allow")
+    before = os.stat(cache_file)
+    answers = [lookup(open_cache(), payload("uname")) for _ in range(3)]
+    after = os.stat(cache_file)
+    return answers == ["allow"] * 3 \
+        and (after.st_ino, after.st_mtime_ns, after.st_size) == (before.st_ino, before.st_mtime_ns, before.st_size)
+
+
+def check_misses_append():
+    # Once the cache file is valid, stores only append to the journal
+    open_cache().store(payload("id"), "allow")
+    before = os.stat(cache_file)
+    for command in ("hostname", "date", "uptime"):
+        open_cache().store(payload(command), "allow")
+    after = os.stat(cache_file)
+    cache = open_cache()
+    return [lookup(cache, payload(command)) for command in ("id", "hostname", "date", "uptime")] == ["allow"] * 4 \
+        and (after.st_ino, after.st_mtime_ns, after.st_size) == (before.st_ino, before.st_mtime_ns, before.st_size)
+
+
+def check_full_journal_is_compacted():
+    for i in range(hook.DECISION_JOURNAL_LIMIT + 1):
+        open_cache().store(payload(f"echo {i}"), "allow")
+    cache = open_cache()
+    return cache.journal_records < hook.DECISION_JOURNAL_LIMIT and lookup(cache, payload("echo 0")) == "allow"
+
+
+def check_concurrent_stores_are_kept():
+    # Hooks storing while others append and fold the journal into the cache file lose nothing
+    def store_all(worker):
+        for i in range(40):
+            open_cache().store(payload(f"worker {worker} step {i}"), "allow")
+    threads = [threading.Thread(target=store_all, args=(worker,)) for worker in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cache = open_cache()
+    missing = [(worker, i) for worker in range(6) for i in range(40)
+               if lookup(cache, payload(f"worker {worker} step {i}")) != "allow"]
+    if missing:
+        print(f"  lost {len(missing)} of 240 entries, e.g. {missing[:3]}")
+    return not missing
+
+
+def check_script_change_invalidates():
+    # A reinstalled hook may decide differently, its cache starts empty
+    open_cache().store(payload("env"), "allow")
+    stat_result = os.stat(hook.__file__)
+    os.utime(hook.__file__, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+    return lookup(open_cache(), payload("env")) is None
+
+
+def check_symlink_retarget_invalidates():
+    # The same Edit payload must be re-evaluated once the symlink points outside the workspace
+    permissions = load_permissions_template()
+    permissions["modes"]["acceptEdits"]["editAllFiles"] = 0
+    script_path = make_claude_dir(permissions)
+    base = tempfile.mkdtemp(prefix="cc-hook-ws-")
+    workspace, outside = os.path.join(base, "ws"), os.path.join(base, "outside")
+    os.makedirs(os.path.join(workspace, "inside"))
+    os.makedirs(outside)
+    link = os.path.join(workspace, "link")
+    try:
+        os.symlink(os.path.join(workspace, "inside"), link)
+    except (OSError, NotImplementedError):
+        return True  # symlinks not available
+
+    def decide(tool_name, tool_input):
+        data = {"hook_event_name": "PreToolUse", "tool_name": tool_name, "permission_mode": "acceptEdits",
+                "cwd": workspace, "tool_input": tool_input}
+        result = subprocess.run([sys.executable, script_path], input=json.dumps(data).encode("utf-8"),
+                                capture_output=True)
+        return json.loads(result.stdout)["hookSpecificOutput"]["permissionDecision"]
+
+    calls = [("Edit", {"file_path": "link/a.txt"}), ("Bash", {"command": "touch ./link/a.txt"})]
+    inside = [decide(*call) for call in calls + calls]
+    os.remove(link)
+    os.symlink(outside, link)
+    return inside == ["allow"] * 4 and [decide(*call) for call in calls] == ["ask", "ask"]
+
+
+def check_corrupt_file():
+    with open(cache_file, "wb") as f:
+        f.write(b"not a cache")
+    cache = open_cache()
+    cache.store(payload("ls"), "allow")
+    return lookup(open_cache(), payload("ls")) == "allow"
+
+
+test_cases = [
+    ("store then lookup across instances", check_round_trip),
+    ("category and pattern are kept with the decision", check_category_and_pattern),
+    ("mode and exact command are part of the key", check_key_parts),
+    ("least recently used entry is evicted", check_lru_eviction),
+    ("touching permissions.json keeps entries", check_touch_keeps_entries),
+    ("editing permissions.json invalidates entries", check_edit_invalidates),
+    ("same-size edit with restored mtime invalidates entries", check_same_size_edit_invalidates),
+    ("hit and miss counters persist in the metrics file", check_counters),
+    ("lookups are not counted with metrics off", check_counters_need_metrics),
+    ("counters are exported with the metrics", check_counters_are_exported),
+    ("disabled cache is removed and never consulted", check_disabled_cache_is_removed),
+    ("hits do not rewrite the cache file", check_hits_do_not_write),
+    ("misses append to the journal", check_misses_append),
+    ("full journal is compacted into the cache file", check_full_journal_is_compacted),
+    ("concurrent stores and compactions keep every entry", check_concurrent_stores_are_kept),
+    ("changing the hook script invalidates entries", check_script_change_invalidates),
+    ("retargeted symlink invalidates the entry", check_symlink_retarget_invalidates),
+    ("corrupt cache file is rebuilt", check_corrupt_file),
+]
+
+# Run tests
+print("Running decision cache tests...\n")
+
+passed = 0
+failed = 0
+
+for name, check in test_cases:
+    if check():
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
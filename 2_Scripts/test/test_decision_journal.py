@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for the decision journal (decisions.jsonl, decisions.idx, --query)
+Run with: python3 2_Scripts/test/test_decision_journal.py
+"""
+
+import os
+import sys
+import json
+import time
+import types
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template, make_claude_dir  # noqa: E402
+
+hook = load_hook()
+hook.JOURNAL_INDEX_INTERVAL = 4096
+
+# Synthetic journal: one record per second, starting at BASE
+BASE = 1_700_000_000.0
+RECORDS = 20000
+TOOLS = ("Bash", "Read", "Edit", "Write")
+DECISIONS = ("allow", "ask", "deny")
+
+
+def fake_clock(now):
+    return types.SimpleNamespace(time=lambda: now, perf_counter=time.perf_counter, strftime=time.strftime)
+
+
+def build_journal():
+    real_time = hook.time
+    try:
+        for i in range(RECORDS):
+            hook.time = fake_clock(BASE + i)
+            data = {"session_id": f"s{i % 3}", "permission_mode": "default", "tool_name": TOOLS[i % 4]}
+            hook.journal_decision(data, DECISIONS[i % 3], "read", None, time.perf_counter())
+    finally:
+        hook.time = real_time
+
+
+def expected(since, until, **filters):
+    result = []
+    for i in range(RECORDS):
+        ts = BASE + i
+        record = {"session": f"s{i % 3}", "tool": TOOLS[i % 4], "decision": DECISIONS[i % 3]}
+        if since <= ts <= until and all(record[key] == value for key, value in filters.items()):
+            result.append(ts)
+    return result
+
+
+def query(since, until, **filters):
+    return [json.loads(line)["ts"] for line in hook.query_journal(since, until, filters)]
+
+
+build_journal()
+
+
+def check_records():
+    with open(hook.JOURNAL_FILE, "rb") as f:
+        first = json.loads(f.readline())
+    return list(first) == ["ts", "session", "mode", "tool", "category", "decision", "pattern", "us"] \
+        and first["ts"] == BASE and first["tool"] == "Bash" and isinstance(first["us"], int)
+
+
+def check_index_is_sparse():
+    entries = os.path.getsize(hook.JOURNAL_INDEX) // hook.JOURNAL_INDEX_ENTRY
+    return 1 < entries <= os.path.getsize(hook.JOURNAL_FILE) // hook.JOURNAL_INDEX_INTERVAL + 1
+
+
+def check_seek_lands_near_range():
+    since = BASE + 15000
+    offset = hook.journal_seek(since)
+    with open(hook.JOURNAL_FILE, "rb") as f:
+        f.seek(offset)
+        ts = hook.journal_timestamp(f.readline())
+    # Starts before the range, by at most the slack plus one index interval of records
+    return ts is not None and since - hook.JOURNAL_CLOCK_SLACK - 100 <= ts <= since - hook.JOURNAL_CLOCK_SLACK
+
+
+def check_range():
+    return query(BASE + 1234, BASE + 1300) == expected(BASE + 1234, BASE + 1300) \
+        and query(BASE - 50, BASE + 3) == expected(BASE - 50, BASE + 3) \
+        and query(BASE + RECORDS - 3, BASE + RECORDS + 100) == expected(BASE + RECORDS - 3, BASE + RECORDS + 100)
+
+
+def check_filters():
+    return query(BASE + 100, BASE + 400, tool="Edit", decision="deny") \
+        == expected(BASE + 100, BASE + 400, tool="Edit", decision="deny")
+
+
+def check_stale_index():
+    # An index offset past the end of the journal is ignored
+    size = os.path.getsize(hook.JOURNAL_FILE)
+    real_getsize = hook.os.path.getsize
+    hook.os.path.getsize = lambda path: size // 10 if path == hook.JOURNAL_FILE else real_getsize(path)
+    try:
+        return hook.journal_seek(BASE + RECORDS) == 0
+    finally:
+        hook.os.path.getsize = real_getsize
+
+
+def check_time_formats():
+    now = time.time()
+    local = time.mktime(time.strptime("2026-01-02 03:04:05", "%Y-%m-%d %H:%M:%S"))
+    return abs(hook.parse_query_time("2h") - (now - 7200)) < 5 \
+        and hook.parse_query_time("1700000000") == 1700000000.0 \
+        and hook.parse_query_time("2026-01-02T03:04:05") == local \
+        and hook.parse_query_time("2026-01-02 03:04:05") == local
+
+
+def check_hook_writes_journal_and_query_cli():
+    permissions = load_permissions_template()
+    permissions["logging"] = {"logLevel": "off", "journal": 1}
+    script_path = make_claude_dir(permissions)
+    for command in ("git status", "git status", "rm -rf /"):
+        data = {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": "default",
+                "session_id": "abc", "cwd": "/repo", "tool_input": {"command": command}}
+        subprocess.run([sys.executable, script_path], input=json.dumps(data).encode("utf-8"), capture_output=True)
+    result = subprocess.run([sys.executable, script_path, "--query", "--since", "10m", "--decision", "deny"],
+                            capture_output=True)
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    # The repeated call is a decision cache hit, journaled with the category and pattern it reuses
+    result = subprocess.run([sys.executable, script_path, "--query", "--pattern", "git status"], capture_output=True)
+    by_pattern = [json.loads(line) for line in result.stdout.splitlines()]
+    journal = os.path.join(os.path.dirname(script_path), "decisions.jsonl")
+    with open(journal, "r", encoding="utf-8") as f:
+        written = [json.loads(line) for line in f]
+    return len(written) == 3 and [r["decision"] for r in written] == ["allow", "allow", "deny"] \
+        and written[0]["pattern"] == written[1]["pattern"] == "git status" \
+        and written[0]["category"] == written[1]["category"] is not None and len(by_pattern) == 2 \
+        and len(records) == 1 and records[0]["session"] == "abc" and records[0]["category"] == "globalDeny"
+
+
+test_cases = [
+    ("records have ts first and all fields", check_records),
+    ("index holds about one entry per interval", check_index_is_sparse),
+    ("seek lands just before the requested time", check_seek_lands_near_range),
+    ("time ranges match a full scan", check_range),
+    ("field filters match a full scan", check_filters),
+    ("an index past the journal end is ignored", check_stale_index),
+    ("--since/--until time formats", check_time_formats),
+    ("hook writes the journal and --query reads it", check_hook_writes_journal_and_query_cli),
+]
+
+# Run tests
+print("Running decision journal tests...\n")
+
+passed = 0
+failed = 0
+
+for name, check in test_cases:
+    if check():
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
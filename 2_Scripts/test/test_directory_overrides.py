@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for per-directory policy overrides (permissions.json directoryOverrides)
+Run with: python3 2_Scripts/test/test_directory_overrides.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template  # noqa: E402
+
+# Scratch project: relative override directories resolve against it
+project = os.path.realpath(tempfile.mkdtemp(prefix="cc-overrides-")).replace("\\", "/")
+os.makedirs(f"{project}/.claude/hooks")
+for directory in ("src", "vendor/lib", "build/out"):
+    os.makedirs(f"{project}/{directory}")
+hook = load_hook(script_path=f"{project}/.claude/hooks/unified-hook.py")
+
+permissions = load_permissions_template()
+permissions["directoryOverrides"] = {
+    "vendor": {"treatAs": {"edit": "risky"}},
+    "build": {"switches": {"risky": 1}},
+    "build/out": {"switches": {"risky": 0}},
+    f"{project}/src": {"switches": {"edit": 1}},
+    "C:\\Repo\\Generated": {"switches": {"edit": 1}},
+    "bad": ["not", "an", "object"],
+}
+engine = hook.PolicyEngine(permissions)
+
+
+def payload(tool_input, tool_name="Bash", mode="default", cwd=project):
+    return {"hook_event_name": "PreToolUse", "tool_name": tool_name, "permission_mode": mode,
+            "cwd": cwd, "tool_input": tool_input}
+
+
+# (name, payload, expected decision)
+test_cases = [
+    ("no override falls back to the mode", payload({"command": "touch ./docs/a.md"}), "ask"),
+    ("switches allow edits under src", payload({"command": "touch ./src/a.py"}), "allow"),
+    ("switches allow risky under build", payload({"command": "rm -rf ./build/tmp"}), "allow"),
+    ("deeper directory wins", payload({"command": "rm -rf ./build/out/x"}), "ask"),
+    ("working directory is used without paths", payload({"command": "rm -rf tmp"}, cwd=f"{project}/build"), "allow"),
+    ("any path that needs confirmation wins", payload({"command": "rm ./build/a ./docs/b"}), "ask"),
+    ("treatAs makes vendor edits risky", payload({"command": "touch ./vendor/lib/a"}, mode="acceptEdits"), "ask"),
+    ("treatAs leaves other edits alone", payload({"command": "touch ./docs/a"}, mode="acceptEdits"), "allow"),
+    ("tool file_path resolves overrides", payload({"file_path": f"{project}/src/main.py"}, "Edit"), "allow"),
+    ("tool treatAs applies", payload({"file_path": f"{project}/vendor/x.py"}, "Write", "acceptEdits"), "ask"),
+    ("globalDeny still wins", payload({"command": "rm -rf ~/x"}, cwd=f"{project}/build"), "deny"),
+    ("prefix is component-wise", payload({"command": "rm -rf ./build-other/x"}), "ask"),
+    ("drive paths match whatever their case",
+     payload({"file_path": "c:\\repo\\GENERATED\\api.py"}, "Edit", cwd="C:\\Repo"), "allow"),
+]
+
+# Run tests
+print("Running directory override tests...\n")
+
+passed = 0
+failed = 0
+
+for name, data, expected in test_cases:
+    result = engine.evaluate(data)
+    if result.decision == expected:
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        print(f"  Expected: {expected}")
+        print(f"  Got:      {result}")
+        print()
+        failed += 1
+
+# The workspace flag covers every path, not only the one that decided
+result = engine.evaluate(payload({"command": f"cat ./src/a.py {os.path.dirname(project)}/elsewhere.txt"}))
+if result.decision == "allow" and result.in_workspace is False:
+    print("✓ PASS: a read outside the workspace is reported outside")
+    passed += 1
+else:
+    print(f"✗ FAIL: expected allow outside the workspace, got {result}")
+    failed += 1
+
+# Invalid entries are dropped; each directory is indexed once (realpath == path here)
+if len(engine.override_trie()) == 5:
+    print("✓ PASS: invalid override entries are ignored")
+    passed += 1
+else:
+    print(f"✗ FAIL: expected 5 indexed directories, got {len(engine.override_trie())}")
+    failed += 1
+
+# Lookups walk the path components, whatever the number of directories
+trie = hook.PathTrie()
+for i in range(10000):
+    trie.insert(f"/data/d{i:05d}", i)
+trie.insert("/data/d00042/deep", "deep")
+if trie.longest_match("/data/d00042/deep/er/file") == "deep" \
+        and trie.longest_match("/data/d00042/x") == 42 and trie.longest_match("/data/d1") is None:
+    print("✓ PASS: path trie returns the most specific directory")
+    passed += 1
+else:
+    print("✗ FAIL: path trie lookup")
+    failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
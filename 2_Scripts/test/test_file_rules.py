@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for gitignore-style file rules (FileRuleMatcher / permissions.json fileRules)
+Run with: python3 2_Scripts/test/test_file_rules.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template  # noqa: E402
+
+hook = load_hook()
+
+# (patterns, path relative to the workspace, expected deciding pattern)
+test_cases = [
+    (["**/.env*"], ".env", "**/.env*"),
+    (["**/.env*"], "config/.env.local", "**/.env*"),
+    (["**/.env*"], "config/env", None),
+    (["*.pem"], "certs/server.pem", "*.pem"),
+    (["*.pem"], "certs/server.pem.bak", None),
+    (["secrets/"], "app/secrets/key.txt", "secrets/"),
+    (["/secrets"], "app/secrets/key.txt", None),
+    (["src/**"], "src/a/b.py", "src/**"),
+    (["src/**"], "src", None),
+    (["src/**"], "lib/src/a.py", None),
+    (["src/*.py"], "src/a.py", "src/*.py"),
+    (["src/*.py"], "src/pkg/a.py", None),
+    (["a/**/b"], "a/b", "a/**/b"),
+    (["a/**/b"], "a/x/y/b/c", "a/**/b"),
+    (["**/.env*", "!**/.env.example"], ".env.example", None),
+    (["**/.env*", "!**/.env.example"], ".env.production", "**/.env*"),
+    (["!keep.pem", "*.pem"], "keep.pem", "*.pem"),
+    (["# comment", "", "id_rsa"], "home/.ssh/id_rsa", "id_rsa"),
+    (["\\#notes"], "#notes", "\\#notes"),
+    (["file?.txt"], "file1.txt", "file?.txt"),
+    (["file?.txt"], "dir/file/.txt", None),
+    (["[!a]*.log"], "b.log", "[!a]*.log"),
+    (["[!a]*.log"], "a.log", None),
+    (["*"], "anything/at/all", "*"),
+]
+
+# Run tests
+print("Running file rule tests...\n")
+
+passed = 0
+failed = 0
+
+for patterns, path, expected in test_cases:
+    matcher = hook.FileRuleMatcher(patterns)
+    result = matcher.match(path)
+    restored = hook.FileRuleMatcher.from_state(matcher.to_state()).match(path)
+    if result == expected and restored == expected:
+        print(f"✓ PASS: {patterns} {path!r} -> {result!r}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {patterns} {path!r}")
+        print(f"  Expected: {expected!r}")
+        print(f"  Got:      {result!r} (restored: {restored!r})")
+        print()
+        failed += 1
+
+# Engine: fileRules are checked before the mode switches
+workspace = os.path.realpath(tempfile.mkdtemp(prefix="cc-file-rules-")).replace("\\", "/")
+permissions = load_permissions_template()
+permissions["fileRules"] = {
+    "read": {"deny": ["**/.env*", "**/*.pem", "!**/.env.example"]},
+    "edit": {"allow": ["src/**"], "ask": ["src/generated/"]},
+}
+engine = hook.PolicyEngine(permissions)
+
+
+def payload(tool_name, file_path, mode="default"):
+    return {"hook_event_name": "PreToolUse", "tool_name": tool_name, "permission_mode": mode,
+            "cwd": workspace, "tool_input": {"file_path": file_path}}
+
+
+# (name, payload, expected decision)
+engine_cases = [
+    ("read of .env is denied", payload("Read", ".env"), "deny"),
+    ("read of a key outside the workspace is denied", payload("Read", "/etc/ssl/private/site.pem"), "deny"),
+    ("negated pattern falls through to the mode", payload("Read", ".env.example"), "allow"),
+    ("read without a rule uses the mode", payload("Read", "README.md"), "allow"),
+    ("edit under src is allowed", payload("Edit", f"{workspace}/src/app/main.py"), "allow"),
+    ("ask wins over allow", payload("Write", "src/generated/api.py", "acceptEdits"), "ask"),
+    ("edit elsewhere uses the mode", payload("Edit", "docs/a.md"), "ask"),
+    ("rules of another category do not apply", payload("Edit", ".env", "acceptEdits"), "allow"),
+]
+for name, data, expected in engine_cases:
+    result = engine.evaluate(data)
+    if result.decision == expected:
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        print(f"  Expected: {expected}")
+        print(f"  Got:      {result}")
+        failed += 1
+
+# Drive paths are lowercased, the patterns are matched case-insensitively against them
+drive_engine = hook.PolicyEngine(dict(permissions, fileRules={"read": {"deny": ["Dockerfile", "*.PEM", "/Build/"]}}))
+drive_cases = [
+    ("C:\\Repo\\Dockerfile", "deny"),
+    ("certs\\site.pem", "deny"),
+    ("C:\\Repo\\build\\out.txt", "deny"),
+    ("C:\\Repo\\lib\\build\\out.txt", "allow"),
+    ("C:\\Repo\\README.md", "allow"),
+]
+drive_results = [drive_engine.evaluate({"hook_event_name": "PreToolUse", "tool_name": "Read",
+                                        "permission_mode": "default", "cwd": "C:\\Repo",
+                                        "tool_input": {"file_path": path}}) for path, _ in drive_cases]
+if [result.decision for result in drive_results] == [expected for _, expected in drive_cases] \
+        and drive_results[0].pattern == "Dockerfile":
+    print("✓ PASS: drive paths match fileRules whatever their case")
+    passed += 1
+else:
+    print("✗ FAIL: drive paths match fileRules whatever their case")
+    print(f"  Got: {drive_results}")
+    failed += 1
+
+# Thousands of rules: a lookup only tests the indexed candidates
+rules = [f"**/*.ext{i}" for i in range(2000)] + [f"dir{i}/**" for i in range(2000)] + ["**/.env*"]
+large = hook.FileRuleMatcher(rules)
+parts = "dir42/pkg/.env.local".split("/")
+candidates = large._candidates(parts)
+if large.match("dir42/pkg/.env.local") == "**/.env*" and len(candidates) <= 2 \
+        and large.match("x/a.ext1999") == "**/*.ext1999" and large.match("x/a.txt") is None:
+    print(f"✓ PASS: {len(rules)} rules, {len(candidates)} candidates tested")
+    passed += 1
+else:
+    print(f"✗ FAIL: {len(rules)} rules, {len(candidates)} candidates tested")
+    failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
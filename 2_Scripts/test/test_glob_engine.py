@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for the hook glob engine (match_glob / PatternMatcher)
+Run with: python3 2_Scripts/test/test_glob_engine.py
+"""
+
+import os
+import sys
+import marshal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template  # noqa: E402
+
+hook = load_hook()
+
+# (pattern, text, expected)
+test_cases = [
+    ("git status*", "git status", True),
+    ("git status*", "git status --short", True),
+    ("git status*", "git stash", False),
+    ("cat", "cat", True),
+    ("cat", "cat x", False),
+    ("* rm *", "cd build && rm -rf out", True),
+    ("* rm *", "skill rm", False),
+    ("* find * -delete*", "cd x; find . -name '*.o' -delete", True),
+    ("* find * -delete*", " find . -name x", False),
+    ("python*claude*", "python3 ~/.claude/hooks/x.py", True),
+    ("ls ?", "ls a", True),
+    ("ls ?", "ls ab", False),
+    ("echo *\n*", "echo a\nb", True),
+    ("**", "anything at all", True),
+    ("src/**/*.ts", "src/a/b/c.ts", True),
+    ("[abc]at", "bat", True),
+    ("[abc]at", "rat", False),
+    ("[!abc]at", "rat", True),
+    ("[a-c]*", "cp x", True),
+    ("[]]", "]", True),
+    ("[oops", "[oops", True),
+    ("{git,hg} status", "hg status", True),
+    ("{git,hg} status", "svn status", False),
+    ("npm {run,test}*", "npm test --watch", True),
+    ("{a,{b,c}}x", "cx", True),
+    (":(){ :|:& };:*", ":(){ :|:& };:", True),
+    ("\\*literal", "*literal", True),
+    ("\\*literal", "xliteral", False),
+    ("C:\\Windows*", "C:\\Windows\\System32", True),
+    ("del C:\\temp\\*", "del C:\\temp\\old.txt", True),
+    ("del C:\\temp\\*", "del C:\\temp", False),
+    ("type build\\*.log", "type build\\out.log", True),
+    ("\\\\server\\share\\*", "\\\\server\\share\\x", True),
+    ("echo \\\\*", "echo \\x", True),
+    ("", "", True),
+    ("", "x", False),
+]
+
+
+def check_pattern_matcher():
+    """PatternMatcher must agree with a per-pattern scan (first match in list order)"""
+    permissions = load_permissions_template()
+    samples = [
+        "git status", "git push --force origin", "rm -rf /tmp/x", "ls", "cd x && rm y",
+        "python3 claude.py", "curl -s http://x", "docker ps -a", "kill 1", "skill x",
+    ]
+    for category, config in permissions["categories"].items():
+        for list_type in ("tools", "commands"):
+            patterns = config[list_type]
+            matcher = hook.PatternMatcher(patterns)
+            # Same lookups through the marshal round trip of the policy cache
+            restored = hook.PatternMatcher.from_state(marshal.loads(marshal.dumps(matcher.to_state())))
+            for text in samples:
+                expected = next((p for p in patterns if hook.match_glob(text, p)), None)
+                if matcher.match(text) != expected or restored.match(text) != expected:
+                    return f"{category}.{list_type}: {text!r}"
+    return None
+
+
+def check_literal_gating():
+    """Overlapping and nested literals, classes, alternatives and literal-free patterns"""
+    patterns = ["* rm -rf*", "* rm *", "*he*", "*she*", "*[Hh]ers*", "*{abc,d?e}*", "?*", "*"]
+    texts = ["x rm -rf /", "x rm y", "ushers", "his", "Hers", "xabcx", "xdze", "xde", "a", ""]
+    matcher = hook.PatternMatcher(patterns)
+    for text in texts:
+        expected = next((p for p in patterns if hook.match_glob(text, p)), None)
+        if matcher.match(text) != expected:
+            return False
+    found = hook.scan_literals(hook.build_literal_automaton([("he", 0), ("she", 1), ("hers", 2), ("his", 3)]),
+                               "ushers")
+    return found == {0, 1, 2} and 4 in matcher._gated and 6 not in matcher._gated and 7 not in matcher._gated
+
+
+# Run tests
+print("Running glob engine tests...\n")
+
+passed = 0
+failed = 0
+
+for pattern, text, expected in test_cases:
+    result = hook.match_glob(text, pattern)
+    if result == expected:
+        print(f"✓ PASS: {pattern!r} ~ {text!r}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {pattern!r} ~ {text!r}")
+        print(f"  Expected: {expected}")
+        print(f"  Got:      {result}")
+        print()
+        failed += 1
+
+mismatch = check_pattern_matcher()
+if mismatch is None:
+    print("✓ PASS: PatternMatcher agrees with per-pattern scan")
+    passed += 1
+else:
+    print(f"✗ FAIL: PatternMatcher disagrees with per-pattern scan on {mismatch}")
+    failed += 1
+
+if check_literal_gating():
+    print("✓ PASS: literal automaton gates patterns without changing results")
+    passed += 1
+else:
+    print("✗ FAIL: literal automaton gates patterns without changing results")
+    failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
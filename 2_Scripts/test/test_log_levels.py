@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Test script for hook log levels (permissions.json logging section)
+Run with: python3 2_Scripts/test/test_log_levels.py
+"""
+
+import os
+import ast
+import sys
+import json
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import HOOK_TEMPLATE, load_hook, load_permissions_template, make_claude_dir  # noqa: E402
+
+hook = load_hook()
+
+
+def payload(command, mode="default"):
+    return {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": mode,
+            "cwd": "/repo", "tool_input": {"command": command}}
+
+
+def install(log_level, allow_sample_rate=1):
+    """Scratch .claude directory with the given logging section; returns (script, log file)"""
+    permissions = load_permissions_template()
+    permissions["logging"] = {"logLevel": log_level, "allowSampleRate": allow_sample_rate}
+    script_path = make_claude_dir(permissions)
+    return script_path, os.path.join(os.path.dirname(script_path), "hook-debug.log")
+
+
+def run(script_path, data):
+    result = subprocess.run([sys.executable, script_path], input=json.dumps(data).encode("utf-8"),
+                            capture_output=True)
+    return json.loads(result.stdout)["hookSpecificOutput"]["permissionDecision"]
+
+
+def log_lines(log_file):
+    if not os.path.exists(log_file):
+        return []
+    with open(log_file, "r", encoding="utf-8") as f:
+        return [line for line in f.read().splitlines() if line]
+
+
+def check_settings():
+    return hook.log_settings(None)[:2] == (hook.LOG_DECISION, 1.0) \
+        and hook.log_settings({"logLevel": "off"})[:2] == (hook.LOG_OFF, 1.0) \
+        and hook.log_settings({"logLevel": "decision", "allowSampleRate": 0.25})[:2] == (hook.LOG_DECISION, 0.25) \
+        and hook.log_settings({"logLevel": "verbose", "allowSampleRate": "x"})[:2] == (hook.LOG_DECISION, 1.0) \
+        and hook.log_settings({"allowSampleRate": 7})[:2] == (hook.LOG_DECISION, 1.0)
+
+
+def check_off_builds_no_messages():
+    # Trace messages are callables, never called below trace level
+    calls = []
+    built = []
+    hook.configure_logging(hook.log_settings({"logLevel": "off"}))
+    original = hook.log_debug
+
+    def counting_log_debug(message):
+        calls.append(message)
+        if callable(message):
+            build = message
+            message = lambda: built.append(build) or build()  # noqa: E731
+        original(message)
+
+    hook.log_debug = counting_log_debug
+    try:
+        engine = hook.PolicyEngine(load_permissions_template())
+        for command in ("git status && ls ./src", "rm -rf /", "cat a > ../b", "echo $(rm x)"):
+            engine.evaluate(payload(command))
+        engine.evaluate({"hook_event_name": "PreToolUse", "tool_name": "Edit", "permission_mode": "default",
+                         "cwd": "/repo", "tool_input": {"file_path": "/etc/hosts"}})
+    finally:
+        hook.log_debug = original
+        hook.configure_logging(None)
+    return len(calls) > 10 and built == []
+
+
+def check_call_sites_are_lazy():
+    # Every trace message is a literal or a callable, except in except blocks and
+    # in policy compilation (cold paths that run before logging is configured,
+    # where a held callable would see the names as they are later)
+    with open(HOOK_TEMPLATE, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    exempt = {id(node) for handler in ast.walk(tree)
+                if isinstance(handler, ast.ExceptHandler)
+                or isinstance(handler, ast.FunctionDef) and handler.name.startswith("compile_")
+                for node in ast.walk(handler)}
+    eager = [node.lineno for node in ast.walk(tree)
+             if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+             and node.func.id in ("log_debug", "log_block_start") and id(node) not in exempt
+             and not isinstance(node.args[0], (ast.Lambda, ast.Constant))
+             and not (isinstance(node.args[0], ast.Call) and not node.args[0].keywords)]
+    if eager:
+        print(f"  eager messages on lines {eager}")
+    return not eager
+
+
+def check_pending_messages():
+    # Messages logged before configure_logging() wait, unformatted, for the level
+    built = []
+    hook.LOG_LEVEL = None
+    hook.log_debug(lambda: built.append("dropped") or "dropped")
+    hook.configure_logging(hook.log_settings({"logLevel": "decision"}))
+    hook.LOG_LEVEL = None
+    hook.log_debug(lambda: built.append("kept") or "kept")
+    waiting = built == []
+    hook.configure_logging(hook.log_settings({"logLevel": "trace"}))
+    try:
+        if os.path.exists(hook.DEBUG_LOG):
+            os.remove(hook.DEBUG_LOG)
+        hook.log_block_start(lambda: "=== header ===")
+        hook.flush_log()
+        return waiting and built == ["kept"] and log_lines(hook.DEBUG_LOG) == ["=== header ===", "kept"]
+    finally:
+        hook.configure_logging(None)
+
+
+def check_off_writes_nothing():
+    script_path, log_file = install("off")
+    run(script_path, payload("git status"))
+    run(script_path, payload("git status"))  # decision cache hit
+    run(script_path, payload("rm -rf /"))
+    return not os.path.exists(log_file)
+
+
+def check_decision_level():
+    script_path, log_file = install("decision")
+    decisions = [run(script_path, payload(command)) for command in ("git status", "git status", "rm -rf /")]
+    lines = log_lines(log_file)
+    return decisions == ["allow", "allow", "deny"] and len(lines) == 3 \
+        and "-> allow (evaluated;" in lines[0] and "-> allow (cached;" in lines[1] \
+        and "-> deny" in lines[2] and "Received JSON" not in "".join(lines)
+
+
+def check_trace_level():
+    script_path, log_file = install("trace")
+    run(script_path, payload("git status"))
+    text = "\n".join(log_lines(log_file))
+    return "Received JSON" in text and "Compiled policy cache miss" in text and "-> allow" in text
+
+
+def check_allow_sampling():
+    script_path, log_file = install("decision", 0)
+    decisions = [run(script_path, payload(command)) for command in ("git status", "ls", "rm -rf /")]
+    lines = log_lines(log_file)
+    return decisions == ["allow", "allow", "deny"] and len(lines) == 1 and "-> deny" in lines[0]
+
+
+def check_concurrent_blocks():
+    # Each invocation's lines arrive in one write, so blocks never interleave
+    script_path, log_file = install("trace")
+    processes = []
+    for i in range(16):
+        process = subprocess.Popen([sys.executable, script_path], stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL)
+        process.stdin.write(json.dumps(payload(f"echo marker{i:02d} && ls ./src/marker{i:02d}")).encode("utf-8"))
+        process.stdin.close()
+        processes.append(process)
+    for process in processes:
+        process.wait()
+    with open(log_file, "r", encoding="utf-8") as f:
+        blocks = [block for block in f.read().split("\n=== ") if block.strip()]
+    markers = [{f"marker{i:02d}" for i in range(16) if f"marker{i:02d}" in block} for block in blocks]
+    return len(blocks) == 16 and all(len(found) == 1 for found in markers)
+
+
+def check_buffered_until_flush():
+    hook.configure_logging(hook.log_settings({"logLevel": "trace"}))
+    try:
+        if os.path.exists(hook.DEBUG_LOG):
+            os.remove(hook.DEBUG_LOG)
+        hook.log_debug("first")
+        hook.log_debug("second")
+        buffered = not os.path.exists(hook.DEBUG_LOG)
+        hook.flush_log()
+        return buffered and log_lines(hook.DEBUG_LOG) == ["first", "second"]
+    finally:
+        hook.configure_logging(None)
+
+
+test_cases = [
+    ("logging section is normalized", check_settings),
+    ("off: trace call sites never build a message", check_off_builds_no_messages),
+    ("trace messages on the evaluation path are lazy", check_call_sites_are_lazy),
+    ("messages before configure_logging() wait for the level", check_pending_messages),
+    ("off: no log file is written", check_off_writes_nothing),
+    ("decision: one line per decision, cache hits included", check_decision_level),
+    ("trace: every step is logged", check_trace_level),
+    ("allowSampleRate 0 drops allow lines only", check_allow_sampling),
+    ("lines are buffered until flush_log()", check_buffered_until_flush),
+    ("concurrent hooks write contiguous blocks", check_concurrent_blocks),
+]
+
+# Run tests
+print("Running log level tests...\n")
+
+passed = 0
+failed = 0
+
+for name, check in test_cases:
+    if check():
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
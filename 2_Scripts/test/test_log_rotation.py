@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for segmented hook log rotation and background compression
+Run with: python3 2_Scripts/test/test_log_rotation.py
+"""
+
+import os
+import sys
+import gzip
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, make_claude_dir  # noqa: E402
+
+hook = load_hook()
+hook.MAX_LOG_SIZE = 1000
+hooks_dir = os.path.dirname(hook.DEBUG_LOG)
+
+
+def configure(**logging):
+    hook.configure_logging(hook.log_settings(dict({"logLevel": "trace"}, **logging)))
+
+
+def reset():
+    for name in os.listdir(hooks_dir):
+        if name.startswith("hook-debug."):
+            os.remove(os.path.join(hooks_dir, name))
+
+
+def write_blocks(count, prefix="block"):
+    """Flush count blocks of about 200 bytes each"""
+    for i in range(count):
+        hook.log_block_start(f"=== {prefix} {i:04d} ===")
+        hook.log_debug("x" * 180)
+        hook.flush_log()
+
+
+def read(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return f.read().decode("utf-8")
+
+
+def check_segments_are_kept():
+    reset()
+    configure(maxSegments=2)
+    write_blocks(40)
+    segments = hook.list_log_segments()
+    return segments == [(1, False), (2, False)] \
+        and "block 0039" in read(hook.DEBUG_LOG) \
+        and os.path.getsize(hook.log_segment_path(1)) > hook.MAX_LOG_SIZE
+
+
+def check_no_line_is_split():
+    # Every segment starts at a block boundary and holds whole blocks
+    reset()
+    configure(maxSegments=5)
+    write_blocks(30)
+    paths = [hook.log_segment_path(index) for index, _ in hook.list_log_segments()]
+    if os.path.exists(hook.DEBUG_LOG):
+        paths.append(hook.DEBUG_LOG)
+    texts = [read(path) for path in paths]
+    blocks = [line for text in texts for line in text.splitlines() if line.startswith("=== block")]
+    return all(text.startswith("=== block") and text.endswith("x\n") for text in texts) \
+        and sorted(blocks) == [f"=== block {i:04d} ===" for i in range(30)]
+
+
+def check_zero_segments():
+    reset()
+    configure(maxSegments=0)
+    write_blocks(20)
+    return hook.list_log_segments() == [] and os.path.getsize(hook.DEBUG_LOG) <= hook.MAX_LOG_SIZE + 400
+
+
+def check_busy_lock_skips_rotation():
+    reset()
+    configure(maxSegments=2)
+    # Another process holds the lock, e.g. a running --compress-logs
+    holder = subprocess.Popen([sys.executable, "-c",
+                               "import fcntl, sys, time; f = open(sys.argv[1], 'a'); "
+                               "fcntl.flock(f, fcntl.LOCK_EX); print('locked', flush=True); time.sleep(30)",
+                               hook.LOG_LOCK], stdout=subprocess.PIPE)
+    try:
+        holder.stdout.readline()
+        write_blocks(10)
+        skipped = hook.list_log_segments() == [] and os.path.getsize(hook.DEBUG_LOG) > hook.MAX_LOG_SIZE
+    finally:
+        holder.kill()
+        holder.wait()
+    write_blocks(1, "after")
+    return skipped and hook.list_log_segments() == [(1, False)]
+
+
+def check_compression():
+    reset()
+    configure(maxSegments=3)
+    write_blocks(60)
+    before = {index: read(hook.log_segment_path(index)) for index, _ in hook.list_log_segments()}
+    hook.compress_log_segments()
+    after = hook.list_log_segments()
+    return after == [(1, False), (2, True), (3, True)] \
+        and all(read(hook.log_segment_path(index, compressed)) == before[index] for index, compressed in after)
+
+
+def check_compressed_segments_shift():
+    # Rotation renames .gz segments too and drops the oldest
+    write_blocks(10, "more")
+    return hook.list_log_segments() == [(1, False), (2, False), (3, True)]
+
+
+def check_compress_cli():
+    script_path = make_claude_dir()
+    segment = os.path.join(os.path.dirname(script_path), "hook-debug.2.log")
+    with open(segment, "w", encoding="utf-8") as f:
+        f.write("old segment\n")
+    result = subprocess.run([sys.executable, script_path, "--compress-logs"], capture_output=True)
+    return result.returncode == 0 and not os.path.exists(segment) and read(segment + ".gz") == "old segment\n"
+
+
+test_cases = [
+    ("rotation keeps maxSegments segments", check_segments_are_kept),
+    ("segments hold whole blocks, none lost", check_no_line_is_split),
+    ("maxSegments 0 starts a fresh log", check_zero_segments),
+    ("a held lock skips rotation until it is free", check_busy_lock_skips_rotation),
+    ("older segments are gzipped losslessly", check_compression),
+    ("compressed segments shift on rotation", check_compressed_segments_shift),
+    ("--compress-logs compresses from the command line", check_compress_cli),
+]
+if os.name == "nt":
+    test_cases.remove(("a held lock skips rotation until it is free", check_busy_lock_skips_rotation))
+
+# Run tests
+print("Running log rotation tests...\n")
+
+passed = 0
+failed = 0
+
+for name, check in test_cases:
+    if check():
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test script for the payload recorder (payloads.jsonl) and the workload generator
+Run with: python3 2_Scripts/test/test_payload_recorder.py
+"""
+
+import os
+import sys
+import json
+import stat
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template, make_claude_dir  # noqa: E402
+
+hook = load_hook()
+anonymizer = hook.PayloadAnonymizer(b"k" * 32, ["alice"])
+GENERATOR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "gen_payloads.py")
+
+
+def check_paths():
+    path = anonymizer.path("/Users/alice/Documents/acme-secret/src/.env")
+    windows = anonymizer.path("C:\\Users\\alice\\acme-secret\\main.py")
+    parts = path.split("/")
+    return parts[:4] == ["", "Users", "user", "Documents"] and parts[4].startswith("p") \
+        and parts[5:] == ["src", ".env"] and "acme" not in path \
+        and windows.startswith("C:\\Users\\user\\p") and windows.endswith(".py") \
+        and anonymizer.path("../acme-secret/a.py") == "../" + parts[4] + "/" + anonymizer.component("a.py")
+
+
+def check_tokens_are_stable():
+    other = hook.PayloadAnonymizer(b"k" * 32)
+    return anonymizer.component("acme") == other.component("acme") \
+        and anonymizer.component("acme") != hook.PayloadAnonymizer(b"j" * 32).component("acme")
+
+
+def check_commands():
+    command = anonymizer.command("cd /home/alice/acme && git commit -m 'ship acme' && cat notes.txt | grep TODO")
+    heredoc = anonymizer.command("cat <<'EOF' > plan.md\nsecret plan\nEOF\nls ./src")
+    return command.startswith("cd /home/user/p") and "git commit -m 'xxxx xxxx'" in command \
+        and "| grep TODO" in command and "acme" not in command and "notes" not in command \
+        and heredoc.startswith("cat <<'EOF' > p") and "\nxxxxxx xxxx\nEOF\nls ./src" in heredoc
+
+
+def check_secrets_in_commands():
+    command = anonymizer.command("export API_KEY=sk-live-123 && mysql -palicepw --host=db1 db && ls -la ./ALICE-notes")
+    kept = anonymizer.command("find . -name x -delete && tar -xzvf a.tgz && rm -rf /tmp")
+    return command.startswith("export API_KEY=xxxxxxxxxxx && mysql -pxxxxxxx --host=xxx db && ls -la ./") \
+        and "sk-live" not in command and "alice" not in command.lower() \
+        and kept.startswith("find . -name x -delete && tar -xzvf p") and kept.endswith(" && rm -rf /tmp")
+
+
+def check_payload():
+    data = anonymizer.payload({
+        "session_id": "abc", "cwd": "/home/alice/acme", "hook_event_name": "PreToolUse",
+        "permission_mode": "acceptEdits", "tool_name": "Write",
+        "tool_input": {"file_path": "/home/alice/acme/app.py", "content": "password = 'hunter2'"},
+    })
+    return data["session_id"].startswith("s") and data["session_id"] != "abc" \
+        and data["cwd"].startswith("/home/user/p") and data["tool_input"]["file_path"].startswith(data["cwd"] + "/") \
+        and data["tool_input"]["content"] == "xxxxxxxx x xxxxxxxxx" \
+        and (data["hook_event_name"], data["permission_mode"], data["tool_name"]) \
+        == ("PreToolUse", "acceptEdits", "Write")
+
+
+def check_mcp_input_is_redacted():
+    data = anonymizer.payload({"tool_name": "mcp__github__create_issue",
+                               "tool_input": {"repo": "alice/acme", "title": "Leak", "path": "/home/alice/x", "n": 3}})
+    return data["tool_input"] == {"repo": "xxxxxxxxxx", "title": "xxxx", "path": anonymizer.path("/home/alice/x"), "n": 3}
+
+
+def check_hook_records_and_replays():
+    permissions = load_permissions_template()
+    permissions["logging"] = {"logLevel": "off", "record": 1}
+    script_path = make_claude_dir(permissions)
+    hooks_dir = os.path.dirname(script_path)
+    payloads = [
+        {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": "default",
+         "cwd": "/home/alice/acme", "tool_input": {"command": command}}
+        for command in ("git status", "cat ./secret-notes.md", "rm -rf /home/alice/acme", "cat /etc/hosts")
+    ]
+    decisions = []
+    for data in payloads:
+        result = subprocess.run([sys.executable, script_path], input=json.dumps(data).encode("utf-8"),
+                                capture_output=True)
+        decisions.append(json.loads(result.stdout)["hookSpecificOutput"]["permissionDecision"])
+    corpus = os.path.join(hooks_dir, "payloads.jsonl")
+    with open(corpus, "r", encoding="utf-8") as f:
+        text = f.read()
+    replay = subprocess.run([sys.executable, script_path, "--batch", corpus], capture_output=True)
+    replayed = [json.loads(line)["hookSpecificOutput"]["permissionDecision"] for line in replay.stdout.splitlines()]
+    key_mode = stat.S_IMODE(os.stat(os.path.join(hooks_dir, "payloads.key")).st_mode)
+    return len(text.splitlines()) == 4 and "secret" not in text and "acme" not in text \
+        and replayed == decisions and (os.name == "nt" or key_mode == 0o600)
+
+
+def check_recording_off_by_default():
+    script_path = make_claude_dir()
+    data = {"hook_event_name": "PreToolUse", "tool_name": "Bash", "cwd": "/repo", "tool_input": {"command": "ls"}}
+    subprocess.run([sys.executable, script_path], input=json.dumps(data).encode("utf-8"), capture_output=True)
+    return not os.path.exists(os.path.join(os.path.dirname(script_path), "payloads.jsonl"))
+
+
+def generate(*args):
+    result = subprocess.run([sys.executable, GENERATOR, *args], capture_output=True, text=True)
+    return [json.loads(line) for line in result.stdout.splitlines()]
+
+
+def check_generator():
+    first = generate("--count", "500", "--seed", "7")
+    again = generate("--count", "500", "--seed", "7")
+    mcp_only = generate("--count", "200", "--mix", "mcp=1", "--modes", "plan=1")
+    tools = {payload["tool_name"] for payload in first}
+    compound = [p for p in first if p["tool_name"] == "Bash" and "&&" in p["tool_input"]["command"]]
+    return len(first) == 500 and first == again and "Bash" in tools and {"Read", "Edit"} <= tools \
+        and any(tool.startswith("mcp__") for tool in tools) and compound \
+        and all(p["tool_name"].startswith("mcp__") and p["permission_mode"] == "plan" for p in mcp_only)
+
+
+def check_generator_evaluates():
+    result = subprocess.run([sys.executable, GENERATOR, "--count", "300", "--evaluate"], capture_output=True, text=True)
+    return result.returncode == 0 and result.stdout.startswith("300 payloads") and "allow" in result.stdout
+
+
+test_cases = [
+    ("paths keep their shape, names become tokens", check_paths),
+    ("tokens depend only on the key", check_tokens_are_stable),
+    ("commands: paths, file names, quotes, heredocs", check_commands),
+    ("commands: assignment values, attached option values, user names in words", check_secrets_in_commands),
+    ("payload fields and file contents", check_payload),
+    ("MCP arguments are redacted", check_mcp_input_is_redacted),
+    ("hook records anonymized payloads that replay with --batch", check_hook_records_and_replays),
+    ("record off: no corpus is written", check_recording_off_by_default),
+    ("generator mix, modes and seed", check_generator),
+    ("generator --evaluate runs the evaluation path", check_generator_evaluates),
+]
+
+# Run tests
+print("Running payload recorder tests...\n")
+
+passed = 0
+failed = 0
+
+for name, check in test_cases:
+    if check():
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled policy sidecar (permissions.compiled)
+Run with: python3 2_Scripts/test/test_policy_cache.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template, make_claude_dir  # noqa: E402
+
+hook = load_hook()
+hook.configure_logging(hook.log_settings({"logLevel": "off"}))
+
+# Counts content hashes, i.e. lookups the stat data could not decide
+hashes = []
+policy_digest = hook._policy_digest
+
+
+def counting_digest(source):
+    hashes.append(source)
+    return policy_digest(source)
+
+
+hook._policy_digest = counting_digest
+
+
+def write_permissions(commands, age=None):
+    """Fresh permissions.json whose read commands are commands, optionally backdated age seconds"""
+    permissions = load_permissions_template()
+    permissions["categories"]["read"]["commands"] = commands
+    permissions_file = os.path.join(os.path.dirname(os.path.dirname(make_claude_dir(permissions))),
+                                    "permissions.json")
+    if age is not None:
+        mtime_ns = time.time_ns() - age * 10**9
+        os.utime(permissions_file, ns=(mtime_ns, mtime_ns))
+    return permissions_file
+
+
+def read_patterns(permissions_file):
+    return list(hook.load_policy(permissions_file)["categories"]["read"]["commands"].patterns)
+
+
+def check_restored_mtime_edit():
+    # Same-size edit right after the sidecar was written, mtime put back
+    permissions_file = write_permissions(["ls *"])
+    read_patterns(permissions_file)
+    stat_result = os.stat(permissions_file)
+    with open(permissions_file, "r+b") as f:
+        source = f.read()
+        f.seek(0)
+        f.write(source.replace(b'"ls *"', b'"lz *"'))
+    os.utime(permissions_file, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    return os.stat(permissions_file).st_size == stat_result.st_size and read_patterns(permissions_file) == ["lz *"]
+
+
+def check_racy_entry_is_hashed():
+    # permissions.json written in the same tick as the sidecar: stat data proves nothing
+    permissions_file = write_permissions(["ls *"])
+    read_patterns(permissions_file)
+    del hashes[:]
+    return read_patterns(permissions_file) == ["ls *"] and len(hashes) == 1
+
+
+def check_old_file_hits_on_stat():
+    permissions_file = write_permissions(["ls *"], age=60)
+    read_patterns(permissions_file)
+    del hashes[:]
+    return read_patterns(permissions_file) == ["ls *"] and read_patterns(permissions_file) == ["ls *"] \
+        and not hashes
+
+
+def check_touch_refreshes_sidecar():
+    permissions_file = write_permissions(["ls *"], age=60)
+    read_patterns(permissions_file)
+    mtime_ns = time.time_ns() - 30 * 10**9
+    os.utime(permissions_file, ns=(mtime_ns, mtime_ns))
+    del hashes[:]
+    first = read_patterns(permissions_file)
+    hashed = len(hashes)
+    second = read_patterns(permissions_file)
+    return first == second == ["ls *"] and hashed == 1 and len(hashes) == 1
+
+
+def check_corrupt_sidecar_is_rebuilt():
+    permissions_file = write_permissions(["ls *"], age=60)
+    cache_file = os.path.join(os.path.dirname(permissions_file), hook.POLICY_CACHE_NAME)
+    with open(cache_file, "wb") as f:
+        f.write(b"\x00garbage")
+    return read_patterns(permissions_file) == ["ls *"] and read_patterns(permissions_file) == ["ls *"]
+
+
+test_cases = [
+    ("same-size edit with restored mtime is not served stale", check_restored_mtime_edit),
+    ("racily clean sidecar falls back to the content hash", check_racy_entry_is_hashed),
+    ("settled permissions.json hits on stat data alone", check_old_file_hits_on_stat),
+    ("touch without edit hashes once, then hits on stat", check_touch_refreshes_sidecar),
+    ("corrupt sidecar is rebuilt", check_corrupt_sidecar_is_rebuilt),
+]
+
+# Run tests
+print("Running policy cache tests...\n")
+
+passed = 0
+failed = 0
+
+for name, check in test_cases:
+    if check():
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
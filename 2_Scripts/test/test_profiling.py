@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for the profiling mode (hook-profile.folded, hook-profile.txt)
+Run with: python3 2_Scripts/test/test_profiling.py
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template, make_claude_dir  # noqa: E402
+
+hook = load_hook()
+
+PAYLOAD = {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": "default",
+           "cwd": "/repo", "tool_input": {"command": "git status && cat ./a | grep x > ../b"}}
+
+# cProfile stats layout: func -> (primitive calls, calls, self time, cumulative time, callers)
+# with callers: caller -> (primitive calls, calls, self time, cumulative time) of that edge
+MAIN = ("app.py", 1, "main")
+LOAD = ("app.py", 10, "load")
+CHECK = ("app.py", 20, "check")
+MATCH = ("app.py", 30, "match")
+SPLIT = ("~", 0, "<method 'split' of 'str' objects>")
+STATS = {
+    MAIN: (1, 1, 0.001, 0.010, {}),
+    LOAD: (1, 1, 0.002, 0.003, {MAIN: (1, 1, 0.002, 0.003)}),
+    CHECK: (1, 1, 0.001, 0.006, {MAIN: (1, 1, 0.001, 0.006)}),
+    # match is called from load (1 ms) and from check (3 ms)
+    MATCH: (4, 4, 0.004, 0.004, {LOAD: (1, 1, 0.001, 0.001), CHECK: (3, 3, 0.003, 0.003)}),
+    SPLIT: (2, 2, 0.002, 0.002, {CHECK: (2, 2, 0.002, 0.002)}),
+}
+
+
+def run(script_path, args=(), env=None):
+    return subprocess.run([sys.executable, script_path, *args], input=json.dumps(PAYLOAD).encode("utf-8"),
+                          capture_output=True, env=dict(os.environ, **(env or {})))
+
+
+def profile_files(script_path):
+    hooks_dir = os.path.dirname(script_path)
+    return os.path.join(hooks_dir, "hook-profile.folded"), os.path.join(hooks_dir, "hook-profile.txt")
+
+
+def check_frame_names():
+    return hook.profile_frame_name(("/x/unified-hook.py", 12, "dispatch")) == "dispatch (unified-hook.py:12)" \
+        and hook.profile_frame_name(SPLIT) == "<method 'split' of 'str' objects>" \
+        and hook.profile_frame_name(("a.py", 1, "f;g")) == "f,g (a.py:1)"
+
+
+def check_collapsed_stacks():
+    main, load, check, match = "main (app.py:1)", "load (app.py:10)", "check (app.py:20)", "match (app.py:30)"
+    return hook.collapse_profile(STATS) == {
+        main: 1000,
+        f"{main};{load}": 2000,
+        f"{main};{load};{match}": 1000,
+        f"{main};{check}": 1000,
+        f"{main};{check};{match}": 3000,
+        f"{main};{check};<method 'split' of 'str' objects>": 2000,
+    }
+
+
+def check_recursion_is_cut():
+    stats = {
+        MAIN: (1, 1, 0.001, 0.003, {}),
+        MATCH: (1, 3, 0.002, 0.002, {MAIN: (1, 1, 0.002, 0.002), MATCH: (0, 2, 0.001, 0.001)}),
+    }
+    return hook.collapse_profile(stats) == {"main (app.py:1)": 1000, "main (app.py:1);match (app.py:30)": 2000}
+
+
+def check_off_by_default():
+    script_path = make_claude_dir(load_permissions_template())
+    result = run(script_path, env={hook.PROFILE_ENV: "0"})
+    return json.loads(result.stdout)["hookSpecificOutput"]["permissionDecision"] == "ask" \
+        and not any(os.path.exists(path) for path in profile_files(script_path))
+
+
+def check_environment_variable():
+    script_path = make_claude_dir(load_permissions_template())
+    result = run(script_path, env={hook.PROFILE_ENV: "1"})
+    folded_path, summary_path = profile_files(script_path)
+    with open(folded_path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    with open(summary_path, "r", encoding="utf-8") as f:
+        summary = f.read()
+    stacks = [line.rsplit(" ", 1) for line in lines]
+    return result.returncode == 0 and result.stderr == b"" \
+        and json.loads(result.stdout)["hookSpecificOutput"]["permissionDecision"] == "ask" \
+        and all(stack.startswith("run_invocation (") and int(us) > 0 for stack, us in stacks) \
+        and any("lex_command (" in stack for stack, _ in stacks) \
+        and "Peak traced memory:" in summary and "cumulative" in summary
+
+
+def check_profile_flag():
+    script_path = make_claude_dir(load_permissions_template())
+    result = run(script_path, ["--profile"])
+    return json.loads(result.stdout)["hookSpecificOutput"]["permissionDecision"] == "ask" \
+        and all(os.path.exists(path) for path in profile_files(script_path))
+
+
+test_cases = [
+    ("frame names are flame graph safe", check_frame_names),
+    ("shared callees are split by edge time", check_collapsed_stacks),
+    ("recursive edges are not followed", check_recursion_is_cut),
+    ("no profile unless asked for", check_off_by_default),
+    ("CC_PERMISSION_HOOK_PROFILE=1 writes stacks and summary", check_environment_variable),
+    ("--profile profiles one invocation", check_profile_flag),
+]
+
+# Run tests
+print("Running profiling tests...\n")
+
+passed = 0
+failed = 0
+
+for name, check in test_cases:
+    if check():
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
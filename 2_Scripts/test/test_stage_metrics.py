@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Test script for stage latency metrics (hook-metrics.bin, --metrics)
+Run with: python3 2_Scripts/test/test_stage_metrics.py
+"""
+
+import os
+import sys
+import json
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template, make_claude_dir  # noqa: E402
+
+hook = load_hook()
+hook.configure_logging(hook.log_settings({"logLevel": "off", "metrics": 1}))
+
+STAGES = len(hook.METRIC_STAGES)
+
+
+def payload(command, mode="default"):
+    return {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": mode,
+            "cwd": "/repo", "tool_input": {"command": command}}
+
+
+def counters():
+    with open(hook.METRICS_FILE, "rb") as f:
+        return memoryview(f.read()[8:]).cast("Q").tolist()
+
+
+def series(event, mode, stage):
+    """(bucket counts, count, sum) of one series"""
+    values = counters()
+    base = hook.series_offset(hook.METRIC_EVENTS.index(event), hook.METRIC_MODES.index(mode),
+                              hook.METRIC_STAGES.index(stage)) - 1
+    return values[base:base + hook.SERIES_WORDS - 2], values[base + hook.SERIES_WORDS - 2], \
+        values[base + hook.SERIES_WORDS - 1]
+
+
+def reset():
+    if os.path.exists(hook.METRICS_FILE):
+        os.remove(hook.METRICS_FILE)
+
+
+def record(data, stage_seconds):
+    hook.start_metrics(data, hook.time.perf_counter())
+    for stage, seconds in stage_seconds.items():
+        hook.add_stage_time(hook.METRIC_STAGES.index(stage), seconds)
+    hook.flush_metrics()
+
+
+def check_file_is_created():
+    reset()
+    record(payload("ls"), {"stdin": 0.00003})
+    return os.path.getsize(hook.METRICS_FILE) == hook.METRICS_SIZE \
+        and series("PreToolUse", "default", "stdin") == ([1] + [0] * len(hook.LATENCY_BUCKETS_US), 1, 30)
+
+
+def check_buckets():
+    record(payload("ls", "plan"), {"lex": 0.0003})
+    record(payload("ls", "plan"), {"lex": 0.0003})
+    record(payload("ls", "plan"), {"lex": 5.0})
+    buckets, count, total = series("PreToolUse", "plan", "lex")
+    return buckets[hook.LATENCY_BUCKETS_US.index(500)] == 2 and buckets[-1] == 1 and count == 3 \
+        and total == 5000600 and series("PreToolUse", "plan", "total")[1] == 3
+
+
+def check_unknown_labels():
+    record({"hook_event_name": "Other", "permission_mode": "yolo"}, {"config": 0.001})
+    return series("other", "other", "config")[1] == 1
+
+
+def check_increments_in_place():
+    # Counters are updated in the existing file, never replaced
+    inode = os.stat(hook.METRICS_FILE).st_ino
+    record(payload("ls"), {"stdin": 0.00003})
+    return os.stat(hook.METRICS_FILE).st_ino == inode and series("PreToolUse", "default", "stdin")[1] == 2
+
+
+def check_bad_layout_is_recreated():
+    with open(hook.METRICS_FILE, "wb") as f:
+        f.write(b"garbage")
+    record(payload("ls"), {"stdin": 0.00003})
+    return series("PreToolUse", "default", "stdin")[1] == 1
+
+
+def check_disabled_writes_nothing():
+    os.remove(hook.METRICS_FILE)
+    hook.configure_logging(hook.log_settings({"logLevel": "off"}))
+    try:
+        record(payload("ls"), {"stdin": 0.00003})
+        return not os.path.exists(hook.METRICS_FILE)
+    finally:
+        hook.configure_logging(hook.log_settings({"logLevel": "off", "metrics": 1}))
+
+
+def check_threads_are_separate():
+    # Concurrent invocations (daemon request threads) keep their own stages
+    reset()
+    started = threading.Barrier(2)
+    recorded = threading.Barrier(2)
+
+    def invocation(mode, seconds):
+        hook.start_metrics(payload("ls", mode), hook.time.perf_counter())
+        started.wait()
+        hook.add_stage_time(hook.STAGE_LEX, seconds)
+        recorded.wait()
+        hook.flush_metrics()
+
+    threads = [threading.Thread(target=invocation, args=args) for args in (("plan", 0.0003), ("default", 5.0))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return series("PreToolUse", "plan", "lex")[1:] == (1, 300) \
+        and series("PreToolUse", "default", "lex")[1:] == (1, 5000000) and not hook._metrics
+
+
+def check_session_records_requests():
+    # Daemon and batch requests (PolicySession) are timed and flushed one by one
+    permissions = load_permissions_template()
+    permissions["logging"] = {"logLevel": "off", "metrics": 1}
+    permissions_file = os.path.join(os.path.dirname(os.path.dirname(make_claude_dir(permissions))),
+                                    "permissions.json")
+    reset()
+    session = hook.PolicySession(permissions_file, "batch")
+    try:
+        for command in ("git status && ls ./src", "rm -rf /"):
+            session.evaluate(json.dumps(payload(command, "acceptEdits")).encode("utf-8"))
+        first = series("PreToolUse", "acceptEdits", "total")[1]
+        session.evaluate(json.dumps(payload("ls", "acceptEdits")).encode("utf-8"))
+    finally:
+        hook.configure_logging(hook.log_settings({"logLevel": "off", "metrics": 1}))
+    return first == 2 and series("PreToolUse", "acceptEdits", "total")[1] == 3 \
+        and series("PreToolUse", "acceptEdits", "config")[1] == 3 \
+        and series("PreToolUse", "acceptEdits", "lex")[1] == 3 \
+        and series("PreToolUse", "acceptEdits", "startup")[1] == 0
+
+
+def check_quantiles():
+    # 100 samples: 90 in (0, 50us], 10 in (1ms, 2.5ms]
+    buckets = [90, 0, 0, 0, 0, 10] + [0] * (len(hook.LATENCY_BUCKETS_US) - 5)
+    return hook.histogram_quantile(buckets, 100, 0.5) == 50 * 50 / 90 \
+        and hook.histogram_quantile(buckets, 100, 0.99) == 1000 + 1500 * 9 / 10 \
+        and hook.histogram_quantile([0] * len(hook.LATENCY_BUCKETS_US) + [1], 1, 0.99) \
+        == hook.LATENCY_BUCKETS_US[-1]
+
+
+def check_hook_records_and_exports():
+    permissions = load_permissions_template()
+    permissions["logging"] = {"logLevel": "off", "metrics": 1}
+    script_path = make_claude_dir(permissions)
+    for command in ("git status && ls ./src", "git status && ls ./src", "rm -rf /"):
+        subprocess.run([sys.executable, script_path], input=json.dumps(payload(command)).encode("utf-8"),
+                       capture_output=True)
+    subprocess.run([sys.executable, script_path], input=json.dumps({"hook_event_name": "Stop"}).encode("utf-8"),
+                   capture_output=True)
+    output_path = os.path.join(os.path.dirname(script_path), "hook.prom")
+    result = subprocess.run([sys.executable, script_path, "--metrics", output_path], capture_output=True)
+    with open(output_path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    name = "cc_permission_hook_stage_seconds"
+    labels = 'event="PreToolUse",mode="default"'
+    return result.returncode == 0 and lines[-1] == "# EOF" \
+        and f'{name}_count{{{labels},stage="total"}} 3' in lines \
+        and f'{name}_count{{{labels},stage="lex"}} 2' in lines \
+        and f'{name}_bucket{{{labels},stage="startup",le="+Inf"}} 3' in lines \
+        and any(line.startswith(f'{name}_count{{event="Stop",mode="other",stage="config"}}') for line in lines) \
+        and any(line.startswith(f'cc_permission_hook_stage_quantile_seconds{{{labels},stage="total",quantile="0.99"}}')
+                for line in lines)
+
+
+test_cases = [
+    ("counters file is created on first use", check_file_is_created),
+    ("samples land in the right bucket", check_buckets),
+    ("unknown events and modes fold into other", check_unknown_labels),
+    ("counters are incremented in place", check_increments_in_place),
+    ("a file of another layout is recreated", check_bad_layout_is_recreated),
+    ("metrics off: no file is written", check_disabled_writes_nothing),
+    ("concurrent invocations are timed separately", check_threads_are_separate),
+    ("daemon and batch requests are recorded per request", check_session_records_requests),
+    ("p50/p99 interpolate within buckets", check_quantiles),
+    ("hook records stages, --metrics exports OpenMetrics", check_hook_records_and_exports),
+]
+
+# Run tests
+print("Running stage metrics tests...\n")
+
+passed = 0
+failed = 0
+
+for name, check in test_cases:
+    if check():
+        print(f"✓ PASS: {name}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        failed += 1
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
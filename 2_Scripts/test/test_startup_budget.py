@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Startup budget test for the installed hook
+Runs the hook as the installer lays it out (launcher plus the release
+unified_hook module with its precompiled bytecode, see build_hooks.py) on a
+PreToolUse and a Stop payload and checks:
+- the PreToolUse path does not import subprocess / platform / datetime etc.
+  (python -X importtime)
+- the summed self import time, in microseconds, of every module PreToolUse
+  imports beyond `python -c "import json"` (the hook module included) stays
+  under IMPORT_BUDGET_RATIO times the summed import time of `import json`
+  itself, fastest of alternating runs each, so a new heavy import fails even
+  if it is not listed above
+- the median wall time of each event stays under WALL_BUDGET_RATIO times the
+  median wall time of `python -c pass`, measured in alternating runs so a slow
+  or loaded machine scales both alike. Wall time covers everything a tool
+  call waits for: interpreter start, compiling or loading the hook, imports
+  and the decision itself.
+Run with: python3 2_Scripts/test/test_startup_budget.py [--budget-ratio R] [--import-budget-ratio R]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import build_hooks  # noqa: E402
+from hook_loader import load_permissions_template  # noqa: E402
+
+# Hook wall time allowed per event, as a multiple of `python -c pass`
+# (about 2.4 when written; compiling the hook on every call made it about 6)
+WALL_BUDGET_RATIO = 3.0
+# Summed self import time of PreToolUse beyond `import json`, as a multiple of
+# the summed import time of `import json` (about 0.33 when written: about
+# 6000us, mostly unified_hook and _hashlib, against about 18000us)
+IMPORT_BUDGET_RATIO = 0.5
+# Modules only the notification, daemon and --locate-log paths may import
+FORBIDDEN_MODULES = ("subprocess", "platform", "datetime", "threading", "socket", "signal")
+RUNS = 11
+
+BASELINE = ["-c", "pass"]
+
+
+def install_release(permissions):
+    """Build the release hook and lay it out like the installer; returns the launcher path"""
+    out_dir = tempfile.mkdtemp(prefix="cc-build-")
+    build_hooks.build(out_dir, ["en_US"])
+    claude_dir = os.path.join(tempfile.mkdtemp(prefix="cc-hook-"), ".claude")
+    shutil.copytree(os.path.join(out_dir, "en_US", "release"), os.path.join(claude_dir, "hooks"))
+    with open(os.path.join(claude_dir, "permissions.json"), "w", encoding="utf-8") as f:
+        json.dump(permissions, f, indent=2)
+    return os.path.join(claude_dir, "hooks", build_hooks.LAUNCHER_NAME)
+
+
+def import_times(args, stdin=b""):
+    """Run python -X importtime with args; return ({module: self microseconds}, stdout)"""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, input=stdin, capture_output=True)
+    times = {}
+    for line in result.stderr.decode("utf-8", errors="replace").splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, name = line.split(":", 1)[1].split("|")
+        times[name.strip()] = int(self_us)
+    return times, result.stdout
+
+
+def wall_time(args, stdin=b""):
+    """Run python with args; return (elapsed seconds, stdout)"""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable] + args, input=stdin, capture_output=True)
+    return time.perf_counter() - started, result.stdout
+
+
+def pre_tool_use(i):
+    """PreToolUse payloads, distinct per run so the decision cache never answers"""
+    if i % 2:
+        return {"hook_event_name": "PreToolUse", "tool_name": "Read", "permission_mode": "default",
+                "cwd": "/repo", "tool_input": {"file_path": f"/repo/src/file{i}.py"}}
+    return {"hook_event_name": "PreToolUse", "tool_name": "Bash", "permission_mode": "default",
+            "cwd": "/repo", "tool_input": {"command": f"cd ./src && grep -rn TODO . | sort > /tmp/todo{i}.txt"}}
+
+
+def stop(i):
+    """Stop payloads; notifications are disabled so no notifier process is timed"""
+    return {"hook_event_name": "Stop", "session_id": f"session-{i}"}
+
+
+def check_imports(script_path):
+    """PreToolUse runs import none of FORBIDDEN_MODULES; returns (failure messages, extra, baseline)
+
+    extra is the fastest run's {module: self microseconds} beyond `import json`,
+    baseline the fastest summed self microseconds of `import json` in
+    alternating runs.
+    """
+    failures, extra_times, baseline_us = [], [], []
+    for i in range(1, RUNS + 1):
+        baseline, _ = import_times(["-c", "import json"])
+        baseline_us.append(sum(baseline.values()))
+        times, stdout = import_times([script_path], json.dumps(pre_tool_use(i)).encode("utf-8"))
+        forbidden = [name for name in FORBIDDEN_MODULES if name in times and name not in baseline]
+        if not stdout or forbidden:
+            failures.append(f"run {i} output={stdout!r} forbidden imports={forbidden}")
+        extra_times.append({name: us for name, us in times.items() if name not in baseline})
+    return failures, min(extra_times, key=lambda times: sum(times.values())), min(baseline_us)
+
+
+def check_wall_time(script_path, make_payload, budget_ratio):
+    """Median hook and baseline wall times over alternating runs; returns (hook, baseline, outputs)"""
+    hook_times, baseline_times, outputs = [], [], []
+    for i in range(1, RUNS + 1):
+        baseline_times.append(wall_time(BASELINE)[0])
+        elapsed, stdout = wall_time([script_path], json.dumps(make_payload(i)).encode("utf-8"))
+        hook_times.append(elapsed)
+        outputs.append(stdout)
+    return statistics.median(hook_times), statistics.median(baseline_times), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the wall time of the installed hook")
+    parser.add_argument("--budget-ratio", type=float, default=WALL_BUDGET_RATIO,
+                        help="allowed hook wall time as a multiple of `python -c pass`")
+    parser.add_argument("--import-budget-ratio", type=float, default=IMPORT_BUDGET_RATIO,
+                        help="allowed import time beyond `import json` as a multiple of `import json`")
+    args = parser.parse_args()
+
+    permissions = load_permissions_template()
+    permissions["notifications"]["enabled"] = 0
+    script_path = install_release(permissions)
+
+    # Warm-up: builds the compiled policy sidecar like the first real tool call
+    wall_time([script_path], json.dumps(pre_tool_use(0)).encode("utf-8"))
+
+    print("Running startup budget test...\n")
+
+    passed = 0
+    failed = 0
+
+    failures, extra, baseline_us = check_imports(script_path)
+    if failures:
+        for failure in failures:
+            print(f"✗ FAIL: {failure}")
+        failed += 1
+    else:
+        print(f"✓ PASS: PreToolUse imported none of {', '.join(FORBIDDEN_MODULES)}")
+        passed += 1
+
+    import_us = sum(extra.values())
+    import_budget = args.import_budget_ratio * baseline_us
+    summary = (f"PreToolUse imports beyond `import json` took {import_us}us at best "
+               f"(budget {import_budget:.0f}us = {args.import_budget_ratio}x import json {baseline_us}us)")
+    if import_us <= import_budget:
+        print(f"✓ PASS: {summary}")
+        passed += 1
+    else:
+        top = sorted(extra.items(), key=lambda item: -item[1])[:5]
+        print(f"✗ FAIL: {summary}; heaviest: {', '.join(f'{name} {us}us' for name, us in top)}")
+        failed += 1
+
+    for event, make_payload, expect_output in (("PreToolUse", pre_tool_use, True), ("Stop", stop, False)):
+        hook, baseline, outputs = check_wall_time(script_path, make_payload, args.budget_ratio)
+        budget = args.budget_ratio * baseline
+        summary = (f"{event} took {hook * 1000:.1f}ms median "
+                   f"(budget {budget * 1000:.1f}ms = {args.budget_ratio}x python -c pass {baseline * 1000:.1f}ms)")
+        if expect_output and not all(outputs):
+            print(f"✗ FAIL: {event} produced no decision: {outputs!r}")
+            failed += 1
+        elif hook <= budget:
+            print(f"✓ PASS: {summary}")
+            passed += 1
+        else:
+            print(f"✗ FAIL: {summary}")
+            failed += 1
+
+    print(f"\n{passed} passed, {failed} failed")
+
+    if failed > 0:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
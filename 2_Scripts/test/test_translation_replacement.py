@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 """
 Test script for hook translation replacement
+replace_hook_translations below is a reference copy of replaceHookTranslations
+in src/src/lib/config-generator.ts; every case is also run through the Python
+port in hook_loader (used by build_hooks.py), which must give the same output
 Run with: python3 test/test_translation_replacement.py
 """
 
+import os
 import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hook_loader  # noqa: E402
 
 # Mock translation data
 translations = {
@@ -269,7 +277,8 @@ failed = 0
 
 for test_case in test_cases:
     result = replace_hook_translations(test_case["input"], translations)
-    success = result == test_case["expected"]
+    ported = hook_loader.replace_hook_translations(test_case["input"], translations)
+    success = result == test_case["expected"] and ported == result
 
     if success:
         print(f"✓ PASS: {test_case['name']}")
@@ -279,9 +288,23 @@ for test_case in test_cases:
         print(f"  Input:    {test_case['input']}")
         print(f"  Expected: {test_case['expected']}")
         print(f"  Got:      {result}")
+        print(f"  Port:     {ported}")
         print()
         failed += 1
 
+# The port must translate the whole hook template exactly like the reference
+with open(hook_loader.HOOK_TEMPLATE, "r", encoding="utf-8") as f:
+    template = f.read()
+for locale in ("en_US", "zh_CN"):
+    locale_translations = hook_loader.load_translations(locale)
+    if hook_loader.replace_hook_translations(template, locale_translations) \
+            == replace_hook_translations(template, locale_translations):
+        print(f"✓ PASS: port matches the reference on the hook template ({locale})")
+        passed += 1
+    else:
+        print(f"✗ FAIL: port differs from the reference on the hook template ({locale})")
+        failed += 1
+
 print(f"\n{passed} passed, {failed} failed")
 
 if failed > 0:
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test script for the hook workspace containment check (is_path_outside_workspace)
+Run with: python3 2_Scripts/test/test_workspace_paths.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hook_loader import load_hook, load_permissions_template  # noqa: E402
+
+hook = load_hook()
+
+# Scratch layout: <tmp>/repo with a .claude symlink to <tmp>/shared/.claude
+# and an "etc" symlink escaping to <tmp>/outside
+base = os.path.realpath(tempfile.mkdtemp(prefix="cc-paths-")).replace("\\", "/")
+repo = f"{base}/repo"
+os.makedirs(f"{repo}/src")
+os.makedirs(f"{base}/shared/.claude")
+os.makedirs(f"{base}/outside")
+try:
+    os.symlink(f"{base}/shared/.claude", f"{repo}/.claude")
+    os.symlink(f"{base}/outside", f"{repo}/etc")
+    has_symlinks = True
+except (OSError, NotImplementedError):
+    has_symlinks = False
+
+# (path, work_dir, expected outside)
+test_cases = [
+    ("src/main.py", repo, False),
+    ("./src/../src/main.py", repo, False),
+    ("./../../etc", repo, True),
+    ("../repo-other/x", repo, True),
+    (f"{base}/repo-other", repo, True),
+    (repo, repo, False),
+    (f"{repo}/", repo, False),
+    ("~/notes.txt", repo, True),
+    ("C:\\Work\\Repo\\a.txt", "C:\\work\\repo", False),
+    ("c:/work/repo/../other", "C:\\work\\repo", True),
+    ("D:\\work\\repo\\a.txt", "C:\\work\\repo", True),
+    ("/c/work/repo/a.txt", "C:\\work\\repo", False),
+    ("/mnt/c/work/repo/a.txt", "C:\\work\\repo", False),
+    ("\\\\server\\share\\repo\\a", "\\\\server\\share\\repo", False),
+    ("//server/share/repo-other", "//server/share/repo", True),
+]
+if has_symlinks:
+    test_cases += [
+        (".claude/settings.json", repo, False),
+        (f"{repo}/.claude/hooks/unified-hook.py", repo, False),
+        ("etc/passwd", repo, True),
+    ]
+
+# Additional workspace roots (permissions.json workspace.additionalRoots)
+extra_roots = hook.build_root_index([
+    f"{base}/sibling",
+    f"{base}/sibling/nested",
+    f"{base}/a",
+    f"{base}/a-b",
+    "~/.cache/shared",
+] + [f"{base}/many/root{i:03d}" for i in range(300)], base)
+
+# (path, work_dir, expected outside)
+extra_root_cases = [
+    (f"{base}/sibling/src/x.py", repo, False),
+    (f"{base}/sibling", repo, False),
+    (f"{base}/sibling-other/x", repo, True),
+    (f"{base}/a/x", repo, False),
+    (f"{base}/a-b/x", repo, False),
+    (f"{base}/a-c/x", repo, True),
+    ("../sibling/README.md", repo, False),
+    ("~/.cache/shared/pkg", repo, False),
+    ("~/.cache/other", repo, True),
+    (f"{base}/many/root150/file", repo, False),
+    (f"{base}/many/root1500/file", repo, True),
+    (f"{base}/many", repo, True),
+    ("src/main.py", repo, False),
+    ("/etc/passwd", repo, True),
+]
+
+# Run tests
+print("Running workspace path tests...\n")
+
+passed = 0
+failed = 0
+
+for path, work_dir, expected in test_cases:
+    result = hook.is_path_outside_workspace(path, work_dir)
+    if result == expected:
+        print(f"✓ PASS: {path!r} in {work_dir!r} -> outside={result}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {path!r} in {work_dir!r}")
+        print(f"  Expected outside: {expected}")
+        print(f"  Got:              {result} ({hook.canonical_path(path, work_dir)!r})")
+        print()
+        failed += 1
+
+for path, work_dir, expected in extra_root_cases:
+    result = hook.is_path_outside_workspace(path, work_dir, extra_roots)
+    if result == expected:
+        print(f"✓ PASS: {path!r} with additional roots -> outside={result}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {path!r} with additional roots")
+        print(f"  Expected outside: {expected}")
+        print(f"  Got:              {result}")
+        print()
+        failed += 1
+
+if len(extra_roots) == 304:
+    print("✓ PASS: nested roots are folded into their parent")
+    passed += 1
+else:
+    print(f"✗ FAIL: expected 304 disjoint roots, got {len(extra_roots)}")
+    failed += 1
+
+# Repository root discovery (workspace.useRepositoryRoot)
+os.makedirs(f"{base}/git-repo/.git")
+os.makedirs(f"{base}/git-repo/pkg/sub")
+with open(f"{base}/git-repo/pkg/.git", "w", encoding="utf-8") as f:
+    f.write("gitdir: ../.git/modules/pkg\n")  # submodule
+os.makedirs(f"{base}/plain/dir")
+
+# (work_dir, stop_dir, expected root)
+root_cases = [
+    (f"{base}/git-repo/pkg/sub", None, f"{base}/git-repo/pkg"),
+    (f"{base}/git-repo", None, f"{base}/git-repo"),
+    (f"{base}/plain/dir", f"{base}/plain", f"{base}/plain"),
+]
+for work_dir, stop_dir, expected in root_cases:
+    result = hook.find_repository_root(work_dir, stop_dir)
+    if result == expected:
+        print(f"✓ PASS: repository root of {work_dir!r} -> {result!r}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: repository root of {work_dir!r}")
+        print(f"  Expected: {expected!r}")
+        print(f"  Got:      {result!r}")
+        failed += 1
+
+outside = hook.is_path_outside_workspace("../../docs/a.md", f"{base}/git-repo/pkg/sub",
+                                         workspace_root=f"{base}/git-repo")
+if not outside:
+    print("✓ PASS: repository root widens the workspace beyond cwd")
+    passed += 1
+else:
+    print("✗ FAIL: path in the repository but outside cwd counted as outside")
+    failed += 1
+
+# Decisions report where their paths are even when the switch is the same inside and outside
+# (read and readAllFiles are both on in the template): (name, payload, decision, in_workspace)
+engine = hook.PolicyEngine(load_permissions_template())
+flag_cases = [
+    ("Read outside the workspace", {"tool_name": "Read", "tool_input": {"file_path": f"{base}/outside/a.txt"}},
+     "allow", False),
+    ("Read inside the workspace", {"tool_name": "Read", "tool_input": {"file_path": f"{repo}/src/main.py"}},
+     "allow", True),
+    ("Bash read outside the workspace", {"tool_name": "Bash", "tool_input": {"command": "cat ../outside/a.txt"}},
+     "allow", False),
+]
+for name, data, expected, expected_in_workspace in flag_cases:
+    result = engine.evaluate(dict(data, hook_event_name="PreToolUse", permission_mode="default", cwd=repo))
+    if result.decision == expected and result.in_workspace is expected_in_workspace:
+        print(f"✓ PASS: {name} -> {result.decision}, in_workspace={result.in_workspace}")
+        passed += 1
+    else:
+        print(f"✗ FAIL: {name}")
+        print(f"  Expected: {expected}, in_workspace={expected_in_workspace}")
+        print(f"  Got:      {result}")
+        failed += 1
+
+if not has_symlinks:
+    print("(symlink cases skipped: symlinks not available)")
+
+print(f"\n{passed} passed, {failed} failed")
+
+if failed > 0:
+    exit(1)
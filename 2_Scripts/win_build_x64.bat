@@ -92,6 +92,16 @@ if errorlevel 1 (
 echo [INFO] Working directory: %CD%
 echo.
 
+:: 生成安装器使用的 release hook 模块（src\public\templates\hooks\release）
+python "%SCRIPT_DIR%build_hooks.py" --templates
+if errorlevel 1 (
+    echo.
+    echo [ERROR] Hook build failed!
+    popd
+    pause
+    exit /b 1
+)
+
 :: 构建 x64 版本
 pnpm tauri build --target x86_64-pc-windows-msvc
 
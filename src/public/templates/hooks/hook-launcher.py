@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Claude Code Unified Hook Script - Launcher
+Installed as unified-hook.py next to unified_hook.py, which holds the hook itself.
+Python never caches the bytecode of the script it is started with, only of
+modules it imports, so every tool call compiles just this launcher and loads
+unified_hook from __pycache__ (shipped precompiled by the installer, or
+written by Python itself unless PYTHONDONTWRITEBYTECODE / -B says not to).
+The launcher is also the decision daemon client: it reads the payload, hands
+it to a running daemon (unified-hook.py --serve) and writes the reply, and
+only imports unified_hook when there is no daemon or it declined.
+"""
+
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Keep in sync with DAEMON_TIMEOUT in unified_hook.py (test_daemon.py checks both)
+DAEMON_TIMEOUT = 2.0
+
+
+def daemon_socket_path():
+    """Socket path of the daemon serving this hook directory (daemon_socket_path in unified_hook.py)"""
+    if not hasattr(os, "getuid"):
+        return None
+    import zlib
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    socket_dir = os.path.join(base, f"cc-permission-{os.getuid()}")
+    return os.path.join(socket_dir, f"hook-{zlib.crc32(SCRIPT_DIR.encode('utf-8')):08x}.sock")
+
+
+def query_daemon(raw_input):
+    """Forward the raw payload to the daemon; returns its reply, or None to evaluate in-process"""
+    socket_path = daemon_socket_path()
+    if socket_path is None or not os.path.exists(socket_path):
+        return None
+    # The socket directory must be a private directory of the current user
+    try:
+        st = os.lstat(os.path.dirname(socket_path))
+    except OSError:
+        return None
+    if (st.st_mode & 0o170000) != 0o040000 or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        return None
+
+    # The C module: importing socket (selectors, enum) costs more than the round trip
+    import _socket
+    chunks = []
+    try:
+        client = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        try:
+            client.settimeout(DAEMON_TIMEOUT)
+            client.connect(socket_path)
+            client.sendall(raw_input)
+            client.shutdown(_socket.SHUT_WR)
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            client.close()
+    except OSError:
+        return None
+    return b"".join(chunks) or None
+
+
+def main():
+    raw_input = None
+    # Command line options and profiling runs go straight to the hook
+    if len(sys.argv) == 1 and os.environ.get("CC_PERMISSION_HOOK_PROFILE") != "1":
+        try:
+            raw_input = sys.stdin.buffer.read()
+        except Exception:
+            raw_input = None  # the hook reads stdin again and logs the failure
+        reply = query_daemon(raw_input) if raw_input is not None else None
+        if reply is not None:
+            sys.stdout.buffer.write(reply)
+            sys.stdout.flush()
+            return
+
+    sys.path.insert(0, SCRIPT_DIR)
+    import unified_hook
+    unified_hook.main(raw_input)
+
+
+if __name__ == "__main__":
+    main()
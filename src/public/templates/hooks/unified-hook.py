@@ -10,9 +10,12 @@ import sys
 import json
 import re
 import os
-import subprocess
-from datetime import datetime
-import platform
+import time
+from _thread import get_ident
+
+# Wall clock when this module started running: the startup stage of the
+# stage metrics (logging.metrics) is measured from here to dispatch()
+MODULE_STARTED = time.perf_counter()
 
 # Debug log path - located next to this script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -21,6 +24,8 @@ DEBUG_LOG = os.path.join(SCRIPT_DIR, "hook-debug.log")
 
 def locate_log_file():
     """Open file explorer and select the log file"""
+    import platform
+    import subprocess
     system = platform.system()
 
     if not os.path.exists(DEBUG_LOG):
@@ -57,238 +62,2267 @@ def locate_log_file():
         sys.exit(1)
 
 
-# Max log file size (1MB)
+# Max log file size (1MB); a larger log is rotated into hook-debug.1.log
 MAX_LOG_SIZE = 1 * 1024 * 1024
+# Advisory lock serializing rotation and compression of the log segments
+LOG_LOCK = DEBUG_LOG + ".lock"
+# Upper bound on logging.maxSegments
+MAX_LOG_SEGMENTS = 100
+
+# Log levels (permissions.json logging.logLevel): "off" writes nothing,
+# "decision" one line per PreToolUse decision, "trace" every evaluation step
+LOG_LEVELS = {"off": 0, "decision": 1, "trace": 2}
+LOG_OFF, LOG_DECISION, LOG_TRACE = 0, 1, 2
+# Settings used when permissions.json has no logging section (or cannot be read):
+# (level, allow sample rate, retained segments, compress segments, journal, metrics, record)
+DEFAULT_LOG_SETTINGS = (LOG_DECISION, 1.0, 3, 0, 0, 0, 0)
+
+# Active level; None until configure_logging() has read the settings
+LOG_LEVEL = None
+# Share of allow decisions written at decision level (1.0 = all)
+ALLOW_SAMPLE_RATE = 1.0
+# Rotated segments kept (hook-debug.1.log ... hook-debug.N.log)
+LOG_SEGMENTS = DEFAULT_LOG_SETTINGS[2]
+# Gzip segments older than hook-debug.1.log in a detached process (0/1)
+COMPRESS_LOG_SEGMENTS = DEFAULT_LOG_SETTINGS[3]
+# Append every decision to the JSONL decision journal (0/1)
+JOURNAL = DEFAULT_LOG_SETTINGS[4]
+# Fold stage latencies into the hook-metrics.bin histograms (0/1)
+METRICS = DEFAULT_LOG_SETTINGS[5]
+# Append every payload, anonymized, to the payloads.jsonl corpus (0/1)
+RECORD = DEFAULT_LOG_SETTINGS[6]
+# Trace messages logged before configure_logging(), still unformatted: dropped
+# if tracing is off, otherwise written after the next block header (log_block_start)
+_pending_log = []
+# Bound on _pending_log for embedders that never configure logging
+MAX_PENDING_LOG = 1000
+
+# Log lines of the running invocation, keyed by thread so that requests the
+# decision daemon serves concurrently are flushed as separate blocks
+_log_buffers = {}
+# A buffer this long is flushed early (long-lived embedders that never call flush_log)
+MAX_BUFFERED_LOG_LINES = 1000
+
+
+def log_settings(config):
+    """Normalize a permissions.json logging section into a DEFAULT_LOG_SETTINGS-shaped tuple"""
+    if not isinstance(config, dict):
+        return DEFAULT_LOG_SETTINGS
+    level = LOG_LEVELS.get(config.get("logLevel"), DEFAULT_LOG_SETTINGS[0])
+    rate = config.get("allowSampleRate", 1.0)
+    if isinstance(rate, bool) or not isinstance(rate, (int, float)):
+        rate = 1.0
+    segments = config.get("maxSegments", DEFAULT_LOG_SETTINGS[2])
+    if isinstance(segments, bool) or not isinstance(segments, int):
+        segments = DEFAULT_LOG_SETTINGS[2]
+    compress = 1 if config.get("compressSegments") == 1 else 0
+    journal = 1 if config.get("journal") == 1 else 0
+    metrics = 1 if config.get("metrics") == 1 else 0
+    record = 1 if config.get("record") == 1 else 0
+    return (level, min(max(float(rate), 0.0), 1.0), min(max(segments, 0), MAX_LOG_SEGMENTS),
+            compress, journal, metrics, record)
+
+
+def configure_logging(settings):
+    """Apply log_settings() output; None restores the defaults"""
+    global LOG_LEVEL, ALLOW_SAMPLE_RATE, LOG_SEGMENTS, COMPRESS_LOG_SEGMENTS, JOURNAL, METRICS, RECORD
+    (LOG_LEVEL, ALLOW_SAMPLE_RATE, LOG_SEGMENTS, COMPRESS_LOG_SEGMENTS,
+     JOURNAL, METRICS, RECORD) = settings or DEFAULT_LOG_SETTINGS
+    if LOG_LEVEL < LOG_TRACE:
+        del _pending_log[:]
+
+
+def log_block_start(header):
+    """
+    Start a block of trace lines: the header, then the lines held back before
+    configure_logging(); header may be a callable like a log_debug() message
+    """
+    if LOG_LEVEL is None or LOG_LEVEL < LOG_TRACE:
+        return
+    write_log(header() if callable(header) else header)
+    for message in _pending_log:
+        write_log(message() if callable(message) else message)
+    del _pending_log[:]
+
+
+def write_log(message):
+    """Buffer a log line; flush_log() writes the invocation's lines in one go"""
+    lines = _log_buffers.setdefault(get_ident(), [])
+    lines.append(message)
+    if len(lines) >= MAX_BUFFERED_LOG_LINES:
+        flush_log()
+
+
+def discard_log():
+    """Drop the lines buffered by the current thread"""
+    _log_buffers.pop(get_ident(), None)
+
+
+def flush_log():
+    """
+    Append the current thread's buffered lines to the log with one write
+    The file is opened with O_APPEND and written with a single write(), so the
+    lines of one invocation stay contiguous when several hooks log at once
+    (local filesystems append atomically; Windows and some network filesystems
+    only emulate O_APPEND). Failures are ignored.
+    """
+    lines = _log_buffers.pop(get_ident(), None)
+    if not lines:
+        return
+    data = "".join(f"{message}\n" for message in lines).encode("utf-8", errors="replace")
+    try:
+        fd = os.open(DEBUG_LOG, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.write(fd, data)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > MAX_LOG_SIZE:
+            rotate_log()
+    except Exception:
+        pass
+
+
+def lock_file(fd, blocking=True):
+    """
+    Take an exclusive advisory lock on an open file, released when it is closed
+    Returns False when blocking is off and another process holds the lock
+    """
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt  # Windows: lock the first byte
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def log_segment_path(index, compressed=False):
+    """Path of rotated segment hook-debug.<index>.log (.gz when compressed)"""
+    base, ext = os.path.splitext(DEBUG_LOG)
+    return f"{base}.{index}{ext}" + (".gz" if compressed else "")
+
+
+def list_log_segments():
+    """Rotated segments on disk as sorted (index, compressed) pairs"""
+    base, ext = os.path.splitext(os.path.basename(DEBUG_LOG))
+    segments = []
+    for name in os.listdir(os.path.dirname(DEBUG_LOG)):
+        compressed = name.endswith(".gz")
+        stem = name[:-3] if compressed else name
+        if stem.startswith(base + ".") and stem.endswith(ext):
+            index = stem[len(base) + 1:-len(ext)]
+            if index.isdigit():
+                segments.append((int(index), compressed))
+    return sorted(segments)
+
+
+def rotate_log():
+    """
+    Rename hook-debug.log to hook-debug.1.log, shifting older segments up and
+    deleting those beyond LOG_SEGMENTS
+    The work is a handful of renames whatever the log size. It runs under a
+    non-blocking lock: if another process is rotating or compressing, this
+    one skips and a later flush rotates instead. Concurrent writers keep
+    appending to the renamed file until they reopen the log, which only
+    moves their lines into hook-debug.1.log.
+    """
+    lock_fd = os.open(LOG_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if not lock_file(lock_fd, blocking=False):
+            return
+        if os.path.getsize(DEBUG_LOG) <= MAX_LOG_SIZE:
+            return  # Another hook rotated it meanwhile
+        for index, compressed in reversed(list_log_segments()):
+            if index >= LOG_SEGMENTS:
+                os.remove(log_segment_path(index, compressed))
+            else:
+                os.replace(log_segment_path(index, compressed), log_segment_path(index + 1, compressed))
+        if LOG_SEGMENTS > 0:
+            os.replace(DEBUG_LOG, log_segment_path(1))
+        else:
+            os.remove(DEBUG_LOG)
+    finally:
+        os.close(lock_fd)
+    if COMPRESS_LOG_SEGMENTS == 1 and os.path.exists(log_segment_path(2)):
+        spawn_log_compression()
+
+
+def spawn_log_compression():
+    """Start --compress-logs in a detached process; the hook does not wait for it"""
+    import subprocess
+    if os.name == "nt":
+        options = {"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        options = {"start_new_session": True}
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), "--compress-logs"],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     close_fds=True, **options)
+
+
+def compress_log_segments():
+    """
+    Gzip every uncompressed segment older than hook-debug.1.log (--compress-logs)
+    Holds the rotation lock throughout, so a segment is never renamed while it
+    is being compressed; hooks skip rotation until it is done
+    """
+    import gzip
+    import shutil
+    lock_fd = os.open(LOG_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if not lock_file(lock_fd):
+            return
+        for index, compressed in list_log_segments():
+            if compressed or index < 2:
+                continue
+            source = log_segment_path(index)
+            target = log_segment_path(index, compressed=True)
+            temp_file = f"{target}.{os.getpid()}.tmp"
+            try:
+                with open(source, "rb") as src, gzip.open(temp_file, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(temp_file, target)
+                os.remove(source)
+            except OSError as e:
+                print(f"Failed to compress {source}: {e}")
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+    finally:
+        os.close(lock_fd)
 
 
 def log_debug(message):
-    """Write debug log with auto cleanup when file exceeds MAX_LOG_SIZE"""
-    try:
-        # Check file size and truncate if needed
-        if os.path.exists(DEBUG_LOG):
-            file_size = os.path.getsize(DEBUG_LOG)
-            if file_size > MAX_LOG_SIZE:
-                # Keep the last 20% of the file
-                keep_size = MAX_LOG_SIZE // 5
-                with open(DEBUG_LOG, "rb") as f:
-                    f.seek(-keep_size, 2)  # Seek from end
-                    content = f.read()
-                # Find the first newline to avoid partial line
-                newline_pos = content.find(b'\n')
-                if newline_pos != -1:
-                    content = content[newline_pos + 1:]
-                with open(DEBUG_LOG, "wb") as f:
-                    f.write(b"[Log truncated due to size limit]\n")
-                    f.write(content)
-
-        with open(DEBUG_LOG, "a", encoding="utf-8") as f:
-            f.write(f"{message}\n")
+    """
+    Write a trace-level debug line
+    message is a string, or a callable returning it (log_debug(lambda: f"..."))
+    when building it costs anything: the callable only runs if the line is
+    written. Before configure_logging() the message is held unformatted, so
+    call sites in except blocks pass strings (the exception name is unbound
+    once the block ends), as do the loops of policy compilation
+    """
+    if LOG_LEVEL is None:
+        if len(_pending_log) < MAX_PENDING_LOG:
+            _pending_log.append(message)
+        return
+    if LOG_LEVEL < LOG_TRACE:
+        return
+    write_log(message() if callable(message) else message)
+
+
+def log_decision(hook_data, decision, category=None, pattern=None, source="evaluated"):
+    """
+    Write the decision-level line of a PreToolUse payload
+    Allow decisions are sampled with ALLOW_SAMPLE_RATE; an allow that is not
+    sampled also drops the trace lines buffered for it. The sample draw uses
+    os.urandom so the random module is never imported
+    """
+    if LOG_LEVEL is None or LOG_LEVEL < LOG_DECISION:
+        return
+    if decision == "allow" and ALLOW_SAMPLE_RATE < 1.0 \
+            and int.from_bytes(os.urandom(4), "big") >= ALLOW_SAMPLE_RATE * 0x100000000:
+        # Not sampled: the trace lines of this evaluation go too
+        discard_log()
+        return
+    mode = hook_data.get("permission_mode", "default")
+    tool_name = hook_data.get("tool_name", "")
+    tool_input = hook_data.get("tool_input", {})
+    subject = ""
+    if isinstance(tool_input, dict):
+        subject = tool_input.get("command") or tool_input.get("file_path") or tool_input.get("path") or ""
+    write_log(f"{time.strftime('%Y-%m-%d %H:%M:%S')} [{mode}] {tool_name} -> {decision} "
+              f"({source}; category={category}; pattern={pattern}): {str(subject)[:200]!r}")
+
+
+def record_decision(hook_data, decision, category=None, pattern=None, source="evaluated", started=None):
+    """
+    Report a PreToolUse decision: the decision-level log line and, when
+    enabled, a journal record; started is the time.perf_counter() value the
+    evaluation began at
+    """
+    log_decision(hook_data, decision, category, pattern, source)
+    if JOURNAL == 1:
+        journal_decision(hook_data, decision, category, pattern, started)
+
+
+# Decision journal (logging.journal): one compact JSON record per decision,
+# appended to decisions.jsonl next to this script. decisions.idx is a sparse
+# time index of 16-byte (timestamp ms, offset) entries, one per
+# JOURNAL_INDEX_INTERVAL bytes of journal, that lets --query seek straight to
+# a time range. Delete both files together to reset the journal.
+JOURNAL_FILE = os.path.join(SCRIPT_DIR, "decisions.jsonl")
+JOURNAL_INDEX = os.path.join(SCRIPT_DIR, "decisions.idx")
+JOURNAL_INDEX_INTERVAL = 64 * 1024
+JOURNAL_INDEX_ENTRY = 16
+# Concurrent hooks append in roughly, not strictly, time order: queries
+# start this many seconds early and stop this many seconds late
+JOURNAL_CLOCK_SLACK = 5.0
+
+
+def journal_decision(hook_data, decision, category=None, pattern=None, started=None):
+    """
+    Append a decision record to the journal with one O_APPEND write, and an
+    index entry when the record crosses a JOURNAL_INDEX_INTERVAL boundary
+    "ts" is always the first key, so queries can read it without parsing JSON
+    """
+    now = time.time()
+    record = {
+        "ts": round(now, 3),
+        "session": hook_data.get("session_id", ""),
+        "mode": hook_data.get("permission_mode", "default"),
+        "tool": hook_data.get("tool_name", ""),
+        "category": category,
+        "decision": decision,
+        "pattern": pattern,
+        "us": int((time.perf_counter() - started) * 1000000) if started is not None else None,
+    }
+    data = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+    try:
+        fd = os.open(JOURNAL_FILE, flags, 0o644)
+        try:
+            os.write(fd, data)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        offset = end - len(data)
+        if offset == 0 or offset // JOURNAL_INDEX_INTERVAL != end // JOURNAL_INDEX_INTERVAL:
+            entry = int(now * 1000).to_bytes(8, "little") + offset.to_bytes(8, "little")
+            fd = os.open(JOURNAL_INDEX, flags, 0o644)
+            try:
+                os.write(fd, entry)
+            finally:
+                os.close(fd)
+    except Exception as e:
+        log_debug(f"Failed to write decision journal: {e}")
+
+
+def journal_timestamp(line):
+    """The "ts" of a journal line (bytes) without parsing the JSON, or None"""
+    if not line.startswith(b'{"ts":'):
+        return None
+    end = line.find(b",", 6)
+    try:
+        return float(line[6:end])
+    except ValueError:
+        return None
+
+
+def journal_seek(since):
+    """
+    Offset in the journal to start reading at for records from since on
+    Binary search over the mmap'd index for the last entry at least
+    JOURNAL_CLOCK_SLACK seconds older than since; 0 without a usable index
+    """
+    import mmap
+    try:
+        journal_size = os.path.getsize(JOURNAL_FILE)
+        with open(JOURNAL_INDEX, "rb") as f:
+            index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return 0
+    with index:
+        target = int((since - JOURNAL_CLOCK_SLACK) * 1000)
+        low, high = 0, len(index) // JOURNAL_INDEX_ENTRY
+        while low < high:
+            middle = (low + high) // 2
+            start = middle * JOURNAL_INDEX_ENTRY
+            if int.from_bytes(index[start:start + 8], "little") <= target:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return 0
+        start = (low - 1) * JOURNAL_INDEX_ENTRY
+        offset = int.from_bytes(index[start + 8:start + 16], "little")
+    # An index left over from a deleted journal points past its end
+    return offset if offset < journal_size else 0
+
+
+def query_journal(since=None, until=None, filters=None):
+    """
+    Yield the journal lines (bytes, without newline) in [since, until] whose
+    fields equal every filters value
+    The journal is mmap'd and read from the journal_seek() offset on; reading
+    stops JOURNAL_CLOCK_SLACK seconds past until, so only the pages of the
+    requested range are touched. JSON is only parsed for lines in range
+    when there are filters.
+    """
+    import mmap
+    try:
+        with open(JOURNAL_FILE, "rb") as f:
+            journal = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return  # Missing or empty journal
+    with journal:
+        position = journal_seek(since) if since is not None else 0
+        size = len(journal)
+        while position < size:
+            newline = journal.find(b"\n", position)
+            if newline == -1:
+                break  # Record still being written
+            line = journal[position:newline]
+            position = newline + 1
+            ts = journal_timestamp(line)
+            if ts is None:
+                continue
+            if until is not None and ts > until:
+                if ts > until + JOURNAL_CLOCK_SLACK:
+                    break
+                continue
+            if since is not None and ts < since:
+                continue
+            if filters:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if any(str(record.get(key)) != value for key, value in filters.items()):
+                    continue
+            yield line
+
+
+def parse_query_time(value):
+    """
+    Parse a --since/--until value into epoch seconds: a duration ago (90s,
+    30m, 2h, 7d), epoch seconds, or local time as YYYY-MM-DD[THH:MM[:SS]]
+    """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].isdigit():
+        return time.time() - int(value[:-1]) * units[value[-1]]
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for layout in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(value, layout))
+        except ValueError:
+            pass
+    raise ValueError(f"invalid time: {value}")
+
+
+def run_query(argv):
+    """Stream journal records matching the command line filters as JSONL (--query)"""
+    import argparse
+    parser = argparse.ArgumentParser(prog="unified-hook.py --query",
+                                     description="Query the decision journal (decisions.jsonl)")
+    parser.add_argument("--since", type=parse_query_time, help="start time: 30m, 2h, epoch or YYYY-MM-DD[THH:MM[:SS]]")
+    parser.add_argument("--until", type=parse_query_time, help="end time, same formats as --since")
+    for field in ("session", "mode", "tool", "category", "decision", "pattern"):
+        parser.add_argument(f"--{field}", help=f"only records with this {field}")
+    parser.add_argument("--limit", type=int, help="stop after this many records")
+    args = parser.parse_args(argv)
+
+    filters = {field: getattr(args, field) for field in ("session", "mode", "tool", "category", "decision", "pattern")
+               if getattr(args, field) is not None}
+    out = sys.stdout.buffer
+    count = 0
+    for line in query_journal(args.since, args.until, filters):
+        if args.limit is not None and count >= args.limit:
+            break
+        out.write(line + b"\n")
+        count += 1
+    out.flush()
+
+
+# Stage latency metrics (logging.metrics): each hook invocation times its
+# stages and folds them into fixed-bucket histograms, one per (event, mode,
+# stage), kept as native 64-bit counters in hook-metrics.bin. The file is
+# mmap'd and incremented in place under an advisory lock, never rewritten;
+# --metrics exports it as OpenMetrics text. The decision cache hit and miss
+# counters (--cache-stats) are kept after the histograms, in the same pass.
+METRICS_FILE = os.path.join(SCRIPT_DIR, "hook-metrics.bin")
+# Bump when the counter layout changes; a mismatching file is recreated
+METRICS_MAGIC = b"CCHMET02"
+METRIC_EVENTS = ("PreToolUse", "Stop", "PermissionRequest", "other")
+METRIC_MODES = ("default", "plan", "acceptEdits", "bypassPermissions", "dontAsk", "other")
+# All stages are wall time; startup runs from the top of this module to
+# dispatch() (interpreter start-up before it is not visible from inside)
+METRIC_STAGES = ("startup", "stdin", "config", "lex", "classify", "paths", "output", "total")
+(STAGE_STARTUP, STAGE_STDIN, STAGE_CONFIG, STAGE_LEX, STAGE_CLASSIFY,
+ STAGE_PATHS, STAGE_OUTPUT, STAGE_TOTAL) = range(len(METRIC_STAGES))
+# Histogram bucket upper bounds in microseconds, plus an implicit +Inf bucket
+LATENCY_BUCKETS_US = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000,
+                      100000, 250000, 500000, 1000000)
+# Per series: one counter per bucket, then count and sum (microseconds)
+SERIES_WORDS = len(LATENCY_BUCKETS_US) + 3
+METRICS_SERIES = len(METRIC_EVENTS) * len(METRIC_MODES) * len(METRIC_STAGES)
+# Decision cache lookups: hits, then misses
+CACHE_HIT, CACHE_MISS = 0, 1
+CACHE_COUNTERS = 1 + METRICS_SERIES * SERIES_WORDS
+METRICS_SIZE = 8 * (CACHE_COUNTERS + 2)
+
+# Running invocations, keyed by thread so that requests the decision daemon
+# serves concurrently are timed separately: thread -> (event, mode, started,
+# seconds per stage with None for stages not reached, [cache hits, misses]),
+# set by start_metrics()
+_metrics = {}
+
+
+def add_stage_time(stage, seconds):
+    """Add seconds to a stage of the current thread's invocation (if start_metrics() ran)"""
+    running = _metrics.get(get_ident())
+    if running is not None:
+        stages = running[3]
+        stages[stage] = (stages[stage] or 0.0) + seconds
+
+
+def stage_time(stage):
+    """Seconds recorded so far for a stage of the current thread's invocation"""
+    running = _metrics.get(get_ident())
+    return (running[3][stage] or 0.0) if running is not None else 0.0
+
+
+def count_cache_lookup(outcome):
+    """Count a decision cache lookup (CACHE_HIT/CACHE_MISS) of the current thread's invocation"""
+    running = _metrics.get(get_ident())
+    if running is not None:
+        running[4][outcome] += 1
+
+
+def start_metrics(hook_data, started):
+    """Start timing an invocation of the current thread, labelled with its event and mode"""
+    event = hook_data.get("hook_event_name")
+    mode = hook_data.get("permission_mode")
+    _metrics[get_ident()] = (METRIC_EVENTS.index(event) if event in METRIC_EVENTS else len(METRIC_EVENTS) - 1,
+                             METRIC_MODES.index(mode) if mode in METRIC_MODES else len(METRIC_MODES) - 1,
+                             started, [None] * len(METRIC_STAGES), [0, 0])
+
+
+def series_offset(event, mode, stage):
+    """Index of the first counter of an (event, mode, stage) series"""
+    return 1 + ((event * len(METRIC_MODES) + mode) * len(METRIC_STAGES) + stage) * SERIES_WORDS
+
+
+def open_metrics_file():
+    """Open hook-metrics.bin for update, (re)creating it when missing or of another layout"""
+    flags = os.O_RDWR | getattr(os, "O_BINARY", 0)
+    exists = False
+    try:
+        fd = os.open(METRICS_FILE, flags)
+        exists = True
+        if os.fstat(fd).st_size == METRICS_SIZE and os.read(fd, 8) == METRICS_MAGIC:
+            return fd
+        os.close(fd)
+    except OSError:
+        pass
+    # One temp file per thread: daemon request threads may create the file at once
+    temp_file = f"{METRICS_FILE}.{os.getpid()}.{get_ident()}.tmp"
+    with open(temp_file, "wb") as f:
+        f.write(METRICS_MAGIC + bytes(METRICS_SIZE - 8))
+    try:
+        if exists:
+            os.replace(temp_file, METRICS_FILE)
+        else:
+            # Never replace a file a concurrent invocation has just created and counted into
+            try:
+                os.link(temp_file, METRICS_FILE)
+            except FileExistsError:
+                pass
+            except OSError:
+                os.replace(temp_file, METRICS_FILE)  # no hard links on this file system
+    finally:
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+    return os.open(METRICS_FILE, flags)
+
+
+def flush_metrics():
+    """
+    Fold the current thread's invocation into the histograms and forget it
+    One locked pass of in-place counter increments; does nothing unless
+    metrics are enabled and start_metrics() ran. Failures are ignored.
+    """
+    running = _metrics.pop(get_ident(), None)
+    if METRICS != 1 or running is None:
+        return
+    import mmap
+    from bisect import bisect_left
+    event, mode, started, stages, cache_lookups = running
+    stages[STAGE_TOTAL] = time.perf_counter() - started
+    try:
+        fd = open_metrics_file()
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)  # msvcrt locks at the file position
+            if not lock_file(fd):
+                return
+            with mmap.mmap(fd, METRICS_SIZE) as mapped:
+                counters = memoryview(mapped).cast("Q")
+                for stage, seconds in enumerate(stages):
+                    if seconds is None:
+                        continue
+                    us = int(seconds * 1000000)
+                    base = series_offset(event, mode, stage)
+                    counters[base + bisect_left(LATENCY_BUCKETS_US, us)] += 1
+                    counters[base + SERIES_WORDS - 2] += 1
+                    counters[base + SERIES_WORDS - 1] += us
+                for outcome, count in enumerate(cache_lookups):
+                    counters[CACHE_COUNTERS + outcome] += count
+                counters.release()
+        finally:
+            os.close(fd)
+    except Exception as e:
+        log_debug(f"Failed to update metrics: {e}")
+
+
+def histogram_quantile(buckets, count, q):
+    """Estimate a quantile in microseconds from per-bucket counts (linear within a bucket)"""
+    rank = q * count
+    seen = 0
+    lower = 0
+    for bound, bucket_count in zip(LATENCY_BUCKETS_US, buckets):
+        if bucket_count and seen + bucket_count >= rank:
+            return lower + (bound - lower) * (rank - seen) / bucket_count
+        seen += bucket_count
+        lower = bound
+    return float(LATENCY_BUCKETS_US[-1])  # In the +Inf bucket
+
+
+def metrics_text():
+    """Render hook-metrics.bin as OpenMetrics text (series without samples are left out)"""
+    with open(METRICS_FILE, "rb") as f:
+        data = f.read()
+    if len(data) != METRICS_SIZE or data[:8] != METRICS_MAGIC:
+        raise ValueError(f"{METRICS_FILE} has an unknown layout")
+    counters = memoryview(data).cast("Q")
+    name = "cc_permission_hook_stage_seconds"
+    # OpenMetrics wants the unit as the name suffix
+    quantile_name = "cc_permission_hook_stage_quantile_seconds"
+    histogram = [f"# TYPE {name} histogram", f"# UNIT {name} seconds",
+                 f"# HELP {name} Latency of hook stages per event and permission mode"]
+    quantiles = [f"# TYPE {quantile_name} gauge", f"# UNIT {quantile_name} seconds",
+                 f"# HELP {quantile_name} p50/p99 estimated from the {name} buckets"]
+    for event_index, event in enumerate(METRIC_EVENTS):
+        for mode_index, mode in enumerate(METRIC_MODES):
+            for stage_index, stage in enumerate(METRIC_STAGES):
+                base = series_offset(event_index, mode_index, stage_index)
+                buckets = counters[base:base + len(LATENCY_BUCKETS_US) + 1].tolist()
+                count, total_us = counters[base + SERIES_WORDS - 2], counters[base + SERIES_WORDS - 1]
+                if not count:
+                    continue
+                labels = f'event="{event}",mode="{mode}",stage="{stage}"'
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS_US + (None,), buckets):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound is None else repr(bound / 1000000)
+                    histogram.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                histogram.append(f"{name}_count{{{labels}}} {count}")
+                histogram.append(f"{name}_sum{{{labels}}} {total_us / 1000000!r}")
+                for q in ("0.5", "0.99"):
+                    value = histogram_quantile(buckets, count, float(q)) / 1000000
+                    quantiles.append(f'{quantile_name}{{{labels},quantile="{q}"}} {value!r}')
+    lookups = []
+    hits, misses = counters[CACHE_COUNTERS], counters[CACHE_COUNTERS + 1]
+    if hits or misses:
+        lookup_name = "cc_permission_hook_decision_cache_lookups"
+        lookups = [f"# TYPE {lookup_name} counter",
+                   f"# HELP {lookup_name} PreToolUse decision cache lookups by outcome",
+                   f'{lookup_name}_total{{outcome="hit"}} {hits}',
+                   f'{lookup_name}_total{{outcome="miss"}} {misses}']
+    return "\n".join(histogram + quantiles + lookups + ["# EOF"]) + "\n"
+
+
+def export_metrics(output_path=None):
+    """Print the metrics as OpenMetrics text, or write them atomically to output_path (--metrics [file])"""
+    try:
+        text = metrics_text()
+    except (OSError, ValueError) as e:
+        print(f"No metrics available: {e}")
+        sys.exit(1)
+    if output_path is None:
+        sys.stdout.write(text)
+        return
+    temp_file = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_file, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    os.replace(temp_file, output_path)
+
+
+# Payload recorder (logging.record): every payload the hook receives is
+# anonymized and appended to payloads.jsonl, a corpus that --batch replays
+# through the evaluation path without a live Claude Code session
+RECORD_FILE = os.path.join(SCRIPT_DIR, "payloads.jsonl")
+# Random per-install key of the path and session tokens
+RECORD_KEY_FILE = os.path.join(SCRIPT_DIR, "payloads.key")
+# Keys holding file contents or free text: strings below them are redacted
+REDACTED_KEYS = frozenset(("content", "new_string", "old_string", "new_source", "prompt", "description",
+                           "query", "pattern", "message", "text", "body", "plan"))
+# Path components kept as they are: system and common project directory
+# names, which policies match on and which identify nobody
+KEPT_PATH_COMPONENTS = frozenset(("", ".", "..", "~", "Users", "home", "root", "tmp", "var", "etc", "usr", "opt",
+                                  "bin", "lib", "dev", "private", "Library", "Applications", "Documents", "Desktop",
+                                  "Downloads", "AppData", "Program Files", "Windows", "src", "test", "tests",
+                                  "docs", "dist", "build", "node_modules", "scripts"))
+# Directories whose children are user names (compared lowercased)
+USER_DIRECTORIES = frozenset(("users", "home"))
+# Single-dash long options kept as they are; any other single-dash word longer
+# than a short flag cluster (-rf, -xzvf) is an option with an attached value (-psecret)
+KEPT_SINGLE_DASH_OPTIONS = frozenset(("-name", "-iname", "-path", "-ipath", "-type", "-delete", "-exec", "-execdir",
+                                      "-print", "-print0", "-maxdepth", "-mindepth", "-newer", "-size", "-mtime",
+                                      "-mmin", "-perm", "-prune", "-empty", "-regex", "-user", "-group", "-not",
+                                      "-version", "-help", "-Wall", "-Werror", "-Wextra"))
+# Longest flag cluster after the option letter kept as it is (-xzvf)
+MAX_FLAG_CLUSTER = 3
+# Recorder state of this process, created on first use
+_anonymizer = None
+
+
+class PayloadAnonymizer:
+    """
+    Anonymize hook payloads for the recorder
+    Paths keep their shape (roots, ~, ./ and ../, the KEPT_PATH_COMPONENTS
+    names, dot names and extensions); every other component becomes a keyed
+    token, so one name always maps to the same token. User names become
+    "user" wherever they appear, also inside words, and contents and free text
+    become x's of the same length. Bash commands keep their words except
+    paths, file names with an extension, quoted strings, heredoc bodies, the
+    values of NAME=value and --option=value words, and values attached to
+    single-dash options (-psecret).
+    """
+
+    def __init__(self, key, user_names=()):
+        self.key = key
+        self.user_names = [name for name in user_names if name]
+        self._tokens = {}
+
+    def token(self, text):
+        """Keyed 10-hex-digit token of text, stable for one key"""
+        token = self._tokens.get(text)
+        if token is None:
+            import hmac
+            import hashlib
+            token = hmac.new(self.key, text.encode("utf-8", errors="surrogatepass"), hashlib.sha256).hexdigest()[:10]
+            self._tokens[text] = token
+        return token
+
+    def redact(self, text):
+        """Free text: every character except whitespace becomes x"""
+        return re.sub(r"\S", "x", text)
+
+    def names(self, text):
+        """Replace the local user names in text, wherever they appear (ignoring case)"""
+        for name in self.user_names:
+            text = re.sub(re.escape(name), "user", text, flags=re.I)
+        return text
+
+    def is_path(self, text):
+        """A single word that looks like a path, URL or home-relative name"""
+        return bool(text) and not any(c.isspace() for c in text) \
+            and (text[0] in "/\\~" or "/" in text or "\\" in text or bool(re.match(r"[A-Za-z]:", text)))
+
+    def component(self, name):
+        """Anonymize one path component"""
+        if name in KEPT_PATH_COMPONENTS or name.startswith(".") or name.endswith(":"):
+            return name  # Dot names, drives and URL schemes
+        if name in self.user_names:
+            return "user"
+        stem, extension = os.path.splitext(name)
+        if not (1 < len(extension) <= 8 and extension[1:].isalnum()):
+            stem, extension = name, ""
+        return "p" + self.token(stem) + extension
+
+    def path(self, path):
+        """Anonymize a path, keeping its separators"""
+        parts = []
+        after_user_directory = False
+        for part in re.split(r"([/\\]+)", path):
+            if part[:1] in ("/", "\\"):
+                parts.append(part)
+                continue
+            parts.append("user" if after_user_directory and part else self.component(part))
+            after_user_directory = part.lower() in USER_DIRECTORIES
+        return "".join(parts)
+
+    def _option_value(self, value):
+        """Value of an assignment or option: paths keep their shape, anything else is redacted"""
+        return self.path(value) if self.is_path(value) else self.redact(value)
+
+    def _command_word(self, match):
+        word = match.group(0)
+        if word.startswith("<<"):
+            return word  # Heredoc delimiter, which must match its closing line
+        if match.group("assignment"):
+            name, value = word.split("=", 1)
+            return name + "=" + self._option_value(value)
+        if match.group("option"):
+            if word in KEPT_SINGLE_DASH_OPTIONS or (word[2:].isalpha() and len(word) - 2 <= MAX_FLAG_CLUSTER):
+                return word
+            return word[:2] + self._option_value(word[2:])
+        if word[0] in "'\"":
+            inner = word[1:-1]
+            return word[0] + (self.path(inner) if self.is_path(inner) else self.redact(inner)) + word[-1]
+        return self.path(word)
+
+    def command(self, command):
+        """Anonymize a Bash command: heredoc bodies, quoted strings, path words and file names"""
+        command = re.sub(r"(<<-?[ \t]*(['\"]?)(\w+)\2[^\n]*\n)(.*?)(?=\n\3(?:\n|$)|$)",
+                         lambda m: m.group(1) + self.redact(m.group(4)), command, flags=re.S)
+        command = re.sub(r"<<-?[ \t]*(['\"]?)\w+\1|'[^']*'|\"(?:\\.|[^\"\\])*\""
+                         r"|(?P<assignment>(?<![^\s;&|(])-{0,2}[A-Za-z_][\w.-]*=[^\s;&|<>()'\"`]+)"
+                         r"|(?P<option>(?<![^\s;&|(])-[A-Za-z][^\s;&|<>()'\"`=-][^\s;&|<>()'\"`=]*(?![^\s;&|<>()]))"
+                         r"|[^\s;&|<>()'\"`=]*[/\\~][^\s;&|<>()'\"`]*"
+                         r"|(?<![\w.=*-])\w[\w.-]*\.[A-Za-z][A-Za-z0-9]{0,7}(?![\w.])", self._command_word, command)
+        return self.names(command)
+
+    def value(self, value, key=None, free_text=False):
+        """Anonymize a payload value; free_text redacts every string that is not a path"""
+        if isinstance(value, dict):
+            return {k: self.value(v, k, free_text or k in REDACTED_KEYS) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.value(item, key, free_text) for item in value]
+        if not isinstance(value, str):
+            return value
+        if key == "command" and not free_text:
+            return self.command(value)
+        if key == "session_id":
+            return "s" + self.token(value)
+        # Free text only keeps the shape of values that clearly start like a path
+        if self.is_path(value) and (not free_text or re.match(r"[/~]|\.{1,2}[/\\]|[A-Za-z]:[/\\]", value)):
+            return self.path(value)
+        return self.redact(value) if free_text else self.names(value)
+
+    def payload(self, hook_data):
+        """Anonymized copy of a hook payload"""
+        data = self.value(hook_data)
+        tool_input = hook_data.get("tool_input")
+        if str(hook_data.get("tool_name", "")).startswith("mcp__") and isinstance(tool_input, dict):
+            # MCP arguments are free-form: paths keep their shape, the rest is redacted
+            data["tool_input"] = self.value(tool_input, "tool_input", True)
+        return data
+
+
+def record_key():
+    """The recorder's HMAC key, created (readable by the owner only) on first use"""
+    for _ in range(10):
+        try:
+            with open(RECORD_KEY_FILE, "rb") as f:
+                key = f.read()
+            if len(key) == 32:
+                return key
+        except FileNotFoundError:
+            try:
+                fd = os.open(RECORD_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0),
+                             0o600)
+            except FileExistsError:
+                continue
+            key = os.urandom(32)
+            try:
+                os.write(fd, key)
+            finally:
+                os.close(fd)
+            return key
+        time.sleep(0.01)  # Another hook is writing the key
+    raise OSError(f"{RECORD_KEY_FILE} is not a recorder key")
+
+
+def current_user_names():
+    """Names of the local user, replaced wherever they appear in recorded payloads"""
+    import getpass
+    names = {os.path.basename(os.path.expanduser("~"))}
+    try:
+        names.add(getpass.getuser())
     except Exception:
         pass
+    # Too common as words to be replaced everywhere (/root is kept as a path)
+    return sorted(names - {"", "root", "user"})
 
 
-def output_result(hook_event_name, **kwargs):
-    """Output Hook result"""
-    result = {
+def record_payload(hook_data):
+    """Append the anonymized payload to payloads.jsonl with one O_APPEND write; failures are ignored"""
+    global _anonymizer
+    try:
+        if _anonymizer is None:
+            _anonymizer = PayloadAnonymizer(record_key(), current_user_names())
+        data = (json.dumps(_anonymizer.payload(hook_data), ensure_ascii=False, separators=(",", ":"))
+                + "\n").encode("utf-8")
+        fd = os.open(RECORD_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o600)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+    except Exception as e:
+        log_debug(f"Failed to record payload: {e}")
+
+
+def build_result(hook_event_name, **kwargs):
+    """Build the Hook result object"""
+    return {
         "hookSpecificOutput": {
             "hookEventName": hook_event_name,
             **kwargs
         }
     }
-    print(json.dumps(result, ensure_ascii=False))
+
+
+def output_result(hook_event_name, **kwargs):
+    """Output Hook result"""
+    output_started = time.perf_counter()
+    print(json.dumps(build_result(hook_event_name, **kwargs), ensure_ascii=False))
+    sys.stdout.flush()
+    add_stage_time(STAGE_OUTPUT, time.perf_counter() - output_started)
+    flush_metrics()
+    flush_log()
     sys.exit(0)
 
 
-def match_glob(text, pattern):
+# Upper bound on {a,b} expansions per pattern; larger patterns keep braces literal
+MAX_GLOB_ALTERNATIVES = 256
+
+# Characters that can be escaped with a backslash inside a glob
+GLOB_ESCAPABLE = "*?[]{},\\"
+# Drive prefix of a Windows path (C:\)
+_WINDOWS_DRIVE_GLOB = re.compile(r"(?<![A-Za-z0-9])[A-Za-z]:\\")
+
+
+def expand_braces(pattern):
     """
-    Glob pattern matching
-    Supports * (match any characters) and ? (match single character)
+    Expand {a,b} alternation into a list of brace-free glob alternatives
+    Groups without a top-level comma (e.g. "{ :|:& }") are kept literal
     """
-    regex_pattern = re.escape(pattern)
-    regex_pattern = regex_pattern.replace(r'\*', '.*').replace(r'\?', '.')
-    return bool(re.match(f"^{regex_pattern}$", text, re.DOTALL))
+    n = len(pattern)
+    i = 0
+    while i < n:
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "{":
+            depth = 0
+            commas = []
+            j = i
+            while j < n:
+                cj = pattern[j]
+                if cj == "\\":
+                    j += 2
+                    continue
+                if cj == "{":
+                    depth += 1
+                elif cj == "}":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                elif cj == "," and depth == 1:
+                    commas.append(j)
+                j += 1
+            if j < n and commas:
+                prefix = pattern[:i]
+                suffix = pattern[j + 1:]
+                bounds = [i] + commas + [j]
+                results = []
+                for left, right in zip(bounds, bounds[1:]):
+                    for tail in expand_braces(pattern[left + 1:right] + suffix):
+                        results.append(prefix + tail)
+                        if len(results) > MAX_GLOB_ALTERNATIVES:
+                            raise ValueError("too many brace alternatives")
+                return results
+        i += 1
+    return [pattern]
 
 
-def split_command(command):
+def _parse_class(pattern, i):
     """
-    Split combined commands into independent sub-commands
-    Supports &&, ||, ; separators
-    Correctly handles content within quotes (does not split separators within quotes)
+    Parse a [...] character class starting at pattern[i] == "["
+    Returns (atom, next_index) or (None, i) if the bracket is not closed
     """
-    sub_commands = []
-    current_cmd = []
-    in_single_quote = False
-    in_double_quote = False
+    n = len(pattern)
+    j = i + 1
+    negated = False
+    if j < n and pattern[j] in "!^":
+        negated = True
+        j += 1
+    members = []
+    ranges = []
+    first = True
+    while j < n:
+        char = pattern[j]
+        if char == "]" and not first:
+            return (negated, "".join(members), tuple(ranges)), j + 1
+        first = False
+        if char == "\\" and j + 1 < n:
+            j += 1
+            char = pattern[j]
+        if j + 2 < n and pattern[j + 1] == "-" and pattern[j + 2] != "]":
+            ranges.append((char, pattern[j + 2]))
+            j += 3
+            continue
+        members.append(char)
+        j += 1
+    return None, i
+
+
+def _compile_alternative(pattern):
+    """
+    Compile one brace-free glob into a tuple of segments split on *
+    A segment is a str (pure literal) or a tuple of atoms, where an atom is a
+    one-character str, None for ?, or (negated, members, ranges) for [...]
+    """
+    segments = []
+    atoms = []
+    n = len(pattern)
     i = 0
+    while i < n:
+        char = pattern[i]
+        if char == "*":
+            segments.append(atoms)
+            atoms = []
+            while i < n and pattern[i] == "*":
+                i += 1
+            continue
+        if char == "?":
+            atoms.append(None)
+        elif char == "[":
+            atom, next_index = _parse_class(pattern, i)
+            if atom is not None:
+                atoms.append(atom)
+                i = next_index
+                continue
+            atoms.append(char)
+        elif char == "\\" and i + 1 < n and pattern[i + 1] in GLOB_ESCAPABLE:
+            i += 1
+            atoms.append(pattern[i])
+        else:
+            atoms.append(char)
+        i += 1
+    segments.append(atoms)
+
+    compiled = []
+    for atoms in segments:
+        if all(type(atom) is str for atom in atoms):
+            compiled.append("".join(atoms))
+        else:
+            compiled.append(tuple(atoms))
+    return tuple(compiled)
 
-    while i < len(command):
-        char = command[i]
 
-        # Handle escape characters
-        if char == '\\' and i + 1 < len(command):
-            current_cmd.append(char)
-            current_cmd.append(command[i + 1])
-            i += 2
+def is_windows_glob(pattern):
+    """
+    True for a pattern written with Windows paths (del C:\\temp\\*, type build\\*.log):
+    it has a drive prefix, or a backslash that follows a file name character
+    or does not escape a glob character
+    """
+    if _WINDOWS_DRIVE_GLOB.search(pattern):
+        return True
+    i = pattern.find("\\")
+    while i >= 0:
+        if i + 1 == len(pattern) or pattern[i + 1] not in GLOB_ESCAPABLE \
+                or (i and (pattern[i - 1].isalnum() or pattern[i - 1] in "._-")):
+            return True
+        i = pattern.find("\\", i + 2)
+    return False
+
+
+def compile_glob(pattern):
+    """
+    Compile a glob pattern into a matching program (tuple of alternatives)
+    Supports * and ** (any characters), ? (single character), [abc] / [a-z] /
+    [!abc] character classes, {a,b} alternation and backslash escapes.
+    In Windows-style patterns (is_windows_glob) every backslash is a literal
+    path separator, as it was before escapes existed, so "del C:\\temp\\*"
+    still matches any file in C:\\temp
+    """
+    if is_windows_glob(pattern):
+        pattern = pattern.replace("\\", "\\\\")
+    try:
+        alternatives = expand_braces(pattern)
+    except ValueError:
+        alternatives = [pattern.replace("{", "\\{").replace("}", "\\}").replace(",", "\\,")]
+    return tuple(_compile_alternative(alternative) for alternative in alternatives)
+
+
+def _class_match(atom, char):
+    """Check a character against a compiled [...] class"""
+    negated, members, ranges = atom
+    found = char in members
+    if not found:
+        for low, high in ranges:
+            if low <= char <= high:
+                found = True
+                break
+    return found != negated
+
+
+def _segment_at(segment, text, pos):
+    """Check that segment matches text at pos (caller guarantees it fits)"""
+    if type(segment) is str:
+        return text.startswith(segment, pos)
+    for atom in segment:
+        if atom is not None:
+            char = text[pos]
+            if type(atom) is str:
+                if char != atom:
+                    return False
+            elif not _class_match(atom, char):
+                return False
+        pos += 1
+    return True
+
+
+def _segment_find(segment, text, start, end):
+    """Leftmost position >= start where segment fits entirely before end, or -1"""
+    if type(segment) is str:
+        return text.find(segment, start, end)
+    last = end - len(segment)
+    pos = start
+    while pos <= last:
+        if _segment_at(segment, text, pos):
+            return pos
+        pos += 1
+    return -1
+
+
+def _match_alternative(segments, text):
+    """
+    Match one star-separated alternative against the whole text
+    The first segment is anchored at the start, the last at the end, and the
+    ones in between are placed leftmost-first. Leftmost placement is always
+    safe because the following * absorbs whatever is skipped, so there is no
+    backtracking: cost is O(len(text) * len(pattern)) in the worst case.
+    """
+    n = len(text)
+    first = segments[0]
+    if len(segments) == 1:
+        return n == len(first) and _segment_at(first, text, 0)
+    last = segments[-1]
+    end = n - len(last)
+    if end < len(first):
+        return False
+    if not _segment_at(first, text, 0) or not _segment_at(last, text, end):
+        return False
+    pos = len(first)
+    for segment in segments[1:-1]:
+        if not segment:
             continue
+        found = _segment_find(segment, text, pos, end)
+        if found < 0:
+            return False
+        pos = found + len(segment)
+    return True
 
-        # Handle quotes
-        if char == '"' and not in_single_quote:
-            in_double_quote = not in_double_quote
-            current_cmd.append(char)
-            i += 1
+
+def glob_match(program, text):
+    """Match text against a program produced by compile_glob"""
+    for segments in program:
+        if _match_alternative(segments, text):
+            return True
+    return False
+
+
+# Compiled glob programs keyed by pattern string
+_glob_cache = {}
+
+
+def match_glob(text, pattern):
+    """
+    Glob pattern matching
+    Supports * (match any characters) and ? (match single character),
+    plus ** / [...] / {a,b}; each pattern is compiled once per process
+    """
+    program = _glob_cache.get(pattern)
+    if program is None:
+        program = _glob_cache[pattern] = compile_glob(pattern)
+    return glob_match(program, text)
+
+
+GLOB_WILDCARDS = "*?[{\\"
+
+
+def first_word(text):
+    """Return the leading whitespace-delimited word, or None if text starts with whitespace"""
+    if not text or text[0].isspace():
+        return None
+    return text.split(None, 1)[0]
+
+
+def literal_first_word(pattern):
+    """Return the leading word of a pattern if it is a plain literal, else None"""
+    word = first_word(pattern)
+    if word is None or any(c in word for c in GLOB_WILDCARDS):
+        return None
+    return word
+
+
+def required_literal(segments):
+    """Longest run of literal characters that every match of one alternative contains"""
+    best = ""
+    for segment in segments:
+        if type(segment) is str:
+            runs = (segment,)
+        else:
+            runs = "".join(atom if type(atom) is str else "\0" for atom in segment).split("\0")
+        for run in runs:
+            if len(run) > len(best):
+                best = run
+    return best
+
+
+def build_literal_automaton(literals):
+    """
+    Aho-Corasick automaton over (literal, index) pairs, as marshal-safe tables
+    Returns (goto, fail, out): per state a char -> state dict, the failure
+    state, and the indexes whose literal ends there (failure outputs merged in)
+    """
+    goto = [{}]
+    out = [set()]
+    for literal, index in literals:
+        state = 0
+        for char in literal:
+            following = goto[state].get(char)
+            if following is None:
+                following = goto[state][char] = len(goto)
+                goto.append({})
+                out.append(set())
+            state = following
+        out[state].add(index)
+
+    fail = [0] * len(goto)
+    queue = list(goto[0].values())
+    for state in queue:
+        for char, following in goto[state].items():
+            queue.append(following)
+            fallback = fail[state]
+            while fallback and char not in goto[fallback]:
+                fallback = fail[fallback]
+            target = goto[fallback].get(char, 0)
+            fail[following] = target if target != following else 0
+            out[following] |= out[fail[following]]
+    return tuple(goto), tuple(fail), tuple(tuple(sorted(indexes)) for indexes in out)
+
+
+def scan_literals(automaton, text):
+    """Indexes of every literal occurring in text, in one pass"""
+    goto, fail, out = automaton
+    found = set()
+    state = 0
+    for char in text:
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+        if out[state]:
+            found.update(out[state])
+    return found
+
+
+class PatternMatcher:
+    """
+    Compiled matcher for one category pattern list
+    Patterns are indexed by their literal first word (git, npm, docker ...),
+    and every pattern whose alternatives each contain a literal run (" rm ",
+    "--force") is gated on it: one Aho-Corasick pass over the text finds the
+    literals present, and only the bucket of the text's first word plus the
+    wildcard-led patterns whose literal occurs are verified, in list order.
+    Patterns without a literal (e.g. "*") are always verified. The programs
+    and the automaton are built on the first lookup (or by compile_all when
+    the matcher is stored in the compiled policy cache).
+    """
+
+    __slots__ = ("patterns", "_programs", "_buckets", "_generic", "_automaton", "_gated", "_candidates")
+
+    def __init__(self, patterns):
+        self.patterns = [p for p in patterns if isinstance(p, str)]
+        self._programs = [None] * len(self.patterns)
+        self._buckets = {}       # first word -> pattern indexes
+        self._generic = []       # indexes of patterns without a literal first word
+        self._automaton = None   # literal automaton (build_literal_automaton)
+        self._gated = frozenset()  # indexes only verified when scan_literals reports them
+        self._candidates = {}    # bucket key (None = generic only) -> _compile() result
+        for index, pattern in enumerate(self.patterns):
+            word = literal_first_word(pattern)
+            if word is None:
+                self._generic.append(index)
+            else:
+                self._buckets.setdefault(word, []).append(index)
+
+    def _program(self, index):
+        """Get the compiled glob program for one pattern"""
+        program = self._programs[index]
+        if program is None:
+            program = self._programs[index] = compile_glob(self.patterns[index])
+        return program
+
+    def _compile(self, key):
+        """
+        Collect the candidates of one bucket: (always verified indexes in list
+        order, indexes verified only when their literal occurs)
+        """
+        if key is None:
+            indexes = self._generic
+        else:
+            indexes = sorted(self._buckets[key] + self._generic)
+        gated = self._gated
+        return tuple(i for i in indexes if i not in gated), frozenset(i for i in indexes if i in gated)
+
+    def match(self, text):
+        """Return the first pattern (in list order) matching text, or None"""
+        if self._automaton is None:
+            self.compile_all()
+        word = first_word(text)
+        key = word if word in self._buckets else None
+        candidates = self._candidates.get(key)
+        if candidates is None:
+            candidates = self._candidates[key] = self._compile(key)
+        indexes, gated = candidates
+        if gated:
+            found = [index for index in scan_literals(self._automaton, text) if index in gated]
+            if found:
+                indexes = sorted(indexes + tuple(found))
+        programs = self._programs
+        for index in indexes:
+            if glob_match(programs[index], text):
+                return self.patterns[index]
+        return None
+
+    def compile_all(self):
+        """Compile every pattern and the literal automaton up front"""
+        literals = []
+        gated = []
+        for index in range(len(self.patterns)):
+            alternatives = [required_literal(segments) for segments in self._program(index)]
+            if all(alternatives):
+                gated.append(index)
+                literals.extend((literal, index) for literal in set(alternatives))
+        self._automaton = build_literal_automaton(literals)
+        self._gated = frozenset(gated)
+        return self
+
+    def to_state(self):
+        """Export as plain data (tuples/dicts/str only, marshal-safe)"""
+        self.compile_all()
+        return (
+            tuple(self.patterns),
+            tuple(self._programs),
+            {word: tuple(indexes) for word, indexes in self._buckets.items()},
+            tuple(self._generic),
+            self._automaton,
+            self._gated,
+        )
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a matcher from to_state() output without compiling anything"""
+        matcher = cls.__new__(cls)
+        # Tuples are used as-is: every program is already compiled
+        (matcher.patterns, matcher._programs, matcher._buckets, matcher._generic,
+         matcher._automaton, matcher._gated) = state
+        matcher._candidates = {}
+        return matcher
+
+
+# Compiled matchers keyed by id() of the source list (list kept alive in the value)
+_matcher_cache = {}
+
+
+def get_matcher(permissions, category, list_type):
+    """Get the compiled matcher for categories.<category>.<list_type>"""
+    item_list = permissions.get("categories", {}).get(category, {}).get(list_type, [])
+    if isinstance(item_list, PatternMatcher):
+        # Already compiled (policy loaded through load_policy)
+        return item_list
+    cached = _matcher_cache.get(id(item_list))
+    if cached is None or cached[0] is not item_list:
+        cached = (item_list, PatternMatcher(item_list))
+        _matcher_cache[id(item_list)] = cached
+    return cached[1]
+
+
+# Shell lexer: one left-to-right pass over a Bash command line that yields the
+# simple commands together with their argv, path arguments and write targets
+# Reserved words that only introduce or close a compound command
+SHELL_KEYWORDS = frozenset(("if", "then", "elif", "else", "fi", "do", "done",
+                            "while", "until", "!", "{", "}"))
+# Redirection targets that are not files on disk
+SHELL_NULL_TARGETS = frozenset(("/dev/null", "/dev/stdout", "/dev/stderr", "/dev/tty"))
+# First characters of path-like arguments (drive letters are checked separately)
+SHELL_PATH_STARTS = frozenset("/~.$\\")
+# Deepest (...) / $(...) / `...` nesting the lexer follows; nested text is
+# copied once per level, so this also bounds the work to linear
+SHELL_MAX_DEPTH = 32
+# Regex sources, compiled on first use (re caches compiled patterns) so that
+# events that never lex a command skip the compile
+# Redirection operators, longest first
+_REDIRECT_PATTERN = r"<<<|<<-|<<|<>|<&|>>|>&|>\||&>>|&>|<|>"
+# Runs of characters with no special meaning outside quotes
+_WORD_RUN_PATTERN = r"[^\s;&|<>()'\"`$\\]+"
+# Characters with special meaning inside double quotes
+_DQUOTE_SPECIAL_PATTERN = r"[\"\\$`]"
+
+
+class ShellCommand:
+    """One simple command of a command line"""
+
+    __slots__ = ("text", "argv", "paths", "writes")
+
+    def __init__(self, text, argv=(), paths=(), writes=()):
+        self.text = text      # source text, redirections included
+        self.argv = argv      # unquoted words, redirections excluded
+        self.paths = paths    # path-like arguments and redirection targets
+        self.writes = writes  # output redirection targets
+
+    def __repr__(self):
+        return f"ShellCommand({self.text!r}, {self.argv!r}, {self.paths!r}, {self.writes!r})"
+
+
+def shell_path_argument(arg):
+    """Return the path an argument refers to, or None if it is not path-like"""
+    if arg[:1] not in SHELL_PATH_STARTS and arg[1:2] != ":" and "=" not in arg and "/.." not in arg:
+        return None  # plain word: options, names, relative paths
+    if "=" in arg:
+        name, value = arg.split("=", 1)
+        if name.startswith("-") or name.isidentifier():
+            arg = value  # --file=/etc/hosts, DEST=/tmp/out
+    if not arg or "://" in arg or arg.startswith(("$(", "`")):
+        return None
+    if arg[0] == "$":
+        for var, repl in (("$HOME", "~"), ("${HOME}", "~"), ("$PWD", "."), ("${PWD}", ".")):
+            if arg == var or arg.startswith(var + "/"):
+                return repl + arg[len(var):]
+        # Unknown variable: keep the path part as absolute, as the regex scan did
+        slash = arg.find("/")
+        return arg[slash:] if slash >= 0 else None
+    if arg[0] in "/~" or arg.startswith(("./", "../", "\\\\")) or arg == "..":
+        return arg
+    if len(arg) > 2 and arg[1] == ":" and arg[2] in "/\\" and arg[0].isalpha():
+        return arg
+    if "/../" in arg or arg.endswith("/.."):
+        return arg
+    return None
+
+
+class _LexFrame:
+    """Nesting level of the lexer: top level, (...) group, $(...), `...`, <(...)"""
+
+    __slots__ = ("close", "kind", "open", "start", "end", "argv", "paths", "writes",
+                 "redirect", "word", "word_start", "quoted", "in_dquote")
+
+    def __init__(self, close, kind, open_index):
+        self.close = close       # character ending the frame ("" at top level)
+        self.kind = kind         # "top", "group", "subst" or "backtick"
+        self.open = open_index   # index of the opening token
+        self.in_dquote = False
+        self.reset()
+
+    def reset(self):
+        self.start = -1          # index where the current command's text starts
+        self.end = -1
+        self.argv = []
+        self.paths = []
+        self.writes = []
+        self.redirect = None     # redirection operator waiting for its target
+        self.word = None         # parts of the word being read
+        self.word_start = -1
+        self.quoted = False
+
+
+def lex_command(command):
+    """
+    Split a Bash command line into ShellCommands in a single linear pass
+    Separators: && || ; | |& & and newlines; (...) groups, $(...), `...` and
+    <(...) nest, heredoc bodies are skipped, redirections become write targets
+    Commands nested in a substitution come before the command containing it;
+    their text has line continuations (backslash-newline outside single
+    quotes) removed, as the shell does
+    Raises ValueError when nesting is deeper than SHELL_MAX_DEPTH
+    """
+    redirect_re = re.compile(_REDIRECT_PATTERN)
+    word_run_re = re.compile(_WORD_RUN_PATTERN)
+    dquote_special_re = re.compile(_DQUOTE_SPECIAL_PATTERN)
+    commands = []
+    heredocs = []
+    continuations = []  # indices of the line continuations, ascending
+    frame = _LexFrame("", "top", 0)
+    stack = []
+    n = len(command)
+
+    def begin_word(f, i):
+        if f.word is None:
+            f.word = []
+            f.word_start = i
+            f.quoted = False
+
+    def finish_word(f, i):
+        if f.word is None:
+            return
+        value = "".join(f.word)
+        word_start = f.word_start
+        f.word = None
+        op = f.redirect
+        if op is not None:
+            f.redirect = None
+            f.end = i
+            if op in ("<<", "<<-"):
+                heredocs.append((value, op == "<<-"))
+            elif op in (">&", "<&") and (value.isdigit() or value == "-"):
+                pass  # file descriptor duplication
+            elif op != "<<<" and value not in SHELL_NULL_TARGETS:
+                path = shell_path_argument(value)
+                if path is not None:
+                    f.paths.append(path)
+                if op != "<" and op != "<&":
+                    f.writes.append(value)
+            return
+        if not f.argv and not f.quoted and value in SHELL_KEYWORDS:
+            return
+        if f.start < 0:
+            f.start = word_start
+        f.end = i
+        if f.argv or "=" in value:
+            path = shell_path_argument(value)
+            if path is not None:
+                f.paths.append(path)
+        f.argv.append(value)
+
+    def source_text(start, end):
+        text = command[start:end]
+        if continuations and continuations[-1] >= start:
+            from bisect import bisect_left
+            cuts = continuations[bisect_left(continuations, start):bisect_left(continuations, end)]
+            if cuts:
+                parts = []
+                for k in cuts:
+                    parts.append(command[start:k])
+                    start = k + 2
+                parts.append(command[start:end])
+                text = "".join(parts)
+        return text.strip()
+
+    def finish_command(f, i):
+        finish_word(f, i)
+        if f.start >= 0:
+            commands.append(ShellCommand(source_text(f.start, f.end), f.argv, f.paths, f.writes))
+        f.reset()
+
+    def skip_heredocs(i):
+        for delimiter, strip_tabs in heredocs:
+            while i < n:
+                nl = command.find("\n", i)
+                line = command[i:] if nl < 0 else command[i:nl]
+                i = n if nl < 0 else nl + 1
+                if (line.lstrip("\t") if strip_tabs else line) == delimiter:
+                    break
+        heredocs.clear()
+        return i
+
+    def push(kind, close, i):
+        if len(stack) >= SHELL_MAX_DEPTH:
+            raise ValueError(f"command nesting deeper than {SHELL_MAX_DEPTH} levels")
+        stack.append(frame)
+        return _LexFrame(close, kind, i)
+
+    def pop(f, i):
+        # i is the index of the closing character
+        finish_command(f, i)
+        parent = stack.pop()
+        if f.kind != "group":
+            begin_word(parent, f.open)
+            parent.word.append(command[f.open:i + 1])
+        return parent
+
+    i = 0
+    while i < n:
+        f = frame
+        c = command[i]
+
+        if f.in_dquote:
+            m = dquote_special_re.search(command, i)
+            j = m.start() if m else n
+            if j > i:
+                f.word.append(command[i:j])
+                i = j
+                continue
+            if c == '"':
+                f.in_dquote = False
+                i += 1
+            elif c == "\\":
+                nxt = command[i + 1:i + 2]
+                if nxt == "\n":
+                    continuations.append(i)  # line continuation
+                else:
+                    f.word.append(nxt if nxt in ("$", "`", '"', "\\") else c + nxt)
+                i += 2
+            elif c == "`":
+                frame = push("backtick", "`", i)
+                i += 1
+            elif command.startswith("$(", i) and not command.startswith("$((", i):
+                frame = push("subst", ")", i)
+                i += 2
+            else:
+                f.word.append(c)
+                i += 1
             continue
 
-        if char == "'" and not in_double_quote:
-            in_single_quote = not in_single_quote
-            current_cmd.append(char)
-            i += 1
+        m = word_run_re.match(command, i)
+        if m and not (c == "#" and f.word is None):
+            begin_word(f, i)
+            f.word.append(m.group())
+            i = m.end()
             continue
 
-        # If inside quotes, add character directly
-        if in_single_quote or in_double_quote:
-            current_cmd.append(char)
+        if c == "\n":
+            finish_command(f, i)
+            i = skip_heredocs(i + 1)
+        elif c.isspace():
+            finish_word(f, i)
             i += 1
+        elif c == "#":
+            # Comment up to the end of the line
+            nl = command.find("\n", i)
+            i = n if nl < 0 else nl
+        elif c == "\\":
+            if command.startswith("\\\n", i):
+                continuations.append(i)  # line continuation
+                i += 2
+                continue
+            begin_word(f, i)
+            nxt = command[i + 1:i + 2]
+            # Backslashes before ordinary characters are kept so Windows paths survive
+            f.word.append(c + nxt if nxt.isalnum() or nxt == "\\" else nxt)
+            f.quoted = True
+            i += 2
+        elif c == "'":
+            begin_word(f, i)
+            j = command.find("'", i + 1)
+            j = n if j < 0 else j
+            f.word.append(command[i + 1:j])
+            f.quoted = True
+            i = j + 1
+        elif c == '"':
+            begin_word(f, i)
+            f.quoted = True
+            f.in_dquote = True
+            i += 1
+        elif c == "`":
+            if f.close == "`":
+                frame = pop(f, i)
+            else:
+                frame = push("backtick", "`", i)
+            i += 1
+        elif c == "$":
+            if command.startswith("$((", i) or command.startswith("${", i):
+                # Arithmetic or parameter expansion: copy up to the balancing bracket
+                opening, closing = ("(", ")") if command[i + 1] == "(" else ("{", "}")
+                depth = 0
+                j = i + 1
+                while j < n:
+                    if command[j] == opening:
+                        depth += 1
+                    elif command[j] == closing:
+                        depth -= 1
+                        if depth == 0:
+                            break
+                    j += 1
+                begin_word(f, i)
+                f.word.append(command[i:j + 1])
+                i = j + 1
+            elif command.startswith("$(", i):
+                frame = push("subst", ")", i)
+                i += 2
+            else:
+                begin_word(f, i)
+                f.word.append(c)
+                i += 1
+        elif c == "(":
+            if f.word is None and not f.argv:
+                frame = push("group", ")", i)
+            else:
+                begin_word(f, i)
+                f.word.append(c)
+            i += 1
+        elif c == ")":
+            if f.close == ")":
+                frame = pop(f, i)
+            else:
+                finish_command(f, i)
+            i += 1
+        elif c in "<>" and command.startswith("(", i + 1) and f.word is None:
+            frame = push("subst", ")", i)  # process substitution
+            i += 2
+        elif c in "<>" or command.startswith("&>", i):
+            if f.word is not None and f.redirect is None and command[i - 1].isdigit() \
+                    and "".join(f.word).isdigit():
+                # File descriptor number: 2>file
+                if f.start < 0:
+                    f.start = f.word_start
+                f.word = None
+            finish_word(f, i)
+            op = redirect_re.match(command, i).group()
+            if f.start < 0:
+                f.start = i
+            f.redirect = op
+            f.end = i + len(op)
+            i += len(op)
+        else:
+            # ; & | and their doubled forms separate commands
+            finish_command(f, i)
+            i += 2 if command[i:i + 2] in ("&&", "||", ";;", "|&") else 1
+
+    # Close whatever is left open at the end of the input
+    while True:
+        finish_command(frame, n)
+        if not stack:
+            break
+        frame = pop(frame, n - 1)
+    return commands
+
+
+def split_command(command):
+    """
+    Split combined commands into independent sub-commands
+    Supports &&, ||, ;, |, &, newlines, subshells and command substitution
+    Correctly handles content within quotes (does not split separators within quotes)
+    """
+    try:
+        sub_commands = [cmd.text for cmd in lex_command(command)]
+    except ValueError:
+        sub_commands = []
+    return sub_commands if sub_commands else [command]
+
+
+def find_in_list(item, permissions, category, list_type):
+    """Return the pattern of the specified list matching tool or command (supports Glob), or None"""
+    try:
+        pattern = get_matcher(permissions, category, list_type).match(item)
+        if pattern is not None:
+            log_debug(lambda: f"  {t('hook.log.matchedPattern', pattern=pattern)}")
+            return pattern
+    except Exception as e:
+        log_debug(f"  Error checking list: {e}")
+    return None
+
+
+def check_in_list(item, permissions, category, list_type):
+    """Check if tool or command is in specified list (supports Glob)"""
+    return find_in_list(item, permissions, category, list_type) is not None
+
+
+# Compiled policy sidecar, stored next to permissions.json
+POLICY_CACHE_NAME = "permissions.compiled"
+# Bump when the compiled layout changes so old sidecars are rebuilt
+POLICY_CACHE_FORMAT = 12
+# Top-level permissions.json keys the hook actually uses
+POLICY_KEYS = ("modes", "categories", "workspace", "directoryOverrides", "fileRules", "notifications",
+               "logging", "decisionCache")
+
+
+def compile_policy(permissions):
+    """
+    Compile a permissions dict into a plain-data policy state
+    Template-only keys (_comment, _description, language, _soundOptions) are
+    dropped, every category list is compiled into a PatternMatcher state,
+    every fileRules list into a FileRuleMatcher state, the logging section
+    into a log_settings() tuple and decisionCache into its enabled switch
+    """
+    state = {key: permissions[key] for key in POLICY_KEYS if key in permissions}
+
+    categories = {}
+    for category, config in state.get("categories", {}).items():
+        if not isinstance(config, dict):
             continue
+        categories[category] = {
+            list_type: PatternMatcher(config.get(list_type, [])).to_state()
+            for list_type in ("tools", "commands")
+        }
+    state["categories"] = categories
+
+    if "directoryOverrides" in state:
+        state["directoryOverrides"] = compile_directory_overrides(state["directoryOverrides"])
+    if "fileRules" in state:
+        state["fileRules"] = compile_file_rules(state["fileRules"])
+
+    state["logging"] = log_settings(state.get("logging"))
+    decision_cache = state.get("decisionCache")
+    # On unless switched off explicitly
+    state["decisionCache"] = 0 if isinstance(decision_cache, dict) and decision_cache.get("enabled") == 0 else 1
+
+    notifications = state.get("notifications")
+    if isinstance(notifications, dict):
+        state["notifications"] = {k: v for k, v in notifications.items() if not k.startswith("_")}
+
+    return state
+
+
+def policy_from_state(state):
+    """Build the runtime policy (same shape as permissions.json) from a compiled state"""
+    policy = dict(state)
+    policy["categories"] = {
+        category: {list_type: PatternMatcher.from_state(matcher_state)
+                   for list_type, matcher_state in lists.items()}
+        for category, lists in state.get("categories", {}).items()
+    }
+    if "fileRules" in state:
+        policy["fileRules"] = {
+            category: {action: FileRuleMatcher.from_state(matcher_state)
+                       for action, matcher_state in actions.items()}
+            for category, actions in state["fileRules"].items()
+        }
+    return policy
+
+
+def _policy_digest(source):
+    """Content hash of permissions.json used to validate the sidecar"""
+    import hashlib
+    return hashlib.blake2b(source, digest_size=16).hexdigest()
+
+
+# Coarsest file timestamp granularity the caches have to allow for (FAT: 2 s)
+MTIME_GRANULARITY_NS = 2_000_000_000
+
+
+def racily_clean(mtime_ns, written_ns):
+    """
+    True if a file with mtime_ns may have been modified again after a cache
+    entry for it was written at written_ns without its stat data changing
+    (same timestamp tick), so only its content hash can prove it unchanged.
+    Same rule as git's racily clean index entries.
+    """
+    return mtime_ns >= written_ns - MTIME_GRANULARITY_NS
+
+
+def _read_policy_cache(cache_file, permissions_file, stat_result):
+    """
+    Look up the sidecar for permissions_file
+    Returns (state, source, digest): state is None on a miss; source and
+    digest hold the permissions.json bytes and hash if they had to be read.
+    mtime + ctime + size equal is a hit, unless permissions.json was modified
+    within the timestamp granularity of the sidecar write; otherwise the
+    content hash decides. ctime catches edits whose mtime was restored.
+    """
+    import marshal
+    try:
+        with open(cache_file, "rb") as f:
+            written_ns = os.fstat(f.fileno()).st_mtime_ns
+            cached_format, mtime_ns, ctime_ns, size, digest, state = marshal.loads(f.read())
+    except Exception:
+        # Missing, truncated or written by another Python version
+        return None, None, None
+
+    if cached_format != POLICY_CACHE_FORMAT or size != stat_result.st_size:
+        return None, None, None
+    if mtime_ns == stat_result.st_mtime_ns and ctime_ns == stat_result.st_ctime_ns \
+            and not racily_clean(mtime_ns, written_ns):
+        return state, None, None
+
+    with open(permissions_file, "rb") as f:
+        source = f.read()
+    source_digest = _policy_digest(source)
+    return (state if source_digest == digest else None), source, source_digest
+
+
+def _write_policy_cache(cache_file, stat_result, digest, state):
+    """Write the sidecar atomically (temp file + os.replace); failures are ignored"""
+    import marshal
+    temp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        data = marshal.dumps((POLICY_CACHE_FORMAT, stat_result.st_mtime_ns, stat_result.st_ctime_ns,
+                              stat_result.st_size, digest, state))
+        with open(temp_file, "wb") as f:
+            f.write(data)
+        os.replace(temp_file, cache_file)
+    except Exception as e:
+        log_debug(f"Failed to write compiled policy: {e}")
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+
+
+def load_policy(permissions_file):
+    """
+    Load permissions.json as a compiled policy, using the sidecar when valid
+    On a hit there is no JSON parsing and no pattern compiling; a stale or
+    corrupt sidecar is rebuilt transparently. Concurrent hooks either read a
+    complete sidecar or rebuild their own copy, since writes are atomic renames.
+    Raises on a missing or invalid permissions.json.
+    """
+    cache_file = os.path.join(os.path.dirname(permissions_file), POLICY_CACHE_NAME)
+    stat_result = os.stat(permissions_file)
+
+    state, source, digest = _read_policy_cache(cache_file, permissions_file, stat_result)
+    if state is not None:
+        log_debug("Compiled policy cache hit")
+        if source is not None and not racily_clean(stat_result.st_mtime_ns, time.time_ns()):
+            # Touched but unchanged: refresh the stored stat data to skip hashing next time
+            # (a sidecar rewritten within the granularity window would still be racy)
+            _write_policy_cache(cache_file, stat_result, digest, state)
+        return policy_from_state(state)
+
+    log_debug("Compiled policy cache miss, rebuilding")
+    if source is None:
+        with open(permissions_file, "rb") as f:
+            source = f.read()
+        digest = _policy_digest(source)
+    permissions = json.loads(source.decode("utf-8"))
+    state = compile_policy(permissions)
+    _write_policy_cache(cache_file, stat_result, digest, state)
+    return policy_from_state(state)
+
+
+def extract_paths_from_command(command):
+    """Extract path arguments and redirection targets from command"""
+    paths = []
+    try:
+        for cmd in lex_command(command):
+            paths.extend(cmd.paths)
+    except ValueError as e:
+        log_debug(f"  Error parsing command: {e}")
+    return paths
+
+
+# Path canonicalization, memoized per evaluation: the daemon and batch mode
+# clear the caches before every request (clear_path_caches) so retargeted
+# symlinks are picked up; PATH_CACHE_SIZE bounds them within one request
+PATH_CACHE_SIZE = 4096
+# (path, work_dir) -> canonical path
+_canonical_cache = {}
+# lexical absolute path -> path with symlinks resolved
+_realpath_cache = {}
+# work_dir -> workspace roots
+_workspace_root_cache = {}
+
+# File system lookups of the evaluation being recorded for the decision cache:
+# (kind, argument) -> result, or None when not recording (observe_filesystem)
+_fs_observations = None
+
+# Drive letters as seen from Git Bash / Cygwin / WSL: /c/Users, /cygdrive/c, /mnt/c
+_POSIX_DRIVE_PATTERN = r"^/(?:cygdrive/|mnt/)?([A-Za-z])(?=/|$)"
+
 
-        # Check if it's a separator (&&, ||, ;)
-        if i + 1 < len(command):
-            two_chars = command[i:i+2]
-            if two_chars in ['&&', '||']:
-                # Save current command
-                cmd = ''.join(current_cmd).strip()
-                if cmd:
-                    sub_commands.append(cmd)
-                current_cmd = []
-                i += 2
-                continue
+def is_drive_path(path):
+    """True for a / separated drive path: c:, c:/ or c:/dir"""
+    return len(path) > 1 and path[1] == ":" and ("a" <= path[0] <= "z" or "A" <= path[0] <= "Z") \
+        and (len(path) == 2 or path[2] == "/")
 
-        if char == ';':
-            # Save current command
-            cmd = ''.join(current_cmd).strip()
-            if cmd:
-                sub_commands.append(cmd)
-            current_cmd = []
-            i += 1
-            continue
 
-        # Regular character
-        current_cmd.append(char)
-        i += 1
+def normalize_path(path, work_dir=""):
+    """
+    Lexically normalize a path: ~ expanded, / separators, lowercase drive
+    paths, relative paths joined to work_dir, . and .. resolved without
+    climbing above the root (/, c:/ or //server/share)
+    """
+    # Expand ~ to user home directory
+    if path.startswith("~"):
+        path = os.path.expanduser(path)
 
-    # Add the last command
-    cmd = ''.join(current_cmd).strip()
-    if cmd:
-        sub_commands.append(cmd)
+    normalized = path.replace("\\", "/")
+
+    if normalized.startswith("//"):
+        # UNC path: //server/share is the root
+        parts = normalized[2:].split("/", 2)
+        anchor = "//" + "/".join(parts[:2])
+        rest = "/" + parts[2] if len(parts) > 2 else "/"
+    elif is_drive_path(normalized):
+        normalized = normalized.lower()
+        anchor, rest = normalized[:2], normalized[2:] or "/"
+    elif normalized.startswith("/"):
+        anchor, rest = "", normalized
+    elif work_dir:
+        # Relative path: resolve against the working directory
+        return normalize_path(normalize_path(work_dir) + "/" + normalized)
+    else:
+        return normalized
 
-    return sub_commands if sub_commands else [command]
+    rest = _posix_normpath(rest)
+    if anchor and rest == "/":
+        return anchor if anchor.startswith("//") else anchor + "/"
+    return anchor + rest
+
+
+def _posix_normpath(path):
+    """posixpath.normpath for an absolute path, without its // special case"""
+    parts = []
+    for part in path.split("/"):
+        if part == "..":
+            if parts:
+                parts.pop()
+        elif part and part != ".":
+            parts.append(part)
+    return "/" + "/".join(parts)
+
+
+def resolve_path(path):
+    """Resolve symlinks of a normalized absolute path on the local file system (memoized)"""
+    local = is_drive_path(path) if os.name == "nt" else path.startswith("/") and not path.startswith("//")
+    if not local:
+        return path
+    resolved = _realpath_cache.get(path)
+    if resolved is None:
+        if len(_realpath_cache) > PATH_CACHE_SIZE:
+            _realpath_cache.clear()
+        resolved = _realpath_cache[path] = normalize_path(os.path.realpath(path))
+    if _fs_observations is not None:
+        _fs_observations[("realpath", path)] = resolved
+    return resolved
+
+
+def clear_path_caches():
+    """Forget memoized symlink targets, workspace and repository roots"""
+    _canonical_cache.clear()
+    _realpath_cache.clear()
+    _workspace_root_cache.clear()
+    _repository_root_cache.clear()
+
+
+def observe_filesystem():
+    """Start recording the file system lookups (symlinks, repository roots) a decision depends on"""
+    global _fs_observations
+    _fs_observations = {}
+
+
+def filesystem_observations():
+    """Stop recording; returns ((kind, argument, result), ...) for filesystem_unchanged"""
+    global _fs_observations
+    observations = tuple((kind, argument, result) for (kind, argument), result in (_fs_observations or {}).items())
+    _fs_observations = None
+    return observations
+
+
+def filesystem_unchanged(observations):
+    """True if every recorded lookup still gives the same result"""
+    for kind, argument, result in observations:
+        if kind == "realpath":
+            current = normalize_path(os.path.realpath(argument))
+        else:
+            current = repository_root(argument)
+        if current != result:
+            return False
+    return True
 
 
-def check_in_list(item, permissions, category, list_type):
-    """Check if tool or command is in specified list (supports Glob)"""
-    try:
-        item_list = permissions.get("categories", {}).get(category, {}).get(list_type, [])
-        for pattern in item_list:
-            if match_glob(item, pattern):
-                log_debug(f"  {t('hook.log.matchedPattern', pattern=pattern)}")
-                return True
-    except Exception as e:
-        log_debug(f"  Error checking list: {e}")
-    return False
+def workspace_roots(work_dir):
+    """
+    Canonical roots that count as inside the workspace for work_dir
+    The working directory as given and with symlinks resolved, plus the
+    target of its .claude directory when that is a symlink to a shared
+    config directory (setup_claude_dir.py)
+    """
+    roots = _workspace_root_cache.get(work_dir)
+    if roots is None:
+        base = normalize_path(work_dir)
+        roots = []
+        for root in (base, resolve_path(base), resolve_path(base.rstrip("/") + "/.claude")):
+            if root not in roots:
+                roots.append(root)
+        if len(_workspace_root_cache) > PATH_CACHE_SIZE:
+            _workspace_root_cache.clear()
+        roots = _workspace_root_cache[work_dir] = tuple(roots)
+    return roots
+
+
+def canonical_path(path, work_dir):
+    """Normalized absolute path with symlinks resolved (memoized per path and work_dir)"""
+    key = (path, work_dir)
+    canonical = _canonical_cache.get(key)
+    if canonical is None:
+        canonical = normalize_path(path, work_dir)
+        # Git Bash / WSL spelling of a drive path while the workspace is on a drive
+        match = re.match(_POSIX_DRIVE_PATTERN, canonical)
+        if match and is_drive_path(normalize_path(work_dir)):
+            canonical = normalize_path(match.group(1) + ":" + (canonical[match.end():] or "/"))
+        canonical = resolve_path(canonical)
+        if len(_canonical_cache) > PATH_CACHE_SIZE:
+            _canonical_cache.clear()
+        _canonical_cache[key] = canonical
+    return canonical
+
+
+def path_within(path, root):
+    """Component-wise containment: /repo contains /repo/a but not /repo-other"""
+    if path == root:
+        return True
+    return path.startswith(root if root.endswith("/") else root + "/")
 
 
-def extract_paths_from_command(command):
-    """Extract path arguments from command"""
-    args = re.sub(r'^[^\s]+\s+', '', command)
-
-    path_patterns = [
-        r'[A-Za-z]:[/\\][^\s]*',      # Windows 绝对路径
-        r'\\\\[^\s]+\\[^\s]*',         # UNC 路径 (反斜杠)
-        r'//[^\s]+/[^\s]*',            # UNC 路径 (正斜杠)
-        r'/[^\s]*',                    # Unix 绝对路径
-        r'~[^\s]*',                    # 用户目录
-        r'\./[^\s]*',                  # 相对路径 ./
-        r'\.\./[^\s]*'                 # 相对路径 ../
-    ]
+def _root_key(path):
+    """Sort key of a root: / maps to \0 so a root sorts right before its subpaths"""
+    return path.rstrip("/").replace("/", "\0")
 
-    paths = []
-    for pattern in path_patterns:
-        matches = re.findall(pattern, args)
-        paths.extend(matches)
 
-    return paths
+class RootIndex:
+    """
+    Sorted prefix index of workspace roots (permissions.json workspace.additionalRoots)
+    Roots nested in another root are dropped; the remaining ones are disjoint,
+    so only the nearest key sorting at or before a path can contain it and
+    a lookup is one binary search
+    """
 
+    __slots__ = ("keys",)
 
-def normalize_path(path):
-    """Normalize path"""
-    # Expand ~ to user home directory
-    if path.startswith('~'):
-        path = os.path.expanduser(path)
+    def __init__(self, roots):
+        keys = []
+        for key in sorted(set(_root_key(root) for root in roots)):
+            if keys and (key == keys[-1] or key.startswith(keys[-1] + "\0")):
+                continue
+            keys.append(key)
+        self.keys = keys
 
-    normalized = path.replace('\\', '/')
+    def __len__(self):
+        return len(self.keys)
 
-    if normalized.startswith('//'):
-        return normalized
+    def contains(self, path):
+        """True if path (canonical) is one of the roots or below one"""
+        from bisect import bisect_right
+        key = _root_key(path)
+        i = bisect_right(self.keys, key) - 1
+        return i >= 0 and (key == self.keys[i] or key.startswith(self.keys[i] + "\0"))
 
-    if re.match(r'^[A-Za-z]:', normalized):
-        return normalized.lower()
 
-    return normalized
+def build_root_index(roots, base_dir):
+    """
+    RootIndex of configured roots, each as written and with symlinks resolved
+    Relative roots are resolved against base_dir (the project directory)
+    """
+    canonical = []
+    for root in roots:
+        if not isinstance(root, str) or not root.strip():
+            continue
+        normalized = normalize_path(root.strip(), base_dir)
+        canonical.append(normalized)
+        canonical.append(resolve_path(normalized))
+    return RootIndex(canonical)
 
 
-def is_path_outside_workspace(path, work_dir):
-    """Check if path is outside workspace"""
-    normalized_path = normalize_path(path)
-    normalized_workdir = normalize_path(work_dir)
+# Repository root discovery (workspace.useRepositoryRoot), cached on disk per cwd
+REPO_ROOT_CACHE_NAME = "workspace-roots.cache"
+# Bump when the cache layout changes
+REPO_ROOT_CACHE_FORMAT = 1
+# Maximum number of cached working directories
+REPO_ROOT_CACHE_SIZE = 256
+# work_dir -> repository root (or None), per process
+_repository_root_cache = {}
 
-    log_debug(f"  {t('hook.log.checkingPath', path=normalized_path)}")
-    log_debug(f"  {t('hook.log.workingDir', dir=normalized_workdir)}")
 
-    # UNC path detection
-    if normalized_path.startswith('//'):
-        if normalized_workdir.startswith('//'):
-            if normalized_path.startswith(normalized_workdir):
-                return False
-        return True
+def find_repository_root(work_dir, stop_dir=None):
+    """
+    Walk up from work_dir to the nearest directory holding .git (a directory,
+    or a file for worktrees and submodules), stopping early at stop_dir
+    Returns the normalized root, or None outside any repository
+    """
+    directory = normalize_path(work_dir)
+    while True:
+        if os.path.exists(os.path.join(directory, ".git")) or directory == stop_dir:
+            return directory
+        parent = normalize_path(os.path.dirname(directory))
+        if parent == directory or not parent:
+            return None
+        directory = parent
+
+
+def _root_cache_valid(validators):
+    """True if every (directory, mtime) pair still matches"""
+    try:
+        return all(os.stat(directory).st_mtime_ns == mtime_ns for directory, mtime_ns in validators)
+    except OSError:
+        return False
 
-    # Windows absolute path detection
-    if re.match(r'^[a-z]:', normalized_path):
-        if re.match(r'^[a-z]:', normalized_workdir):
-            if normalized_path.startswith(normalized_workdir):
-                return False
-        return True
 
-    # WSL path detection
-    if normalized_path.startswith('/mnt/'):
-        if normalized_workdir.startswith('/mnt/'):
-            if normalized_path.startswith(normalized_workdir):
-                return False
-        return True
+def repository_root(work_dir):
+    """
+    Enclosing repository root of work_dir, or None
+    The walk stops at .git, or at the project directory holding this hook's
+    .claude (project hooks only: for ~/.claude that would be the home directory).
+    Results are cached per cwd in .claude/workspace-roots.cache and revalidated
+    by the mtimes of cwd and the root, which change when a .git appears in cwd or
+    disappears from the root; a repository created in a directory in between is
+    picked up once either of them changes.
+    """
+    if work_dir in _repository_root_cache:
+        root = _repository_root_cache[work_dir]
+        if _fs_observations is not None:
+            _fs_observations[("repository", work_dir)] = root
+        return root
+
+    import marshal
+    claude_dir = os.path.dirname(SCRIPT_DIR)
+    cache_file = os.path.join(claude_dir, REPO_ROOT_CACHE_NAME)
+    try:
+        with open(cache_file, "rb") as f:
+            cache_format, entries = marshal.loads(f.read())
+        if cache_format != REPO_ROOT_CACHE_FORMAT:
+            entries = {}
+    except Exception:
+        entries = {}
 
-    # Unix absolute path detection
-    if normalized_path.startswith('/'):
-        if normalized_path.startswith(normalized_workdir):
+    entry = entries.get(work_dir)
+    if entry is not None and _root_cache_valid(entry[1]):
+        root = entry[0]
+    else:
+        stop_dir = None
+        if normalize_path(claude_dir) != normalize_path(os.path.expanduser("~/.claude")):
+            stop_dir = normalize_path(os.path.dirname(claude_dir))
+        root = find_repository_root(work_dir, stop_dir)
+        try:
+            validators = tuple((directory, os.stat(directory).st_mtime_ns)
+                               for directory in dict.fromkeys((work_dir, root)) if directory)
+        except OSError:
+            validators = ()
+        entries.pop(work_dir, None)
+        entries[work_dir] = (root, validators)
+        while len(entries) > REPO_ROOT_CACHE_SIZE:
+            del entries[next(iter(entries))]
+        temp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, "wb") as f:
+                f.write(marshal.dumps((REPO_ROOT_CACHE_FORMAT, entries)))
+            os.replace(temp_file, cache_file)
+        except Exception as e:
+            log_debug(f"Failed to write workspace root cache: {e}")
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+
+    log_debug(lambda: f"Repository root: {root}")
+    _repository_root_cache[work_dir] = root
+    if _fs_observations is not None:
+        _fs_observations[("repository", work_dir)] = root
+    return root
+
+
+def is_path_outside_workspace(path, work_dir, extra_roots=None, workspace_root=None):
+    """
+    Check if path is outside workspace
+    extra_roots is an optional RootIndex of additional workspace roots;
+    workspace_root replaces work_dir as the workspace (relative paths are
+    still resolved against work_dir)
+    """
+    if not work_dir:
+        # No workspace known: only relative paths count as inside
+        if not (is_drive_path(path) or path.startswith(("/", "\\", "~"))):
             return False
+        return not (extra_roots and extra_roots.contains(canonical_path(path, "")))
 
-        # System directory detection
-        system_dirs = [
-            '/etc/', '/usr/', '/var/', '/tmp/',
-            '/system/', '/library/',
-            'c:/windows', 'c:/program files', 'c:/programdata', 'c:/temp'
-        ]
-        for sys_dir in system_dirs:
-            if normalized_path.lower().startswith(sys_dir):
-                return True
+    canonical = canonical_path(path, work_dir)
+    roots = workspace_roots(workspace_root or work_dir)
 
-        return True
+    log_debug(lambda: f"  {t('hook.log.checkingPath', path=canonical)}")
+    # Joined inside the lambda so nothing is formatted below trace level (str.join keeps the
+    # separator's comma inside parentheses, where the installer's t() substitution expects it)
+    log_debug(lambda: f"  {t('hook.log.workingDir', dir=str.join(', ', roots))}")
 
-    # Relative paths default to inside workspace
-    return False
+    for root in roots:
+        if path_within(canonical, root):
+            return False
+    if extra_roots and extra_roots.contains(canonical):
+        log_debug("  Inside an additional workspace root")
+        return False
+    return True
 
 
 def send_notification(title, message, sound=""):
     """Send desktop notification"""
+    import platform
+    import subprocess
     system = platform.system()
-    log_debug(t('hook.log.sendingNotification', system=system, title=title, sound=sound))
+    log_debug(lambda: t('hook.log.sendingNotification', system=system, title=title, sound=sound))
 
     try:
         if system == "Darwin":  # macOS
@@ -323,7 +2357,7 @@ $notification.ShowBalloonTip(5000)
                 # Convert sound name to lowercase .wav filename
                 sound_file = sound.lower() + ".wav"
                 sound_path = f"C:\\Windows\\Media\\{sound_file}"
-                log_debug(f"Trying to play sound file: {sound_path}")
+                log_debug(lambda: f"Trying to play sound file: {sound_path}")
 
                 sound_script = f'''
 $soundPath = "{sound_path}"
@@ -336,7 +2370,7 @@ if (Test-Path $soundPath) {{
 '''
                 result = subprocess.run(["powershell", "-Command", sound_script],
                                       check=False, capture_output=True, text=True)
-                log_debug(f"Sound playback result: stdout={result.stdout}, stderr={result.stderr}")
+                log_debug(lambda: f"Sound playback result: stdout={result.stdout}, stderr={result.stderr}")
 
     except Exception as e:
         log_debug(t('hook.log.notificationFailed', error=str(e)))
@@ -344,8 +2378,10 @@ if (Test-Path $soundPath) {{
 
 def show_message_box(title, message):
     """Show a message box that blocks until user clicks OK"""
+    import platform
+    import subprocess
     system = platform.system()
-    log_debug(f"Showing message box: {title} - {message}")
+    log_debug(lambda: f"Showing message box: {title} - {message}")
 
     try:
         if system == "Darwin":  # macOS
@@ -377,7 +2413,7 @@ Add-Type -AssemblyName System.Windows.Forms
 
 def handle_stop_hook(hook_data, permissions):
     """Handle Stop event"""
-    log_debug(t('hook.log.processing', event='Stop'))
+    log_debug(lambda: t('hook.log.processing', event='Stop'))
 
     # Check if notifications are enabled
     notifications = permissions.get("notifications", {})
@@ -398,137 +2434,27 @@ def handle_stop_hook(hook_data, permissions):
     use_message_box = on_completion.get("useMessageBox", 0) == 1
 
     # Select sound based on system
+    import platform
     if platform.system() == "Windows":
         sound = on_completion.get("soundWindows", "SystemNotification")
     else:
         sound = on_completion.get("sound", "Glass")
 
     # Send system notification (can work together with message box)
-    log_debug(f"Sending completion notification: {title} - {message}")
+    log_debug(lambda: f"Sending completion notification: {title} - {message}")
     send_notification(title, message, sound)
 
     # Show message box if enabled (blocks until user clicks OK)
     if use_message_box:
-        log_debug(f"Showing completion message box: {title} - {message}")
+        log_debug(lambda: f"Showing completion message box: {title} - {message}")
         show_message_box(title, message)
     sys.exit(0)
 
 
-def check_single_command(command, permissions, mode, work_dir):
-    """
-    Check permissions for a single command
-    Returns: ("allow", category) or ("ask", category) or ("deny", category)
-    """
-    log_debug(f"  {t('hook.log.checkingCommand', command=command)}")
-
-    # 1. Check globalDeny (highest priority)
-    if mode.get("globalDeny") == 1:
-        if check_in_list(command, permissions, "globalDeny", "commands"):
-            log_debug(f"    {t('hook.log.decision', decision='globalDeny command match = deny')}")
-            return ("deny", "globalDeny")
-
-    # 2. Check globalAllow
-    if mode.get("globalAllow") == 1:
-        if check_in_list(command, permissions, "globalAllow", "commands"):
-            log_debug(f"    {t('hook.log.decision', decision='globalAllow command match = allow')}")
-            return ("allow", "globalAllow")
-
-    # 3. Determine command category
-    command_category = ""
-    if check_in_list(command, permissions, "risky", "commands"):
-        command_category = "risky"
-    elif check_in_list(command, permissions, "edit", "commands"):
-        command_category = "edit"
-    elif check_in_list(command, permissions, "read", "commands"):
-        command_category = "read"
-    elif check_in_list(command, permissions, "useWeb", "commands"):
-        command_category = "useWeb"
-    else:
-        command_category = "unknown"
-
-    # 4. Check if within workspace
-    is_in_workspace = True
-    paths = extract_paths_from_command(command)
-    if paths:
-        log_debug(f"    {t('hook.log.extractedPaths', paths=str(paths))}")
-        for path in paths:
-            if is_path_outside_workspace(path, work_dir):
-                is_in_workspace = False
-                break
-
-    log_debug(f"    Category: {command_category}, In Workspace: {is_in_workspace}")
-
-    # 5. Query permission switches based on category and workspace location
-    if command_category == "read":
-        if is_in_workspace:
-            if mode.get("read") == 1:
-                log_debug(f"    {t('hook.log.decision', decision='read + inside workspace = allow')}")
-                return ("allow", command_category)
-            else:
-                log_debug(f"    {t('hook.log.decision', decision='read + inside workspace + switch off = ask')}")
-                return ("ask", command_category)
-        else:
-            if mode.get("readAllFiles") == 1:
-                log_debug(f"    {t('hook.log.decision', decision='read + outside workspace = allow')}")
-                return ("allow", command_category)
-            else:
-                log_debug(f"    {t('hook.log.decision', decision='read + outside workspace + switch off = ask')}")
-                return ("ask", command_category)
-
-    elif command_category == "edit":
-        if is_in_workspace:
-            if mode.get("edit") == 1:
-                log_debug(f"    {t('hook.log.decision', decision='edit + inside workspace = allow')}")
-                return ("allow", command_category)
-            else:
-                log_debug(f"    {t('hook.log.decision', decision='edit + inside workspace + switch off = ask')}")
-                return ("ask", command_category)
-        else:
-            if mode.get("editAllFiles") == 1:
-                log_debug(f"    {t('hook.log.decision', decision='edit + outside workspace = allow')}")
-                return ("allow", command_category)
-            else:
-                log_debug(f"    {t('hook.log.decision', decision='edit + outside workspace + switch off = ask')}")
-                return ("ask", command_category)
-
-    elif command_category == "risky":
-        if is_in_workspace:
-            if mode.get("risky") == 1:
-                log_debug(f"    {t('hook.log.decision', decision='risky + inside workspace = allow')}")
-                return ("allow", command_category)
-            else:
-                log_debug(f"    {t('hook.log.decision', decision='risky + inside workspace + switch off = ask')}")
-                return ("ask", command_category)
-        else:
-            if mode.get("riskyAllFiles") == 1:
-                log_debug(f"    {t('hook.log.decision', decision='risky + outside workspace = allow')}")
-                return ("allow", command_category)
-            else:
-                log_debug(f"    {t('hook.log.decision', decision='risky + outside workspace + switch off = ask')}")
-                return ("ask", command_category)
-
-    elif command_category == "useWeb":
-        if mode.get("useWeb") == 1:
-            log_debug(f"    {t('hook.log.decision', decision='useWeb = allow')}")
-            return ("allow", command_category)
-        else:
-            log_debug(f"    {t('hook.log.decision', decision='useWeb + switch off = ask')}")
-            return ("ask", command_category)
-
-    elif command_category == "unknown":
-        if mode.get("allowUnknownCommand") == 1:
-            log_debug(f"    {t('hook.log.decision', decision='unknown command + switch on = allow')}")
-            return ("allow", command_category)
-        else:
-            log_debug(f"    {t('hook.log.decision', decision='unknown command + switch off = ask')}")
-            return ("ask", command_category)
-
-    return ("ask", command_category)
-
-
 def handle_permission_request_hook(hook_data, permissions):
     """Handle PermissionRequest event"""
-    log_debug(t('hook.log.processing', event='PermissionRequest'))
+    import platform
+    log_debug(lambda: t('hook.log.processing', event='PermissionRequest'))
 
     # Check if notifications are enabled
     notifications = permissions.get("notifications", {})
@@ -559,236 +2485,1655 @@ def handle_permission_request_hook(hook_data, permissions):
         sound = on_permission.get("sound", "Tink")
 
     # Send system notification (can work together with message box)
-    log_debug(f"Sending permission request notification: {title} - {message}")
+    log_debug(lambda: f"Sending permission request notification: {title} - {message}")
     send_notification(title, message, sound)
 
     # Show message box if enabled (blocks until user clicks OK)
     if use_message_box:
-        log_debug(f"Showing permission request message box: {title} - {message}")
+        log_debug(lambda: f"Showing permission request message box: {title} - {message}")
         show_message_box(title, message)
     sys.exit(0)
 
 
-def handle_pre_tool_use_hook(hook_data, permissions):
-    """Handle PreToolUse event - Permission check"""
-    log_debug(t('hook.log.processing', event='PreToolUse'))
+# Mode switches per category: (inside workspace, outside workspace)
+# "unknown" is an uncategorized Bash command, "unknownTool" an uncategorized tool
+MODE_SWITCHES = {
+    "read": ("read", "readAllFiles"),
+    "edit": ("edit", "editAllFiles"),
+    "risky": ("risky", "riskyAllFiles"),
+    "useWeb": ("useWeb", "useWeb"),
+    "useMcp": ("useMcp", "useMcp"),
+    "unknown": ("allowUnknownCommand", "allowUnknownCommand"),
+    "unknownTool": ("allowUnknownTool", "allowUnknownTool"),
+}
 
-    tool_name = hook_data.get("tool_name", "")
-    cli_permission_mode = hook_data.get("permission_mode", "default")
-    work_dir = hook_data.get("cwd", "")
-
-    log_debug(f"Tool: {tool_name}")
-    log_debug(f"CLI Mode: {cli_permission_mode}")
-    log_debug(f"{t('hook.log.workingDir', dir=work_dir)}")
-
-    # Get current mode configuration
-    mode = permissions.get("modes", {}).get(cli_permission_mode, {})
-    if not mode:
-        # dontAsk mode (used by sub-agents) - auto approve all
-        if cli_permission_mode == "dontAsk":
-            log_debug(t('hook.log.dontAskModeAutoApprove'))
-            output_result("PreToolUse", permissionDecision="allow")
+
+def compile_mode_table(mode):
+    """
+    Flatten a mode's switches into {(category, in_workspace): "allow" | "ask"}
+    Shared by the Bash and tool paths, so a decision is a single lookup
+    """
+    table = {}
+    for category, (inside, outside) in MODE_SWITCHES.items():
+        table[(category, True)] = "allow" if mode.get(inside) == 1 else "ask"
+        table[(category, False)] = "allow" if mode.get(outside) == 1 else "ask"
+    return table
+
+
+# Per-directory overrides (permissions.json directoryOverrides): below a
+# directory, "treatAs" remaps categories ("edit" -> "risky") and "switches"
+# replaces mode switches in every mode; the most specific directory wins
+def compile_directory_overrides(config):
+    """
+    Validate directoryOverrides into plain data: [(directory, treat_as, switches)]
+    Invalid entries and unknown category or switch names are dropped
+    """
+    if not isinstance(config, dict):
+        return []
+    switch_names = {name for pair in MODE_SWITCHES.values() for name in pair}
+    overrides = []
+    for directory, entry in config.items():
+        if not isinstance(directory, str) or not directory.strip() or not isinstance(entry, dict):
+            log_debug(f"Ignoring invalid directory override: {directory!r}")
+            continue
+        treat_as = entry.get("treatAs", {})
+        switches = entry.get("switches", {})
+        treat_as = {k: v for k, v in treat_as.items() if k in MODE_SWITCHES and isinstance(v, str) and v in MODE_SWITCHES} \
+            if isinstance(treat_as, dict) else {}
+        switches = {k: v for k, v in switches.items() if k in switch_names and v in (0, 1)} \
+            if isinstance(switches, dict) else {}
+        overrides.append((directory.strip(), treat_as, switches))
+    return overrides
+
+
+class DirectoryOverride:
+    """One compiled directoryOverrides entry"""
+
+    __slots__ = ("directory", "treat_as", "switches")
+
+    def __init__(self, directory, treat_as, switches):
+        self.directory = directory  # directory as written in permissions.json
+        self.treat_as = treat_as    # category -> category
+        self.switches = switches    # mode switch -> 0 / 1
+
+
+class PathTrie:
+    """
+    Trie of canonical directories, one dict level per path component, so a
+    lookup walks at most as many nodes as the path has components whatever
+    the number of directories
+    """
+
+    __slots__ = ("root", "size")
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, path, value):
+        node = self.root
+        for part in path.rstrip("/").split("/"):
+            node = node.setdefault(part, {})
+        if None not in node:
+            self.size += 1
+        node[None] = value  # None never collides with a component name
+
+    def longest_match(self, path):
+        """Value of the deepest directory that is path or one of its parents, or None"""
+        node = self.root
+        found = None
+        for part in path.rstrip("/").split("/"):
+            node = node.get(part)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+
+def build_override_trie(overrides, base_dir):
+    """
+    PathTrie of compiled directory overrides, each directory as written and
+    with symlinks resolved; relative directories are resolved against base_dir
+    """
+    trie = PathTrie()
+    for directory, treat_as, switches in overrides:
+        override = DirectoryOverride(directory, treat_as, switches)
+        normalized = normalize_path(directory, base_dir)
+        trie.insert(normalized, override)
+        trie.insert(resolve_path(normalized), override)
+    return trie
+
+
+# File rules (permissions.json fileRules): per category, gitignore-style
+# pattern lists for the file a tool operates on; deny wins over ask over allow
+FILE_RULE_ACTIONS = ("deny", "ask", "allow")
+
+GITIGNORE_WILDCARDS = "*?[\\"
+
+
+def gitignore_regex(pattern):
+    """
+    Translate one gitignore glob (no leading !, no trailing /) into a regex
+    * and ? do not cross /, [...] classes never match /, and ** as a whole
+    component matches any number of directories
+    """
+    parts = []
+    n = len(pattern)
+    i = 0
+    while i < n:
+        char = pattern[i]
+        if char == "*":
+            if pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/") \
+                    and (i + 2 == n or pattern[i + 2] == "/"):
+                if i + 2 == n:
+                    parts.append(".*")        # trailing /**: everything inside
+                    i += 2
+                else:
+                    parts.append("(?:.*/)?")  # **/: zero or more directories
+                    i += 3
+                continue
+            while i < n and pattern[i] == "*":
+                i += 1
+            parts.append("[^/]*")
+            continue
+        if char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            atom, next_index = _parse_class(pattern, i)
+            if atom is not None:
+                negated, members, ranges = atom
+                body = "".join(re.escape(m) for m in members)
+                body += "".join(f"{re.escape(low)}-{re.escape(high)}" for low, high in ranges)
+                parts.append(f"[^/{body}]" if negated else f"(?!/)[{body}]")
+                i = next_index
+                continue
+            parts.append(re.escape(char))
+        elif char == "\\" and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
         else:
-            log_debug(t('hook.log.modeNotFound', mode=cli_permission_mode))
-            output_result("PreToolUse", permissionDecision="ask")
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+def _literal_run(text):
+    """Length of the leading run of text without gitignore wildcards"""
+    for i, char in enumerate(text):
+        if char in GITIGNORE_WILDCARDS:
+            return i
+    return len(text)
+
+
+class FileRuleMatcher:
+    """
+    Compiled gitignore-style pattern list for one fileRules category/action
+    Blank lines and # comments are skipped, ! negates, the last matching
+    pattern wins. A pattern without a / (other than a trailing one) matches
+    any path component, so a file below a matching directory matches too; a
+    pattern with a / is anchored at the workspace root and also matches
+    everything below what it names (a trailing / is accepted but not checked
+    against the file system).
+    Component patterns are indexed by exact name, literal prefix and literal
+    suffix, anchored ones by their literal first component, so a lookup only
+    tests a few candidates per path component however long the list is.
+    Drive paths are lowercased by normalize_path, so they are matched against
+    a lowercased copy of the list (folded()).
+    """
+
+    __slots__ = ("patterns", "sources", "negated", "anchored", "_exact", "_prefix",
+                 "_suffix", "_first", "_generic", "_prefix_lengths", "_suffix_lengths", "_regexes", "_folded")
+
+    def __init__(self, patterns):
+        self.patterns = []
+        self.sources = []    # regex source per pattern
+        self.negated = []
+        self.anchored = []
+        self._exact = {}     # component name -> indexes
+        self._prefix = {}    # literal prefix of a component pattern -> indexes
+        self._suffix = {}    # literal suffix of a component pattern -> indexes
+        self._first = {}     # literal first component of an anchored pattern -> indexes
+        self._generic = []   # indexes tested for every path
+        for line in patterns:
+            if not isinstance(line, str):
+                continue
+            pattern = line.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            negated = pattern.startswith("!")
+            if negated or pattern.startswith("\\!") or pattern.startswith("\\#"):
+                pattern = pattern[1:]
+            body = pattern.rstrip("/")
+            while body.startswith("**/") and "/" not in body[3:]:
+                body = body[3:]  # **/name is the same as name
+            anchored = "/" in body
+            body = body.lstrip("/")
+            if not body:
+                continue
+
+            index = len(self.patterns)
+            self.patterns.append(line.strip())
+            self.sources.append(gitignore_regex(body))
+            self.negated.append(negated)
+            self.anchored.append(anchored)
+
+            if anchored:
+                first = body.split("/", 1)[0]
+                if _literal_run(first) == len(first):
+                    self._first.setdefault(first, []).append(index)
+                else:
+                    self._generic.append(index)
+                continue
+            prefix = _literal_run(body)
+            suffix = _literal_run(body[::-1])
+            if prefix == len(body):
+                self._exact.setdefault(body, []).append(index)
+            elif prefix:
+                self._prefix.setdefault(body[:prefix], []).append(index)
+            elif suffix:
+                self._suffix.setdefault(body[len(body) - suffix:], []).append(index)
+            else:
+                self._generic.append(index)
+        self._finish()
+
+    def _finish(self):
+        self._prefix_lengths = sorted({len(key) for key in self._prefix})
+        self._suffix_lengths = sorted({len(key) for key in self._suffix})
+        self._regexes = [None] * len(self.patterns)
+        self._folded = None
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def folded(self):
+        """
+        Matcher of the lowercased patterns, for lowercased (drive) paths; it
+        reports the patterns as written. Built on first use
+        """
+        if self._folded is None:
+            folded = FileRuleMatcher([pattern.lower() for pattern in self.patterns])
+            folded.patterns = self.patterns
+            self._folded = folded
+        return self._folded
+
+    def _regex(self, index):
+        regex = self._regexes[index]
+        if regex is None:
+            source = self.sources[index]
+            if self.anchored[index]:
+                source += "(?:/.*)?"
+            regex = self._regexes[index] = re.compile(source)
+        return regex
+
+    def _candidates(self, parts):
+        """Indexes of the patterns that can match a path with these components"""
+        candidates = set(self._generic)
+        candidates.update(self._first.get(parts[0], ()))
+        for part in parts:
+            candidates.update(self._exact.get(part, ()))
+            for length in self._prefix_lengths:
+                if length > len(part):
+                    break
+                candidates.update(self._prefix.get(part[:length], ()))
+            for length in self._suffix_lengths:
+                if length > len(part):
+                    break
+                candidates.update(self._suffix.get(part[len(part) - length:], ()))
+        return candidates
+
+    def match(self, path):
+        """
+        Return the pattern deciding that path (relative, / separated) matches,
+        or None if no pattern matches or the last matching one is negated
+        """
+        if not path or not self.patterns:
+            return None
+        parts = path.split("/")
+        for index in sorted(self._candidates(parts), reverse=True):
+            regex = self._regex(index)
+            if self.anchored[index]:
+                found = regex.fullmatch(path) is not None
+            else:
+                found = any(regex.fullmatch(part) for part in parts)
+            if found:
+                return None if self.negated[index] else self.patterns[index]
+        return None
+
+    def to_state(self):
+        """Export as plain data (marshal-safe)"""
+        return (tuple(self.patterns), tuple(self.sources), tuple(self.negated), tuple(self.anchored),
+                self._exact, self._prefix, self._suffix, self._first, self._generic)
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a matcher from to_state() output; regexes compile on first use"""
+        matcher = cls.__new__(cls)
+        (matcher.patterns, matcher.sources, matcher.negated, matcher.anchored, matcher._exact,
+         matcher._prefix, matcher._suffix, matcher._first, matcher._generic) = state
+        matcher._finish()
+        return matcher
+
+
+def compile_file_rules(config):
+    """Compile fileRules into {category: {action: FileRuleMatcher state}}"""
+    if not isinstance(config, dict):
+        return {}
+    compiled = {}
+    for category, actions in config.items():
+        if not isinstance(actions, dict):
+            log_debug(f"Ignoring invalid file rules for {category!r}")
+            continue
+        compiled[category] = {
+            action: FileRuleMatcher(actions[action]).to_state()
+            for action in FILE_RULE_ACTIONS if isinstance(actions.get(action), list)
+        }
+    return compiled
+
+
+class Decision:
+    """Result of one PreToolUse evaluation"""
+
+    __slots__ = ("decision", "category", "pattern", "in_workspace")
+
+    def __init__(self, decision, category="", pattern=None, in_workspace=True):
+        self.decision = decision          # "allow", "ask" or "deny"
+        self.category = category          # category that decided ("" if none)
+        self.pattern = pattern            # matched pattern, if any
+        self.in_workspace = in_workspace  # all paths inside the workspace
+
+    def __repr__(self):
+        return (f"Decision({self.decision!r}, {self.category!r}, "
+                f"{self.pattern!r}, {self.in_workspace!r})")
+
+
+# Characters that can join several commands on one line (lex_command separators and groups)
+_COMPOUND_RE = re.compile(r"[;|&()\n]")
+
+
+class PolicyEngine:
+    """
+    PreToolUse decision engine, built once from a permissions dict
+    evaluate() never prints or exits, so one process can evaluate any number
+    of payloads (CLI, decision daemon, batch mode, benchmarks)
+    """
+
+    def __init__(self, permissions):
+        self.policy = policy_from_state(compile_policy(permissions))
+        self._tables = {}
+        self._root_index = None
+        self._override_trie = None
+
+    @classmethod
+    def from_policy(cls, policy):
+        """Wrap an already compiled policy (load_policy / policy_from_state output)"""
+        engine = cls.__new__(cls)
+        engine.policy = policy
+        engine._tables = {}
+        engine._root_index = None
+        engine._override_trie = None
+        return engine
+
+    @classmethod
+    def from_file(cls, permissions_file):
+        """Load permissions.json through the compiled policy sidecar"""
+        return cls.from_policy(load_policy(permissions_file))
+
+    def mode_table(self, mode):
+        """Decision table of a mode, compiled on first use"""
+        table = self._tables.get(id(mode))
+        if table is None:
+            table = self._tables[id(mode)] = compile_mode_table(mode)
+        return table
+
+    def root_index(self):
+        """RootIndex of workspace.additionalRoots, built on first use"""
+        if self._root_index is None:
+            workspace = self.policy.get("workspace")
+            roots = workspace.get("additionalRoots", []) if isinstance(workspace, dict) else []
+            project_dir = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+            self._root_index = build_root_index(roots if isinstance(roots, list) else [], project_dir)
+        return self._root_index
+
+    def forget_paths(self):
+        """Drop the root index and override trie, which hold resolved symlink targets"""
+        self._root_index = None
+        self._override_trie = None
+
+    def workspace_root(self, work_dir):
+        """Repository root to use as the workspace, or None (workspace.useRepositoryRoot off)"""
+        workspace = self.policy.get("workspace")
+        if not isinstance(workspace, dict) or workspace.get("useRepositoryRoot") != 1 or not work_dir:
+            return None
+        try:
+            return repository_root(work_dir)
+        except Exception as e:
+            log_debug(f"Repository root lookup failed: {e}")
+            return None
+
+    def is_outside(self, path, work_dir):
+        """is_path_outside_workspace with the configured additional roots and repository root"""
+        return is_path_outside_workspace(path, work_dir, self.root_index(), self.workspace_root(work_dir))
+
+    def override_trie(self):
+        """PathTrie of directoryOverrides, built on first use"""
+        if self._override_trie is None:
+            project_dir = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+            self._override_trie = build_override_trie(self.policy.get("directoryOverrides", []), project_dir)
+        return self._override_trie
+
+    def override_table(self, mode, override):
+        """Decision table of a mode with a directory override's switches applied"""
+        if not override.switches:
+            return self.mode_table(mode)
+        key = (id(mode), id(override))
+        table = self._tables.get(key)
+        if table is None:
+            table = self._tables[key] = compile_mode_table(dict(mode, **override.switches))
+        return table
+
+    def match_file_rules(self, category, path, work_dir):
+        """
+        Check path against fileRules.<category> (deny, then ask, then allow)
+        The path is matched relative to the workspace, both as written and
+        with symlinks resolved; paths outside it are matched from the root
+        Returns (action, pattern) or None
+        """
+        rules = self.policy.get("fileRules", {}).get(category)
+        if not rules:
+            return None
+        roots = workspace_roots(self.workspace_root(work_dir) or work_dir) if work_dir else ()
+        relative = []
+        normalized = normalize_path(path, work_dir)
+        fold_case = is_drive_path(normalized)
+        for candidate in (normalized, canonical_path(path, work_dir)):
+            for root in roots:
+                if path_within(candidate, root):
+                    candidate = candidate[len(root):]
+                    break
+            candidate = candidate.lstrip("/")
+            if candidate not in relative:
+                relative.append(candidate)
+        for action in FILE_RULE_ACTIONS:
+            matcher = rules.get(action)
+            if matcher is None:
+                continue
+            if fold_case:
+                matcher = matcher.folded()
+            for candidate in relative:
+                pattern = matcher.match(candidate)
+                if pattern is not None:
+                    return action, pattern
+        return None
+
+    def decide(self, category, mode, paths, work_dir):
+        """
+        Look up the mode switch for category and the paths a call touches
+        With directory overrides, each path (or the working directory when
+        there are none) uses its most specific override; any ask wins
+        in_workspace is whether every path is inside the workspace; it is
+        checked even when a switch is the same inside and outside, so it is
+        never reported without being evaluated (the path caches memoize it)
+        Returns (decision, category, in_workspace)
+        """
+        table = self.mode_table(mode)
+        trie = self.override_trie()
+        if not trie:
+            is_in_workspace = True
+            for path in paths:
+                if self.is_outside(path, work_dir):
+                    is_in_workspace = False
+                    break
+            return table[(category, is_in_workspace)], category, is_in_workspace
+
+        result = None
+        all_inside = True
+        for path in paths or ([work_dir] if work_dir else []):
+            override = trie.longest_match(canonical_path(path, work_dir))
+            path_category, path_table = category, table
+            if override is not None:
+                path_category = override.treat_as.get(category, category)
+                path_table = self.override_table(mode, override)
+                log_debug(lambda: f"    Directory override {override.directory!r} for {path}: category {path_category}")
+            is_in_workspace = not self.is_outside(path, work_dir)
+            all_inside = all_inside and is_in_workspace
+            decision = path_table[(path_category, is_in_workspace)]
+            if result is None or (decision == "ask" and result[0] == "allow"):
+                result = (decision, path_category)
+        if result is None:
+            return table[(category, True)], category, True
+        return result[0], result[1], all_inside
+
+    def check_command(self, command, mode, work_dir, parsed=None):
+        """
+        Check permissions for a single command
+        parsed is the command's ShellCommand when the caller already lexed it
+        Returns a Decision ("allow", "ask" or "deny")
+        """
+        log_debug(lambda: f"  {t('hook.log.checkingCommand', command=command)}")
 
-    # Extract command (if Bash)
-    command = ""
-    if tool_name == "Bash":
-        command = hook_data.get("tool_input", {}).get("command", "")
-
-    log_debug(f"Command: {command}")
-
-    # For Bash tools, split combined commands and check each one
-    if tool_name == "Bash" and command:
-        sub_commands = split_command(command)
-        log_debug(t('hook.log.splitCommands', count=len(sub_commands), commands=str(sub_commands)))
-
-        # Check each sub-command
-        for sub_cmd in sub_commands:
-            decision, category = check_single_command(sub_cmd, permissions, mode, work_dir)
-            log_debug(f"  Sub-command '{sub_cmd}' decision: {decision} (category: {category})")
-
-            # If any sub-command is not allow, return that decision for the entire command
-            if decision == "deny":
-                log_debug(t('hook.log.finalDecision', decision=f"deny (because sub-command '{sub_cmd}' was denied)"))
-                output_result("PreToolUse", permissionDecision="deny")
-            elif decision == "ask":
-                log_debug(t('hook.log.finalDecision', decision=f"ask (because sub-command '{sub_cmd}' needs confirmation)"))
-                output_result("PreToolUse", permissionDecision="ask")
-
-        # All sub-commands passed, allow execution
-        log_debug(t('hook.log.finalDecision', decision='allow (all sub-commands passed)'))
-        output_result("PreToolUse", permissionDecision="allow")
-
-    # Non-Bash tool handling logic
-    if tool_name != "Bash":
         # 1. Check globalDeny (highest priority)
         if mode.get("globalDeny") == 1:
-            if check_in_list(tool_name, permissions, "globalDeny", "tools"):
-                log_debug(t('hook.log.decision', decision='globalDeny tool matched = deny'))
-                output_result("PreToolUse", permissionDecision="deny")
+            pattern = find_in_list(command, self.policy, "globalDeny", "commands")
+            if pattern is not None:
+                log_debug(lambda: f"    {t('hook.log.decision', decision='globalDeny command match = deny')}")
+                return Decision("deny", "globalDeny", pattern)
 
         # 2. Check globalAllow
         if mode.get("globalAllow") == 1:
-            if check_in_list(tool_name, permissions, "globalAllow", "tools"):
-                log_debug(t('hook.log.decision', decision='globalAllow tool matched = allow'))
-                output_result("PreToolUse", permissionDecision="allow")
-
-        # 3. Determine tool category
-        command_category = ""
-        if check_in_list(tool_name, permissions, "useMcp", "tools"):
-            command_category = "useMcp"
-        elif check_in_list(tool_name, permissions, "useWeb", "tools"):
-            command_category = "useWeb"
-        elif check_in_list(tool_name, permissions, "risky", "tools"):
-            command_category = "risky"
-        elif check_in_list(tool_name, permissions, "edit", "tools"):
+            pattern = find_in_list(command, self.policy, "globalAllow", "commands")
+            if pattern is not None:
+                log_debug(lambda: f"    {t('hook.log.decision', decision='globalAllow command match = allow')}")
+                return Decision("allow", "globalAllow", pattern)
+
+        # 3. Determine command category
+        command_category = "unknown"
+        pattern = None
+        for category in ("risky", "edit", "read", "useWeb"):
+            pattern = find_in_list(command, self.policy, category, "commands")
+            if pattern is not None:
+                command_category = category
+                break
+
+        if parsed is None:
+            lex_started = time.perf_counter()
+            try:
+                lexed = lex_command(command)
+            except ValueError as e:
+                log_debug(f"    Error parsing command: {e}, ask")
+                return Decision("ask", command_category, pattern, False)
+            if METRICS:
+                add_stage_time(STAGE_LEX, time.perf_counter() - lex_started)
+            parsed = ShellCommand(command, (), [p for c in lexed for p in c.paths],
+                                  [w for c in lexed for w in c.writes])
+
+        # Output redirections make a read command a write
+        if command_category == "read" and parsed.writes:
+            log_debug(lambda: f"    Redirection writes to {parsed.writes}, treated as edit")
             command_category = "edit"
-        elif check_in_list(tool_name, permissions, "read", "tools"):
-            command_category = "read"
-        else:
-            # Uncategorized tool - check allowUnknownTool switch
-            if mode.get("allowUnknownTool") == 1:
-                log_debug(t('hook.log.decision', decision='Uncategorized tool + switch on = allow'))
-                output_result("PreToolUse", permissionDecision="allow")
+
+        # 4. Look up the permission switch for category, directory overrides
+        # and workspace location (paths only matter when the switches differ)
+        paths = parsed.paths
+        if paths:
+            log_debug(lambda: f"    {t('hook.log.extractedPaths', paths=str(paths))}")
+        paths_started = time.perf_counter()
+        decision, command_category, is_in_workspace = self.decide(command_category, mode, paths, work_dir)
+        if METRICS:
+            add_stage_time(STAGE_PATHS, time.perf_counter() - paths_started)
+        log_debug(lambda: f"    Category: {command_category}, In Workspace: {is_in_workspace}, Decision: {decision}")
+        return Decision(decision, command_category, pattern, is_in_workspace)
+
+    def evaluate(self, hook_data):
+        """
+        PreToolUse permission check
+        Returns a Decision, or None for a Bash call without a command
+        """
+        log_debug(lambda: t('hook.log.processing', event='PreToolUse'))
+
+        tool_name = hook_data.get("tool_name", "")
+        cli_permission_mode = hook_data.get("permission_mode", "default")
+        work_dir = hook_data.get("cwd", "")
+
+        log_debug(lambda: f"Tool: {tool_name}")
+        log_debug(lambda: f"CLI Mode: {cli_permission_mode}")
+        log_debug(lambda: f"{t('hook.log.workingDir', dir=work_dir)}")
+
+        # Get current mode configuration
+        mode = self.policy.get("modes", {}).get(cli_permission_mode, {})
+        if not mode:
+            # dontAsk mode (used by sub-agents) - auto approve all
+            if cli_permission_mode == "dontAsk":
+                log_debug(t('hook.log.dontAskModeAutoApprove'))
+                return Decision("allow", "dontAsk")
             else:
-                log_debug(t('hook.log.decision', decision='Uncategorized tool + switch off = ask'))
-                output_result("PreToolUse", permissionDecision="ask")
-
-        # 4. Check if tool operates on files within workspace
-        is_in_workspace = True
-        tool_input = hook_data.get("tool_input", {})
-        file_path = tool_input.get("file_path") or tool_input.get("path") or ""
-        if file_path:
-            if is_path_outside_workspace(file_path, work_dir):
-                is_in_workspace = False
-
-        log_debug(f"Category: {command_category}")
-        log_debug(f"In Workspace: {is_in_workspace}")
-
-        # 5. Query permission switches based on category and workspace location
-        decision = "ask"
-
-        if command_category == "read":
-            if is_in_workspace:
-                if mode.get("read") == 1:
-                    decision = "allow"
-                    log_debug(t('hook.log.decision', decision='read + inside workspace = allow'))
+                log_debug(lambda: t('hook.log.modeNotFound', mode=cli_permission_mode))
+                return Decision("ask")
+
+        # Extract command (if Bash)
+        command = ""
+        if tool_name == "Bash":
+            command = hook_data.get("tool_input", {}).get("command", "")
+
+        log_debug(lambda: f"Command: {command}")
+
+        # For Bash tools, split combined commands and check each one
+        if tool_name == "Bash" and command:
+            # Patterns spanning separators (curl * | sh*, the fork bomb) only
+            # match the whole command line, never a single sub-command
+            compound = _COMPOUND_RE.search(command) is not None
+            full_command = " ".join(command.replace("\\\n", "").split()) if compound else command
+            if compound and mode.get("globalDeny") == 1:
+                pattern = find_in_list(full_command, self.policy, "globalDeny", "commands")
+                if pattern is not None:
+                    log_debug(lambda: t('hook.log.finalDecision', decision=f"deny (command line matched {pattern!r})"))
+                    return Decision("deny", "globalDeny", pattern)
+
+            lex_started = time.perf_counter()
+            try:
+                sub_commands = lex_command(command) or [ShellCommand(command)]
+            except ValueError as e:
+                log_debug(t('hook.log.finalDecision', decision=f"ask ({e})"))
+                return Decision("ask", "unknown", None, False)
+            if METRICS:
+                add_stage_time(STAGE_LEX, time.perf_counter() - lex_started)
+            log_debug(lambda: t('hook.log.splitCommands', count=len(sub_commands), commands=str([c.text for c in sub_commands])))
+
+            if compound and len(sub_commands) > 1:
+                pattern = find_in_list(full_command, self.policy, "risky", "commands")
+                if pattern is not None:
+                    paths = [path for parsed in sub_commands for path in parsed.paths]
+                    decision, category, is_in_workspace = self.decide("risky", mode, paths, work_dir)
+                    if decision != "allow":
+                        log_debug(lambda: t('hook.log.finalDecision', decision=f"{decision} (command line matched {pattern!r})"))
+                        return Decision(decision, category, pattern, is_in_workspace)
+
+            # Check each sub-command
+            result = None
+            for parsed in sub_commands:
+                sub_cmd = parsed.text
+                result = self.check_command(sub_cmd, mode, work_dir, parsed)
+                log_debug(lambda: f"  Sub-command '{sub_cmd}' decision: {result.decision} (category: {result.category})")
+
+                # If any sub-command is not allow, return that decision for the entire command
+                if result.decision == "deny":
+                    log_debug(lambda: t('hook.log.finalDecision', decision=f"deny (because sub-command '{sub_cmd}' was denied)"))
+                    return result
+                elif result.decision == "ask":
+                    log_debug(lambda: t('hook.log.finalDecision', decision=f"ask (because sub-command '{sub_cmd}' needs confirmation)"))
+                    return result
+
+            # All sub-commands passed, allow execution
+            log_debug(lambda: t('hook.log.finalDecision', decision='allow (all sub-commands passed)'))
+            return result
+
+        # Non-Bash tool handling logic
+        if tool_name != "Bash":
+            # 1. Check globalDeny (highest priority)
+            if mode.get("globalDeny") == 1:
+                pattern = find_in_list(tool_name, self.policy, "globalDeny", "tools")
+                if pattern is not None:
+                    log_debug(lambda: t('hook.log.decision', decision='globalDeny tool matched = deny'))
+                    return Decision("deny", "globalDeny", pattern)
+
+            # 2. Check globalAllow
+            if mode.get("globalAllow") == 1:
+                pattern = find_in_list(tool_name, self.policy, "globalAllow", "tools")
+                if pattern is not None:
+                    log_debug(lambda: t('hook.log.decision', decision='globalAllow tool matched = allow'))
+                    return Decision("allow", "globalAllow", pattern)
+
+            # 3. Determine tool category
+            pattern = None
+            switch = "unknownTool"  # Uncategorized tool - allowUnknownTool switch
+            for category in ("useMcp", "useWeb", "risky", "edit", "read"):
+                pattern = find_in_list(tool_name, self.policy, category, "tools")
+                if pattern is not None:
+                    command_category = switch = category
+                    break
             else:
-                if mode.get("readAllFiles") == 1:
-                    decision = "allow"
-                    log_debug(t('hook.log.decision', decision='read + outside workspace = allow'))
-                else:
-                    log_debug(t('hook.log.decision', decision='read + outside workspace + switch off = ask'))
+                command_category = "unknown"
+
+            tool_input = hook_data.get("tool_input", {})
+            file_path = tool_input.get("file_path") or tool_input.get("path") or ""
+
+            # 4. File rules for the file the tool operates on
+            paths_started = time.perf_counter()
+            if file_path:
+                rule = self.match_file_rules(command_category, file_path, work_dir)
+                if rule is not None:
+                    if METRICS:
+                        add_stage_time(STAGE_PATHS, time.perf_counter() - paths_started)
+                    log_debug(lambda: t('hook.log.decision', decision=f"fileRules {rule[1]} matched = {rule[0]}"))
+                    return Decision(rule[0], command_category, rule[1])
+
+            # 5. Look up the permission switch for category, directory overrides
+            # and the location of the file the tool operates on
+            decision, switch, is_in_workspace = self.decide(switch, mode, [file_path] if file_path else [], work_dir)
+            if METRICS:
+                add_stage_time(STAGE_PATHS, time.perf_counter() - paths_started)
+            if switch != "unknownTool":
+                command_category = switch
+            log_debug(lambda: f"Category: {command_category}, In Workspace: {is_in_workspace}")
+            log_debug(lambda: t('hook.log.finalDecision', decision=decision))
+            return Decision(decision, command_category, pattern, is_in_workspace)
 
-        elif command_category == "edit":
-            if is_in_workspace:
-                if mode.get("edit") == 1:
-                    decision = "allow"
-                    log_debug(t('hook.log.decision', decision='edit + inside workspace = allow'))
-            else:
-                if mode.get("editAllFiles") == 1:
-                    decision = "allow"
-                    log_debug(t('hook.log.decision', decision='edit + outside workspace = allow'))
-                else:
-                    log_debug(t('hook.log.decision', decision='edit + outside workspace + switch off = ask'))
 
-        elif command_category == "risky":
-            if is_in_workspace:
-                if mode.get("risky") == 1:
-                    decision = "allow"
-                    log_debug(t('hook.log.decision', decision='risky + inside workspace = allow'))
-            else:
-                if mode.get("riskyAllFiles") == 1:
-                    decision = "allow"
-                    log_debug(t('hook.log.decision', decision='risky + outside workspace = allow'))
-                else:
-                    log_debug(t('hook.log.decision', decision='risky + outside workspace + switch off = ask'))
+def check_single_command(command, permissions, mode, work_dir):
+    """
+    Check permissions for a single command
+    Returns: ("allow", category) or ("ask", category) or ("deny", category)
+    """
+    result = PolicyEngine.from_policy(permissions).check_command(command, mode, work_dir)
+    return (result.decision, result.category)
 
-        elif command_category == "useWeb":
-            if mode.get("useWeb") == 1:
-                decision = "allow"
-                log_debug(t('hook.log.decision', decision='useWeb = allow'))
-            else:
-                log_debug(t('hook.log.decision', decision='useWeb + switch off = ask'))
 
-        elif command_category == "useMcp":
-            if mode.get("useMcp") == 1:
-                decision = "allow"
-                log_debug(t('hook.log.decision', decision='useMcp = allow'))
-            else:
-                log_debug(t('hook.log.decision', decision='useMcp + switch off = ask'))
+def decide_pre_tool_use(hook_data, permissions):
+    """
+    PreToolUse permission check
+    Returns the permissionDecision ("allow", "ask" or "deny"), or None for a
+    Bash call without a command
+    """
+    result = PolicyEngine.from_policy(permissions).evaluate(hook_data)
+    return result.decision if result is not None else None
+
+
+def timed_evaluate(engine, hook_data):
+    """engine.evaluate() with the classify stage recorded when metrics are on"""
+    if not METRICS:
+        return engine.evaluate(hook_data)
+    evaluate_started = time.perf_counter()
+    result = engine.evaluate(hook_data)
+    # Classification is whatever evaluate() spent outside lexing and path checks
+    add_stage_time(STAGE_CLASSIFY, time.perf_counter() - evaluate_started
+                   - stage_time(STAGE_LEX) - stage_time(STAGE_PATHS))
+    return result
+
+
+def handle_pre_tool_use_hook(hook_data, engine, cache=None, started=None):
+    """Handle PreToolUse event - Permission check"""
+    result = timed_evaluate(engine, hook_data)
+    if result is None:
+        # Bash call without a command: no opinion, leave it to Claude Code
+        sys.exit(0)
+    record_decision(hook_data, result.decision, result.category, result.pattern, started=started)
+    if cache is not None:
+        cache.store(hook_data, result.decision, filesystem_observations(), result.category, result.pattern)
+    output_result("PreToolUse", permissionDecision=result.decision)
+
+
+# Decision cache: an on-disk LRU of PreToolUse decisions next to permissions.json
+# Entries are bound to the permissions.json content hash and to the hook script
+# (mtime and size), so editing the policy or installing a new hook invalidates
+# them, and to the file system lookups the decision depended on (symlink
+# targets, repository roots); a hit skips loading the compiled policy
+DECISION_CACHE_NAME = "decisions.cache"
+# New entries are appended to decisions.cache.journal; the cache file is only
+# rewritten when it is invalid or the journal holds DECISION_JOURNAL_LIMIT records
+DECISION_JOURNAL_SUFFIX = ".journal"
+DECISION_JOURNAL_LIMIT = 64
+# Advisory lock held by journal appends and by the rewrite that folds the journal in
+DECISION_LOCK_SUFFIX = ".lock"
+# Bump when the cache layout or the key changes
+DECISION_CACHE_FORMAT = 11
+# Maximum number of cached decisions
+DECISION_CACHE_SIZE = 512
+
+
+def decision_cache_key(hook_data):
+    """
+    Cache key of a PreToolUse payload: (mode, cwd, tool, input), or None if
+    the payload is not cacheable
+    The input is exactly what PolicyEngine.evaluate() reads: the command for
+    Bash, the file_path/path argument for other tools
+    """
+    tool_name = hook_data.get("tool_name", "")
+    tool_input = hook_data.get("tool_input", {})
+    if not isinstance(tool_name, str) or not isinstance(tool_input, dict):
+        return None
+    if tool_name == "Bash":
+        value = tool_input.get("command", "")
+        if not value:
+            return None
+    else:
+        value = tool_input.get("file_path") or tool_input.get("path") or ""
+    key = (hook_data.get("permission_mode", "default"), hook_data.get("cwd", ""), tool_name, value)
+    return key if all(isinstance(part, str) for part in key) else None
+
+
+class DecisionCache:
+    """
+    Bounded LRU of decisions shared by all hook invocations of one .claude directory
+    store() appends one record to the journal (a single O_APPEND write); the
+    cache file is only rewritten, atomically (temp file + os.replace), when it
+    is invalid or the journal is full, and the journal is then removed, so
+    concurrent hooks always read a complete cache. Appends and the rewrite take
+    the same lock, and the rewrite first merges whatever other hooks stored
+    since this one loaded, so no record is lost; records carry the policy
+    digest and hook script identity they were decided with, so a stale record
+    is never replayed. Hits never write the cache:
+    their recency is kept in memory and saved with the next store(), and
+    lookups are only counted in memory, folded into hook-metrics.bin by
+    flush_metrics() when logging.metrics is on.
+    """
+
+    def __init__(self, cache_file, permissions_file, capacity=DECISION_CACHE_SIZE):
+        self.cache_file = cache_file
+        self.journal_file = cache_file + DECISION_JOURNAL_SUFFIX
+        self.lock_file = cache_file + DECISION_LOCK_SUFFIX
+        self.permissions_file = permissions_file
+        self.capacity = capacity
+        # key -> (decision, file system observations, category, pattern), least recently used first
+        self.entries = {}
+        self.stat_key = None
+        self.script_key = None
+        self.digest = None
+        # log_settings() of the policy the entries were decided with
+        self.log_settings = None
+        # Journal records on disk, None while the cache file is missing or invalid
+        self.journal_records = None
+        # Keys hit since the last store(), saved with it to keep their recency
+        self.touched = []
+        # Whether a cache file was found, valid or not (clear() has something to remove)
+        self.on_disk = False
+        self._load()
+
+    def _load(self):
+        """
+        Read the cache file and replay the journal, dropping the entries if
+        permissions.json or the hook script changed
+        """
+        import marshal
+        st = os.stat(self.permissions_file)
+        self.stat_key = (st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+        script = os.stat(os.path.abspath(__file__))
+        self.script_key = (script.st_mtime_ns, script.st_size)
+        try:
+            with open(self.cache_file, "rb") as f:
+                self.on_disk = True
+                written_ns = os.fstat(f.fileno()).st_mtime_ns
+                cache_format, stat_key, script_key, digest, log_settings, entries = marshal.loads(f.read())
+        except Exception:
+            # Missing, truncated or written by another Python version
+            return
+        if cache_format != DECISION_CACHE_FORMAT:
+            return
+        if script_key != self.script_key:
+            log_debug("Decision cache invalidated: hook script changed")
+            return
+
+        if stat_key != self.stat_key or racily_clean(st.st_mtime_ns, written_ns):
+            # Touched, edited, or modified too close to the cache write: the content hash decides
+            with open(self.permissions_file, "rb") as f:
+                self.digest = _policy_digest(f.read())
+            if self.digest != digest:
+                log_debug("Decision cache invalidated: permissions.json changed")
+                return
+        self.digest = digest
+        self.log_settings = log_settings
+        self.entries = entries
+        self._replay()
+
+    def _replay(self):
+        """Apply the journal records decided with the same policy and hook script"""
+        import marshal
+        self.journal_records = 0
+        generation = (self.script_key, self.digest)
+        try:
+            with open(self.journal_file, "rb") as f:
+                while True:
+                    try:
+                        record_generation, touched, key, entry = marshal.load(f)
+                    except Exception:
+                        # End of the journal, or a record still being appended
+                        break
+                    self.journal_records += 1
+                    if record_generation == generation:
+                        self._apply(touched, key, entry)
+        except OSError:
+            pass
+
+    def _apply(self, touched, key, entry):
+        """Mark the touched keys recently used, then add the entry, evicting the least recently used"""
+        for hit in touched:
+            if hit in self.entries:
+                self.entries[hit] = self.entries.pop(hit)
+        self.entries.pop(key, None)
+        self.entries[key] = entry
+        while len(self.entries) > self.capacity:
+            del self.entries[next(iter(self.entries))]
+
+    def lookup(self, hook_data):
+        """
+        Return the cached Decision for a payload and mark it recently used, or None
+        An entry whose file system lookups now give other results is dropped
+        """
+        key = decision_cache_key(hook_data)
+        if key is None:
+            return None
+        entry = self.entries.pop(key, None)
+        if entry is not None and not filesystem_unchanged(entry[1]):
+            log_debug("Decision cache entry dropped: symlinks or repository roots changed")
+            entry = None
+        if entry is None:
+            count_cache_lookup(CACHE_MISS)
+            return None
+        self.entries[key] = entry
+        self.touched.append(key)
+        count_cache_lookup(CACHE_HIT)
+        log_debug(lambda: f"Decision cache hit: {entry[0]}")
+        return Decision(entry[0], entry[2], entry[3])
+
+    def store(self, hook_data, decision, observations=(), category=None, pattern=None):
+        """
+        Remember the decision for a payload together with the file system
+        lookups it depended on and the category and pattern that decided it
+        (for the log and journal of later hits), evicting the least recently
+        used entries
+        """
+        key = decision_cache_key(hook_data)
+        if key is None:
+            return
+        entry = (decision, observations, category, pattern)
+        self._apply(self.touched, key, entry)
+        if self.journal_records is None or self.journal_records >= DECISION_JOURNAL_LIMIT:
+            self.save(key, entry)
+        else:
+            self.append(key, entry)
+        self.touched = []
+
+    def _lock(self):
+        """Open and lock the cache lock file; returns its descriptor (close it to unlock) or None"""
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        if lock_file(fd):
+            return fd
+        os.close(fd)
+        return None
+
+    def append(self, key, entry):
+        """Append one entry to the journal (a single O_APPEND write, under the lock); failures are ignored"""
+        import marshal
+        try:
+            record = marshal.dumps(((self.script_key, self.digest), self.touched, key, entry))
+            lock_fd = self._lock()
+            if lock_fd is None:
+                return
+            try:
+                fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, record)
+                finally:
+                    os.close(fd)
+            finally:
+                os.close(lock_fd)
+            self.journal_records += 1
+        except Exception as e:
+            log_debug(f"Failed to append to the decision cache journal: {e}")
+
+    def stats(self):
+        """Counters for --cache-stats; hits and misses are only counted while logging.metrics is on"""
+        try:
+            with open(METRICS_FILE, "rb") as f:
+                data = f.read()
+            if len(data) != METRICS_SIZE or data[:8] != METRICS_MAGIC:
+                raise ValueError(f"{METRICS_FILE} has an unknown layout")
+            counters = memoryview(data).cast("Q")
+            hits, misses = counters[CACHE_COUNTERS + CACHE_HIT], counters[CACHE_COUNTERS + CACHE_MISS]
+        except (OSError, ValueError):
+            hits = misses = 0
+        return {
+            "entries": len(self.entries),
+            "capacity": self.capacity,
+            "hits": hits,
+            "misses": misses,
+            "hitRate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+
+    def clear(self):
+        """Remove the cache file and journal (decisionCache.enabled off); failures are ignored"""
+        for path in (self.cache_file, self.journal_file):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.on_disk = False
+        self.entries = {}
+        self.journal_records = None
+
+    def save(self, key=None, entry=None):
+        """
+        Write the cache atomically and remove the journal it includes; failures are ignored
+        Under the lock, the cache file and journal are read again: when they hold entries
+        of the same policy and hook script (other hooks stored or rewrote meanwhile), they
+        replace the entries loaded earlier and this hook's entry and hits are applied on top
+        """
+        import marshal
+        if self.digest is None:
+            with open(self.permissions_file, "rb") as f:
+                self.digest = _policy_digest(f.read())
+        temp_file = f"{self.cache_file}.{os.getpid()}.{get_ident()}.tmp"
+        try:
+            lock_fd = self._lock()
+            if lock_fd is None:
+                return
+            try:
+                current = DecisionCache(self.cache_file, self.permissions_file, self.capacity)
+                if current.journal_records is not None \
+                        and (current.script_key, current.digest) == (self.script_key, self.digest):
+                    self.entries = current.entries
+                    if key is not None:
+                        self._apply(self.touched, key, entry)
+                data = marshal.dumps((DECISION_CACHE_FORMAT, self.stat_key, self.script_key, self.digest,
+                                      self.log_settings, self.entries))
+                with open(temp_file, "wb") as f:
+                    f.write(data)
+                os.replace(temp_file, self.cache_file)
+                try:
+                    os.remove(self.journal_file)
+                except OSError:
+                    pass
+            finally:
+                os.close(lock_fd)
+            self.journal_records = 0
+        except Exception as e:
+            log_debug(f"Failed to write decision cache: {e}")
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+
+
+def print_cache_stats():
+    """Print the decision cache counters as JSON (--cache-stats)"""
+    permissions_file = get_permissions_file()
+    if not os.path.exists(permissions_file):
+        print(t('hook.log.configNotFound', path=permissions_file))
+        return
+    claude_dir = os.path.dirname(SCRIPT_DIR)
+    cache = DecisionCache(os.path.join(claude_dir, DECISION_CACHE_NAME), permissions_file)
+    print(json.dumps(cache.stats(), indent=2))
 
-        log_debug(t('hook.log.finalDecision', decision=decision))
-        output_result("PreToolUse", permissionDecision=decision)
 
+# Decision daemon (optional): a long-lived process started with --serve keeps
+# the compiled policy in memory and answers PreToolUse payloads over a per-user
+# Unix domain socket. The installed launcher (hooks/hook-launcher.py, installed
+# as unified-hook.py) forwards stdin to it before this module is even imported
+# and only imports it to evaluate in-process when there is no daemon; the
+# socket path and timeout there must match the ones here.
+DAEMON_TIMEOUT = 2.0
+DAEMON_MAX_PAYLOAD = 16 * 1024 * 1024
 
-def main():
-    """Main function - Dispatch handling based on event type"""
+
+def get_permissions_file():
+    """permissions.json in the .claude directory containing this hook"""
+    return os.path.join(os.path.dirname(SCRIPT_DIR), "permissions.json")
+
+
+def daemon_socket_path():
+    """Socket path of the daemon serving this hook directory (None where unsupported)"""
+    if not hasattr(os, "getuid"):
+        return None
+    import zlib
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    socket_dir = os.path.join(base, f"cc-permission-{os.getuid()}")
+    return os.path.join(socket_dir, f"hook-{zlib.crc32(SCRIPT_DIR.encode('utf-8')):08x}.sock")
+
+
+def _is_private_dir(path):
+    """Check that path is a real directory owned by the current user with no group/other access"""
+    import stat
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and not (st.st_mode & 0o077)
+
+
+def query_daemon(raw_input, socket_path=None):
+    """
+    Forward a raw hook payload to the decision daemon
+    Returns the reply bytes, or None when there is no daemon or it declined
+    (the caller then evaluates in-process)
+    """
+    socket_path = socket_path or daemon_socket_path()
+    if socket_path is None or not os.path.exists(socket_path):
+        return None
+    if not _is_private_dir(os.path.dirname(socket_path)):
+        return None
+
+    # The C module: importing socket (selectors, enum) costs more than the round trip
+    import _socket
+    chunks = []
+    try:
+        client = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        try:
+            client.settimeout(DAEMON_TIMEOUT)
+            client.connect(socket_path)
+            client.sendall(raw_input)
+            client.shutdown(_socket.SHUT_WR)
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            client.close()
+    except OSError:
+        return None
+    return b"".join(chunks) or None
+
+
+class PolicySession:
+    """
+    Policy and bookkeeping for long-lived evaluation (daemon and batch modes)
+    Shared by the daemon's request threads
+    """
+
+    def __init__(self, permissions_file, label, record_payloads=False):
+        import threading
+        self.permissions_file = permissions_file
+        self.label = label
+        # Record answered payloads (logging.record), which never reach the in-process path
+        self.record_payloads = record_payloads
+        self.lock = threading.Lock()
+        self.engine = None
+        self.policy_key = None
+        self.policy_digest = None
+        self.verified_ns = 0
+        self.script_mtime = os.stat(os.path.abspath(__file__)).st_mtime_ns
+        self.last_request = time.monotonic()
+
+    def get_engine(self):
+        """
+        Return the PolicyEngine, rebuilding it when permissions.json changes
+        Equal mtime, ctime and size only count while permissions.json is not
+        racily clean (modified within the timestamp granularity of the last
+        check); otherwise its content hash decides, as for the sidecar
+        """
+        st = os.stat(self.permissions_file)
+        key = (st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+        with self.lock:
+            if key == self.policy_key and not racily_clean(st.st_mtime_ns, self.verified_ns):
+                return self.engine
+            verified_ns = time.time_ns()
+            with open(self.permissions_file, "rb") as f:
+                digest = _policy_digest(f.read())
+            if digest != self.policy_digest:
+                self.engine = PolicyEngine.from_file(self.permissions_file)
+                self.policy_digest = digest
+                configure_logging(self.engine.policy.get("logging"))
+            self.policy_key = key
+            self.verified_ns = verified_ns
+            return self.engine
+
+    def script_changed(self):
+        """True once the hook script has been reinstalled or edited"""
+        try:
+            return os.stat(os.path.abspath(__file__)).st_mtime_ns != self.script_mtime
+        except OSError:
+            return True
+
+    def evaluate(self, data):
+        """
+        Evaluate one raw payload
+        Returns the reply bytes; b"" means there is no PreToolUse decision
+        (other events, invalid JSON, unreadable config), which tells a daemon
+        client to evaluate in-process
+        """
+        self.last_request = time.monotonic()
+        try:
+            return self._evaluate(data)
+        finally:
+            flush_metrics()
+            flush_log()
+
+    def _evaluate(self, data):
+        """evaluate() without the metrics and log flush"""
+        started = time.perf_counter()
+        try:
+            hook_data = json.loads(data.decode("utf-8", errors="replace"))
+        except ValueError:
+            return b""
+        if not isinstance(hook_data, dict) or hook_data.get("hook_event_name") != "PreToolUse":
+            return b""
+
+        try:
+            engine = self.get_engine()
+        except Exception as e:
+            configure_logging(None)
+            log_debug(t('hook.log.readConfigFailed', error=str(e)))
+            return b""
+        if METRICS:
+            start_metrics(hook_data, started)
+            add_stage_time(STAGE_CONFIG, time.perf_counter() - started)
+        # Symlinks may have been retargeted since the last request
+        clear_path_caches()
+        engine.forget_paths()
+
+        log_block_start(lambda: f"\n=== {time.strftime('%Y-%m-%d %H:%M:%S')} ({self.label}) ===")
+        log_debug(lambda: f"Received JSON: {data[:200].decode('utf-8', errors='replace')}...")
+        decision = timed_evaluate(engine, hook_data)
+        if decision is None:
+            return b""
+        if RECORD == 1 and self.record_payloads:
+            record_payload(hook_data)
+        record_decision(hook_data, decision.decision, decision.category, decision.pattern, self.label, started)
+        output_started = time.perf_counter()
+        result = build_result("PreToolUse", permissionDecision=decision.decision)
+        reply = (json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8")
+        add_stage_time(STAGE_OUTPUT, time.perf_counter() - output_started)
+        return reply
+
+
+def serve_daemon(idle_timeout=0):
+    """
+    Run the decision daemon in the foreground (--serve [idle_seconds])
+    Exits after idle_seconds without requests (0 = never), on SIGTERM/Ctrl+C,
+    or when the hook script is replaced (clients fall back meanwhile)
+    """
+    import signal
+    import socket
+    import socketserver
+    import threading
+
+    socket_path = daemon_socket_path()
+    if socket_path is None or not hasattr(socket, "AF_UNIX"):
+        print("Decision daemon requires Unix domain sockets, not available on this platform")
+        sys.exit(1)
+
+    socket_dir = os.path.dirname(socket_path)
+    os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    if not _is_private_dir(socket_dir):
+        print(f"Refusing to use {socket_dir}: it must be owned by the current user with mode 0700")
+        sys.exit(1)
+
+    if os.path.exists(socket_path):
+        # Never take over a live daemon; remove a socket left behind by a crash
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(socket_path)
+            print(f"Decision daemon already running: {socket_path}")
+            sys.exit(1)
+        except OSError:
+            os.remove(socket_path)
+
+    state = PolicySession(get_permissions_file(), "daemon", record_payloads=True)
+    try:
+        state.get_engine()  # applies the logging settings before the first request
+    except Exception:
+        configure_logging(None)
+
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            data = self.rfile.read(DAEMON_MAX_PAYLOAD)
+            reply = state.evaluate(data)
+            if reply:
+                self.wfile.write(reply)
+            if state.script_changed():
+                log_debug("Hook script changed, stopping decision daemon")
+                flush_log()
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    class DecisionServer(socketserver.ThreadingUnixStreamServer):
+        # Hooks of parallel tool calls connect at once; the default backlog of 5
+        # refuses the rest, which then fall back to a cold evaluation
+        request_queue_size = 128
+        daemon_threads = True
+
+    server = DecisionServer(socket_path, RequestHandler)
+
+    def watch_idle():
+        while True:
+            threading.Event().wait(min(idle_timeout, 5.0))
+            if time.monotonic() - state.last_request > idle_timeout:
+                log_debug("Decision daemon idle timeout reached")
+                flush_log()
+                server.shutdown()
+                return
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    if idle_timeout > 0:
+        threading.Thread(target=watch_idle, daemon=True).start()
+
+    print(f"Decision daemon listening on {socket_path}", flush=True)
+    log_block_start(lambda: f"Decision daemon started (pid {os.getpid()}): {socket_path}")
+    flush_log()
+    try:
+        server.serve_forever(poll_interval=0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.remove(socket_path)
+        except OSError:
+            pass
+        log_debug("Decision daemon stopped")
+        flush_log()
+
+
+def run_batch(input_path=None):
+    """
+    Evaluate a stream of hook payloads, one JSON object per line (--batch [file])
+    Reads stdin when no file is given and writes exactly one JSON line per
+    non-empty input line: the PreToolUse result, or {} where the hook would
+    not print a decision (other events, invalid JSON). Output is flushed per
+    line when reading stdin, so the hook can be driven as a persistent coprocess.
+    """
+    session = PolicySession(get_permissions_file(), "batch")
+    stream = open(input_path, "rb") if input_path else sys.stdin.buffer
+    out = sys.stdout.buffer
+    try:
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                reply = session.evaluate(line)
+            except Exception as e:
+                log_debug(f"Batch evaluation failed: {e}")
+                flush_log()
+                reply = (json.dumps({"error": str(e)}, ensure_ascii=False) + "\n").encode("utf-8")
+            out.write(reply or b"{}\n")
+            if input_path is None:
+                out.flush()
+    finally:
+        out.flush()
+        if input_path:
+            stream.close()
+
+
+# Profiling mode: CC_PERMISSION_HOOK_PROFILE=1 in the environment, or
+# --profile before the usual arguments, runs the invocation under cProfile and
+# tracemalloc and writes the results next to hook-debug.log
+PROFILE_ENV = "CC_PERMISSION_HOOK_PROFILE"
+PROFILE_STACKS = os.path.join(os.path.dirname(DEBUG_LOG), "hook-profile.folded")
+PROFILE_SUMMARY = os.path.join(os.path.dirname(DEBUG_LOG), "hook-profile.txt")
+# Frames kept per allocation traceback, and allocation sites / functions listed in the summary
+PROFILE_TRACE_FRAMES = 16
+PROFILE_TOP = 20
+# Set while profiling: the invocation is evaluated in-process, never by the daemon
+PROFILING = False
+
+
+def profile_frame_name(func):
+    """Flame graph frame name for a cProfile function key (filename, line, name)"""
+    filename, line, name = func
+    if filename == "~":
+        label = name  # Built-in, e.g. <method 'read' of '_io.BufferedReader' objects>
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{line})"
+    return label.replace(";", ",")
+
+
+def collapse_profile(stats):
+    """
+    Collapsed stacks from cProfile stats: {"a;b;c": microseconds of self time}
+    cProfile keeps caller/callee edges, not whole stacks, so the time of a
+    function reached along several paths is split between them in proportion
+    to the cumulative time of each edge; recursive edges are not followed.
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    folded = {}
+
+    def walk(func, names, path, share):
+        _, _, self_time, cumulative, _ = stats[func]
+        names = names + (profile_frame_name(func),)
+        stack = ";".join(names)
+        folded[stack] = folded.get(stack, 0.0) + self_time * share * 1000000
+        for callee, edge_time in callees.get(func, ()):
+            callee_time = stats[callee][3]
+            # Paths worth less than a microsecond are dropped
+            if callee not in path and callee_time > 0 and edge_time * share >= 0.000001:
+                walk(callee, names, path | {callee}, share * edge_time / callee_time)
+
+    for func, (_, _, _, _, callers) in stats.items():
+        # Built-in roots are the profiler's own calls, e.g. Profile.disable()
+        if not callers and func[0] != "~":
+            walk(func, (), {func}, 1.0)
+    return {stack: round(us) for stack, us in folded.items() if round(us) > 0}
+
+
+def write_profile(profiler, elapsed, peak, current, snapshot):
+    """Write hook-profile.folded and hook-profile.txt, each atomically"""
+    import io
+    import pstats
+    stats = pstats.Stats(profiler)
+    folded = collapse_profile(stats.stats)
+    temp_file = f"{PROFILE_STACKS}.{os.getpid()}.tmp"
+    with open(temp_file, "w", encoding="utf-8", newline="\n") as f:
+        for stack in sorted(folded):
+            f.write(f"{stack} {folded[stack]}\n")
+    os.replace(temp_file, PROFILE_STACKS)
+
+    summary = io.StringIO()
+    summary.write(f"=== {time.strftime('%Y-%m-%d %H:%M:%S')} pid {os.getpid()} ===\n")
+    summary.write(f"Wall time: {elapsed * 1000:.3f} ms (profiler overhead included)\n")
+    summary.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n")
+    summary.write(f"Still allocated at exit: {current / 1024:.1f} KiB\n\n")
+    summary.write(f"Top {PROFILE_TOP} allocation sites still held at exit:\n")
+    for entry in snapshot.statistics("lineno")[:PROFILE_TOP]:
+        summary.write(f"  {entry}\n")
+    summary.write("\n")
+    stats.stream = summary
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+    temp_file = f"{PROFILE_SUMMARY}.{os.getpid()}.tmp"
+    with open(temp_file, "w", encoding="utf-8", newline="\n") as f:
+        f.write(summary.getvalue())
+    os.replace(temp_file, PROFILE_SUMMARY)
+
+
+def run_profiled(function):
+    """
+    Run function under cProfile and tracemalloc, then write the profile
+    The hook's own exit (sys.exit from output_result) is passed on once the
+    profile is written; a failure to write it goes to stderr.
+    """
+    global PROFILING
+    import cProfile
+    import tracemalloc
+    PROFILING = True
+    tracemalloc.start(PROFILE_TRACE_FRAMES)
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        profiler.runcall(function)
+    finally:
+        elapsed = time.perf_counter() - started
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        tracemalloc.stop()
+        try:
+            write_profile(profiler, elapsed, peak, current, snapshot)
+        except Exception as e:
+            print(f"Failed to write profile: {e}", file=sys.stderr)
+
+
+def run_invocation(raw_input=None):
+    """Run one invocation, then write its buffered log lines and metrics"""
+    try:
+        dispatch(raw_input)
+    finally:
+        flush_metrics()
+        flush_log()
+
+
+def main(raw_input=None):
+    """
+    Main function - Run one invocation, profiled when asked to
+    raw_input is the payload when the launcher (unified-hook.py) already read
+    stdin and no decision daemon answered it
+    """
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile":
+        del sys.argv[1]
+        run_profiled(run_invocation)
+    elif os.environ.get(PROFILE_ENV) == "1":
+        run_profiled(run_invocation)
+    else:
+        run_invocation(raw_input)
+
+
+def dispatch(raw_input=None):
+    """Dispatch handling based on event type"""
+    started = time.perf_counter()
+    startup = started - MODULE_STARTED
 
     # Handle --locate-log argument
     if len(sys.argv) > 1 and sys.argv[1] == "--locate-log":
         locate_log_file()
         return
 
-    log_debug(f"\n=== {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
+    # Handle --serve argument (decision daemon)
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        serve_daemon(float(sys.argv[2]) if len(sys.argv) > 2 else 0)
+        return
+
+    # Handle --cache-stats argument (decision cache counters)
+    if len(sys.argv) > 1 and sys.argv[1] == "--cache-stats":
+        print_cache_stats()
+        return
+
+    # Handle --compress-logs argument (background compression of rotated log segments)
+    if len(sys.argv) > 1 and sys.argv[1] == "--compress-logs":
+        compress_log_segments()
+        return
+
+    # Handle --metrics argument (OpenMetrics export of the stage histograms)
+    if len(sys.argv) > 1 and sys.argv[1] == "--metrics":
+        export_metrics(sys.argv[2] if len(sys.argv) > 2 else None)
+        return
+
+    # Handle --query argument (decision journal search)
+    if len(sys.argv) > 1 and sys.argv[1] == "--query":
+        run_query(sys.argv[2:])
+        return
+
+    # Handle --batch argument (line-delimited payload stream)
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        run_batch(sys.argv[2] if len(sys.argv) > 2 else None)
+        return
+
+    # Read raw input once: it is either answered by the decision daemon or parsed here.
+    # Under the launcher both already happened before this module was imported
+    stdin_seconds = 0.0
+    if raw_input is None:
+        try:
+            raw_input = sys.stdin.buffer.read()
+            stdin_seconds = time.perf_counter() - started
+        except Exception as e:
+            configure_logging(None)
+            log_block_start(f"\n=== {time.strftime('%Y-%m-%d %H:%M:%S')} ===")
+            log_debug(t('hook.log.readInputFailed', error=str(e)))
+            sys.exit(0)
+
+        reply = query_daemon(raw_input) if not PROFILING else None
+        if reply is not None:
+            sys.stdout.buffer.write(reply)
+            sys.stdout.flush()
+            sys.exit(0)
 
-    # Read JSON input from stdin
+    # Parse JSON input
+    json_error = None
     try:
-        # Read using utf-8 encoding and handle possible encoding errors
-        hook_input = sys.stdin.buffer.read().decode('utf-8', errors='replace')
-        log_debug(f"Received JSON: {hook_input[:200]}...")
+        # Decode using utf-8 encoding and handle possible encoding errors
+        hook_input = raw_input.decode('utf-8', errors='replace')
         hook_data = json.loads(hook_input)
     except json.JSONDecodeError as e:
-        log_debug(t('hook.log.jsonParseFailed', error=str(e)))
+        json_error = e
         # For non-JSON input, try to get event type from environment variable or arguments
         event_type = sys.argv[1] if len(sys.argv) > 1 else "unknown"
         hook_data = {"hook_event_name": event_type}
     except Exception as e:
+        configure_logging(None)
+        log_block_start(f"\n=== {time.strftime('%Y-%m-%d %H:%M:%S')} ===")
         log_debug(t('hook.log.readInputFailed', error=str(e)))
         sys.exit(0)
 
     # Get event type
     hook_event_name = hook_data.get("hook_event_name", "")
-    log_debug(f"Hook Event: {hook_event_name}")
+    config_started = time.perf_counter()
 
     # Read permission configuration
     # Locate the hook script's own directory, then find permissions.json in parent directory
     # This logic works for both global hooks (~/.claude/hooks/) and project hooks (<project>/.claude/hooks/)
-    hook_script_dir = os.path.dirname(os.path.abspath(__file__))
+    hook_script_dir = SCRIPT_DIR
     claude_dir = os.path.dirname(hook_script_dir)  # .claude directory
-    permissions_file = os.path.join(claude_dir, "permissions.json")
-    log_debug(f"Hook script directory: {hook_script_dir}")
-    log_debug(f"Claude config directory: {claude_dir}")
-    log_debug(f"Permission config file path: {permissions_file}")
+    permissions_file = get_permissions_file()
+
+    # The logging settings come from the decision cache when it holds them, so
+    # a cache hit never loads the policy, and from the policy otherwise
+    cache = engine = config_error = None
+    if os.path.exists(permissions_file):
+        if hook_event_name == "PreToolUse":
+            try:
+                cache = DecisionCache(os.path.join(claude_dir, DECISION_CACHE_NAME), permissions_file)
+            except Exception as e:
+                log_debug(f"Decision cache unavailable: {e}")
+        if cache is None or cache.log_settings is None:
+            try:
+                engine = PolicyEngine.from_file(permissions_file)
+            except Exception as e:
+                config_error = e
+        # A valid cache was written with the cache enabled: only a loaded policy can switch it off
+        if cache is not None and engine is not None and engine.policy.get("decisionCache") == 0:
+            if cache.on_disk:
+                cache.clear()
+            cache = None
+    if engine is not None:
+        configure_logging(engine.policy.get("logging"))
+    else:
+        configure_logging(cache.log_settings if cache is not None else None)
+    if METRICS:
+        start_metrics(hook_data, started)
+        add_stage_time(STAGE_STARTUP, startup)
+        add_stage_time(STAGE_STDIN, stdin_seconds)
+    if RECORD == 1 and json_error is None:
+        record_payload(hook_data)
+
+    log_block_start(lambda: f"\n=== {time.strftime('%Y-%m-%d %H:%M:%S')} ===")
+    log_debug(lambda: f"Received JSON: {hook_input[:200]}...")
+    if json_error is not None:
+        log_debug(lambda: t('hook.log.jsonParseFailed', error=str(json_error)))
+    log_debug(lambda: f"Hook Event: {hook_event_name}")
+    log_debug(lambda: f"Hook script directory: {hook_script_dir}")
+    log_debug(lambda: f"Claude config directory: {claude_dir}")
+    log_debug(lambda: f"Permission config file path: {permissions_file}")
 
     if not os.path.exists(permissions_file):
-        log_debug(t('hook.log.configNotFound', path=permissions_file))
+        log_debug(lambda: t('hook.log.configNotFound', path=permissions_file))
         # For notification events, exit directly if no config file
         if hook_event_name in ["Stop", "PermissionRequest"]:
             sys.exit(0)
         # For permission check, return ask
         output_result("PreToolUse", permissionDecision="ask")
 
-    try:
-        with open(permissions_file, "r", encoding="utf-8") as f:
-            permissions = json.load(f)
-    except Exception as e:
-        log_debug(t('hook.log.readConfigFailed', error=str(e)))
+    # Repeated PreToolUse calls are answered from the decision cache
+    if cache is not None:
+        try:
+            decision = cache.lookup(hook_data)
+        except Exception as e:
+            log_debug(f"Decision cache unavailable: {e}")
+            cache = decision = None
+        if decision is not None:
+            if METRICS:
+                add_stage_time(STAGE_CONFIG, time.perf_counter() - config_started)
+            record_decision(hook_data, decision.decision, decision.category, decision.pattern,
+                            source="cached", started=started)
+            output_result("PreToolUse", permissionDecision=decision.decision)
+        if cache is not None:
+            observe_filesystem()
+
+    if engine is None and config_error is None:
+        try:
+            engine = PolicyEngine.from_file(permissions_file)
+        except Exception as e:
+            config_error = e
+    if config_error is not None:
+        log_debug(lambda: t('hook.log.readConfigFailed', error=str(config_error)))
         if hook_event_name in ["Stop", "PermissionRequest"]:
             sys.exit(0)
         output_result("PreToolUse", permissionDecision="ask")
+    if cache is not None:
+        cache.log_settings = engine.policy.get("logging")
+    if METRICS:
+        add_stage_time(STAGE_CONFIG, time.perf_counter() - config_started)
 
     # Dispatch handling based on event type
     if hook_event_name == "PreToolUse":
-        handle_pre_tool_use_hook(hook_data, permissions)
+        handle_pre_tool_use_hook(hook_data, engine, cache, started)
     elif hook_event_name == "Stop":
-        handle_stop_hook(hook_data, permissions)
+        handle_stop_hook(hook_data, engine.policy)
     elif hook_event_name == "PermissionRequest":
-        handle_permission_request_hook(hook_data, permissions)
+        handle_permission_request_hook(hook_data, engine.policy)
     else:
-        log_debug(t('hook.log.unknownEvent', event=hook_event_name))
+        log_debug(lambda: t('hook.log.unknownEvent', event=hook_event_name))
         sys.exit(0)
 
 
@@ -79,6 +79,16 @@ pub fn copy_file(source: String, destination: String) -> Result<(), String> {
         .map_err(|e| e.to_string())
 }
 
+/// Remove a file, returning whether it existed
+#[tauri::command]
+pub fn remove_file(path: String) -> Result<bool, String> {
+    match fs::remove_file(&path) {
+        Ok(()) => Ok(true),
+        Err(e) if e.kind() == std::io::ErrorKind::NotFound => Ok(false),
+        Err(e) => Err(e.to_string()),
+    }
+}
+
 /// Set file permissions (Unix only)
 #[tauri::command]
 pub fn set_executable(path: String) -> Result<(), String> {
@@ -16,6 +16,7 @@ fn main() {
             commands::file_exists,
             commands::create_directory,
             commands::copy_file,
+            commands::remove_file,
             commands::set_executable,
             commands::merge_hooks_to_settings,
             commands::remove_hooks_from_settings,
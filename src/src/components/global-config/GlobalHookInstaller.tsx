@@ -319,6 +319,7 @@ export function GlobalHookInstaller() {
               <ul className="text-sm text-muted-foreground space-y-1">
                 <li>• {displayDir}/permissions.json</li>
                 <li>• {displayDir}/hooks/unified-hook.py</li>
+                <li>• {displayDir}/hooks/unified_hook.py</li>
                 <li>• {displayDir}/{settingsFileName} (hooks section)</li>
               </ul>
             </div>
@@ -401,3 +401,45 @@ export async function generateHookScript(language: Language): Promise<string> {
 
   return scriptContent;
 }
+
+/**
+ * 构建时生成的 release hook 模块（2_Scripts/build_hooks.py --templates）
+ */
+export interface ReleaseHook {
+  content: string;        // 去掉 log_debug / log_block_start 调用的 hook 模块
+  bytecodeName: string;   // __pycache__ 中的字节码文件名（只对构建时的 Python 版本有效）
+  bytecodePath: string;   // 字节码的资源路径
+}
+
+/**
+ * 读取指定语言的 release hook 模块；应用构建前未运行 build_hooks.py（如开发环境）时返回 null
+ */
+export async function generateReleaseHook(language: Language): Promise<ReleaseHook | null> {
+  let manifest: { bytecode?: string; locales?: string[] };
+  try {
+    manifest = JSON.parse(await readTemplateFile('hooks/release/manifest.json'));
+  } catch {
+    return null;
+  }
+  if (!manifest.bytecode || !manifest.locales?.includes(language)) {
+    return null;
+  }
+
+  const bytecodePath = await invoke<string>('get_resource_path', {
+    relativePath: `templates/hooks/release/${language}/__pycache__/${manifest.bytecode}`,
+  });
+  return {
+    content: await readTemplateFile(`hooks/release/${language}/unified_hook.py`),
+    bytecodeName: manifest.bytecode,
+    bytecodePath,
+  };
+}
+
+/**
+ * 读取 hook 启动器脚本（安装为 unified-hook.py）
+ * 启动器只导入同目录的 unified_hook.py（generateReleaseHook 或 generateHookScript 生成的内容），
+ * Python 会从 __pycache__ 加载导入模块的字节码，每次调用不再重新编译整个 hook
+ */
+export async function generateHookLauncher(): Promise<string> {
+  return await readTemplateFile('hooks/hook-launcher.py');
+}
@@ -1,7 +1,7 @@
 import { invoke } from '@tauri-apps/api/core';
 import { join } from '@tauri-apps/api/path';
 import { platform } from '@tauri-apps/plugin-os';
-import { generatePermissionsConfig, generateSettingsConfig, generateHookScript, type Language } from './config-generator';
+import { generatePermissionsConfig, generateSettingsConfig, generateHookScript, generateHookLauncher, generateReleaseHook, type Language, type ReleaseHook } from './config-generator';
 import type { PermissionsConfig } from '@/types';
 import { useConfigStore, useWorkspaceStore } from '@/stores';
 import { getPythonCommand, resetPythonCommandCache, type PythonStatusCallback } from './python-detector';
@@ -46,6 +46,121 @@ function mergeMissingFields<T>(current: T, template: T): T {
   return merged as T;
 }
 
+/**
+ * settings.json 中调用的启动器脚本名，以及它导入的 hook 模块名
+ */
+const HOOK_LAUNCHER_NAME = 'unified-hook.py';
+const HOOK_MODULE_NAME = 'unified_hook.py';
+
+/**
+ * hook 运行时生成的数据文件（不含调试日志），卸载时一并删除
+ */
+const HOOK_DATA_FILES = [
+  'permissions.compiled',
+  'workspace-roots.cache',
+  'decisions.cache',
+  'decisions.cache.journal',
+  'decisions.cache.lock',
+  'decisions.cache.stats',
+];
+const HOOK_DIR_DATA_FILES = [
+  'decisions.jsonl',
+  'decisions.idx',
+  'hook-metrics.bin',
+  'payloads.jsonl',
+  'payloads.key',
+  'hook-profile.folded',
+  'hook-profile.txt',
+];
+
+/**
+ * 删除 hook 生成的数据文件，返回实际删除的文件
+ */
+async function removeHookDataFiles(claudeDir: string): Promise<string[]> {
+  const hooksDir = await join(claudeDir, 'hooks');
+  const paths = [
+    ...await Promise.all(HOOK_DATA_FILES.map((name) => join(claudeDir, name))),
+    ...await Promise.all(HOOK_DIR_DATA_FILES.map((name) => join(hooksDir, name))),
+  ];
+  const removed: string[] = [];
+  for (const path of paths) {
+    if (await invoke<boolean>('remove_file', { path })) {
+      removed.push(path);
+    }
+  }
+  return removed;
+}
+
+/**
+ * 读取 permissions.json 中的日志级别（不存在或读取失败时返回 null）
+ */
+async function readLogLevel(claudeDir: string): Promise<string | null> {
+  try {
+    const content = await readInstalledFile(await join(claudeDir, 'permissions.json'));
+    return content ? JSON.parse(content).logging?.logLevel ?? null : null;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * 生成要安装的 hook 模块
+ * 默认安装构建时去掉了 trace 日志调用的 release 版本（附带预编译字节码）；
+ * logLevel 为 trace 时需要这些日志，应用未附带 release 构建时（开发环境）也没有别的选择，
+ * 这两种情况安装保留全部日志调用的 debug 版本
+ */
+async function generateInstalledHook(
+  claudeDir: string,
+  language: Language
+): Promise<{ content: string; release: ReleaseHook | null }> {
+  if (await readLogLevel(claudeDir) !== 'trace') {
+    const release = await generateReleaseHook(language);
+    if (release) {
+      return { content: release.content, release };
+    }
+  }
+  return { content: await generateHookScript(language), release: null };
+}
+
+/**
+ * 写入 hook 脚本：硬编码翻译后的 hook 模块（release 版本连同字节码）和导入它的启动器
+ */
+async function writeHookScripts(claudeDir: string, language: Language): Promise<void> {
+  const hooksDir = await join(claudeDir, 'hooks');
+  const hook = await generateInstalledHook(claudeDir, language);
+  await invoke('write_config_file', {
+    path: await join(hooksDir, HOOK_MODULE_NAME),
+    content: hook.content,
+  });
+  if (hook.release) {
+    // 字节码带源码哈希校验，复制后依然有效；Python 版本不同时会被忽略
+    await invoke('copy_file', {
+      source: hook.release.bytecodePath,
+      destination: await join(hooksDir, '__pycache__', hook.release.bytecodeName),
+    });
+  }
+
+  const launcherPath = await join(hooksDir, HOOK_LAUNCHER_NAME);
+  await invoke('write_config_file', {
+    path: launcherPath,
+    content: await generateHookLauncher(),
+  });
+
+  // 设置启动器为可执行
+  await invoke('set_executable', { path: launcherPath });
+}
+
+/**
+ * 读取已安装的文件内容（不存在或读取失败时返回 null）
+ */
+async function readInstalledFile(path: string): Promise<string | null> {
+  const result = await invoke<{ success: boolean; content?: string; error?: string }>(
+    'read_config_file',
+    { path }
+  );
+  return result.success && result.content ? result.content : null;
+}
+
 /**
  * 获取当前平台
  */
@@ -142,28 +257,20 @@ export async function installHooks(
       });
     }
 
-    // 5. 生成硬编码的 hook 脚本
-    const hookScriptContent = await generateHookScript(language);
-    const hookDestPath = await join(hooksDir, 'unified-hook.py');
-    await invoke('write_config_file', {
-      path: hookDestPath,
-      content: hookScriptContent,
-    });
-
-    // 6. 设置 hook 脚本为可执行
-    await invoke('set_executable', { path: hookDestPath });
+    // 5. 生成硬编码的 hook 模块和启动器（并设置启动器为可执行）
+    await writeHookScripts(targetDir, language);
 
-    // 7. 检测 Python 命令
+    // 6. 检测 Python 命令
     const pythonCommand = await getPythonCommand(onPythonStatusChange);
 
-    // 8. 获取当前平台并生成 settings 配置
+    // 7. 获取当前平台并生成 settings 配置
     const currentPlatform = await getCurrentPlatform();
     const platformType = currentPlatform === 'macos' ? 'mac' : currentPlatform;
     const isGlobal = await isGlobalDir(targetDir);
     const settingsContent = await generateSettingsConfig(language, targetDir, isGlobal, platformType, pythonCommand);
     const settingsTemplate = JSON.parse(settingsContent);
 
-    // 9. 根据是否为全局目录选择 settings 文件名
+    // 8. 根据是否为全局目录选择 settings 文件名
     const settingsFileName = await getSettingsFileName(targetDir);
     const settingsPath = await join(targetDir, settingsFileName);
     const result = await invoke<InstallResult>('merge_hooks_to_settings', {
@@ -213,27 +320,27 @@ export async function uninstallHooks(claudeDir?: string): Promise<InstallResult>
 
     // 3. 检查 settings 文件是否存在
     const exists = await invoke<boolean>('file_exists', { path: settingsPath });
-    if (!exists) {
-      return {
-        success: true,
-        message: 'No hooks found',
-      };
-    }
 
     // 4. 移除 hooks 配置
-    const hookEvents = ['PreToolUse', 'Stop', 'PermissionRequest'];
-    const result = await invoke<InstallResult>('remove_hooks_from_settings', {
-      settingsPath,
-      hookEvents,
-    });
+    if (exists) {
+      const hookEvents = ['PreToolUse', 'Stop', 'PermissionRequest'];
+      const result = await invoke<InstallResult>('remove_hooks_from_settings', {
+        settingsPath,
+        hookEvents,
+      });
 
-    if (!result.success) {
-      throw new Error(result.error || 'Failed to remove hooks');
+      if (!result.success) {
+        throw new Error(result.error || 'Failed to remove hooks');
+      }
     }
 
+    // 5. 删除 hook 生成的缓存、journal、metrics 等数据文件
+    const removed = await removeHookDataFiles(targetDir);
+    const removedNote = removed.length > 0 ? `; removed ${removed.join(', ')}` : '';
+
     return {
       success: true,
-      message: 'Hooks uninstalled successfully',
+      message: (exists ? 'Hooks uninstalled successfully' : 'No hooks found') + removedNote,
     };
   } catch (error) {
     return {
@@ -281,7 +388,7 @@ const REQUIRED_HOOK_EVENTS = ['PreToolUse', 'Stop', 'PermissionRequest'] as cons
 export async function checkHookStatus(claudeDir?: string): Promise<HookCheckResult> {
   try {
     const targetDir = claudeDir || await getEffectiveClaudeDir();
-    const hookPath = await join(targetDir, 'hooks', 'unified-hook.py');
+    const hookPath = await join(targetDir, 'hooks', HOOK_LAUNCHER_NAME);
     const permissionsPath = await join(targetDir, 'permissions.json');
 
     // 检查脚本和配置文件是否存在
@@ -301,17 +408,15 @@ export async function checkHookStatus(claudeDir?: string): Promise<HookCheckResu
       };
     }
 
-    // 检查脚本内容是否与当前模板不同
+    // 检查启动器和 hook 模块是否与当前模板不同（旧版本安装只有完整脚本，没有模块）
     let scriptModified = false;
     if (scriptExists) {
-      const scriptResult = await invoke<{ success: boolean; content?: string; error?: string }>(
-        'read_config_file',
-        { path: hookPath }
-      );
-      if (scriptResult.success && scriptResult.content) {
+      const launcherContent = await readInstalledFile(hookPath);
+      if (launcherContent) {
+        const moduleContent = await readInstalledFile(await join(targetDir, 'hooks', HOOK_MODULE_NAME));
         const currentLanguage = useConfigStore.getState().config?.language || 'zh_CN';
-        const latestScript = await generateHookScript(currentLanguage as Language);
-        scriptModified = scriptResult.content !== latestScript;
+        const latestHook = await generateInstalledHook(targetDir, currentLanguage as Language);
+        scriptModified = launcherContent !== await generateHookLauncher() || moduleContent !== latestHook.content;
       }
     }
 
@@ -455,7 +560,7 @@ export async function checkHookStatus(claudeDir?: string): Promise<HookCheckResu
 export async function isHooksInstalled(claudeDir?: string): Promise<boolean> {
   try {
     const targetDir = claudeDir || await getEffectiveClaudeDir();
-    const hookPath = await join(targetDir, 'hooks', 'unified-hook.py');
+    const hookPath = await join(targetDir, 'hooks', HOOK_LAUNCHER_NAME);
     const permissionsPath = await join(targetDir, 'permissions.json');
 
     const hookExists = await invoke<boolean>('file_exists', { path: hookPath });
@@ -533,6 +638,37 @@ export async function getInstalledHookLanguage(claudeDir?: string): Promise<Lang
   }
 }
 
+/**
+ * 按当前 logLevel 重新写入已安装的 hook 模块（trace 需要 debug 版本，其他级别使用 release 版本）
+ * 未安装 hook 时不做任何事
+ */
+export async function refreshHookModule(claudeDir?: string): Promise<InstallResult> {
+  try {
+    const targetDir = claudeDir || await getEffectiveClaudeDir();
+    const launcherPath = await join(targetDir, 'hooks', HOOK_LAUNCHER_NAME);
+    if (!await invoke<boolean>('file_exists', { path: launcherPath })) {
+      return {
+        success: true,
+        message: 'No hooks found',
+      };
+    }
+
+    const currentLanguage = useConfigStore.getState().config?.language || 'zh_CN';
+    await writeHookScripts(targetDir, currentLanguage as Language);
+
+    return {
+      success: true,
+      message: 'Hook module updated successfully',
+    };
+  } catch (error) {
+    return {
+      success: false,
+      message: 'Failed to update hook module',
+      error: error instanceof Error ? error.message : String(error),
+    };
+  }
+}
+
 /**
  * 切换已安装的 hook 语言
  */
@@ -544,7 +680,6 @@ export async function switchHookLanguage(
   try {
     // 1. 获取目标目录
     const targetDir = claudeDir || await getEffectiveClaudeDir();
-    const hooksDir = await join(targetDir, 'hooks');
     const permissionsPath = await join(targetDir, 'permissions.json');
 
     // 2. 读取当前的 permissions.json
@@ -588,21 +723,13 @@ export async function switchHookLanguage(
       content: JSON.stringify(currentPermissions, null, 2),
     });
 
-    // 6. 重新生成硬编码的 hook 脚本（使用新语言）
-    const hookScriptContent = await generateHookScript(newLanguage);
-    const hookDestPath = await join(hooksDir, 'unified-hook.py');
-    await invoke('write_config_file', {
-      path: hookDestPath,
-      content: hookScriptContent,
-    });
-
-    // 7. 设置 hook 脚本为可执行
-    await invoke('set_executable', { path: hookDestPath });
+    // 6. 重新生成硬编码的 hook 模块和启动器（使用新语言）
+    await writeHookScripts(targetDir, newLanguage);
 
-    // 8. 检测 Python 命令
+    // 7. 检测 Python 命令
     const pythonCommand = await getPythonCommand(onPythonStatusChange);
 
-    // 9. 根据是否为全局目录选择 settings 文件名
+    // 8. 根据是否为全局目录选择 settings 文件名
     const currentPlatform = await getCurrentPlatform();
     const platformType = currentPlatform === 'macos' ? 'mac' : currentPlatform;
     const isGlobal = await isGlobalDir(targetDir);
@@ -692,19 +819,9 @@ export async function repairScript(
     // 1. 确保目录存在
     await invoke('create_directory', { path: hooksDir });
 
-    // 2. 生成最新脚本
+    // 2. 整体替换为最新的 hook 模块和启动器
     const currentLanguage = useConfigStore.getState().config?.language || 'zh_CN';
-    const hookScriptContent = await generateHookScript(currentLanguage as Language);
-    const hookDestPath = await join(hooksDir, 'unified-hook.py');
-
-    // 3. 整体替换
-    await invoke('write_config_file', {
-      path: hookDestPath,
-      content: hookScriptContent,
-    });
-
-    // 4. 设置可执行
-    await invoke('set_executable', { path: hookDestPath });
+    await writeHookScripts(targetDir, currentLanguage as Language);
 
     return {
       success: true,
@@ -40,6 +40,27 @@ async function loadDefaultConfig(): Promise<PermissionsConfig> {
   throw new Error('Failed to load default configuration');
 }
 
+/**
+ * 管道按子命令拆分后，`git log | head` 中的 `head` 是无参数的独立命令，
+ * 只能匹配裸命令条目。模板已包含这些条目，旧配置只有 `head *` 形式
+ */
+const PIPE_FILTER_COMMANDS = ['head', 'tail', 'wc', 'sort', 'uniq', 'jq', 'less', 'more'];
+
+/**
+ * 迁移旧配置的 read 命令：仍允许 `<cmd> *` 但缺少裸命令 `<cmd>` 时，在其前插入裸命令
+ * 用户删除了 `<cmd> *` 的配置保持不变
+ */
+function migrateReadCommands(commands: string[]): string[] {
+  const migrated = [...commands];
+  for (const command of PIPE_FILTER_COMMANDS) {
+    const index = migrated.indexOf(`${command} *`);
+    if (index !== -1 && !migrated.includes(command)) {
+      migrated.splice(index, 0, command);
+    }
+  }
+  return migrated;
+}
+
 /**
  * 深度合并配置，确保所有字段都有值
  */
@@ -56,7 +77,9 @@ function mergeWithDefaults(loaded: Partial<PermissionsConfig>, defaults: Permiss
     categories: {
       read: {
         tools: loaded.categories?.read?.tools ?? defaults.categories.read.tools,
-        commands: loaded.categories?.read?.commands ?? defaults.categories.read.commands,
+        commands: loaded.categories?.read?.commands
+          ? migrateReadCommands(loaded.categories.read.commands)
+          : defaults.categories.read.commands,
       },
       edit: {
         tools: loaded.categories?.edit?.tools ?? defaults.categories.edit.tools,
@@ -83,6 +106,24 @@ function mergeWithDefaults(loaded: Partial<PermissionsConfig>, defaults: Permiss
         commands: loaded.categories?.globalDeny?.commands ?? defaults.categories.globalDeny.commands,
       },
     },
+    workspace: {
+      additionalRoots: loaded.workspace?.additionalRoots ?? defaults.workspace?.additionalRoots ?? [],
+      useRepositoryRoot: loaded.workspace?.useRepositoryRoot ?? defaults.workspace?.useRepositoryRoot ?? 0,
+    },
+    directoryOverrides: loaded.directoryOverrides ?? defaults.directoryOverrides ?? {},
+    fileRules: loaded.fileRules ?? defaults.fileRules ?? {},
+    decisionCache: {
+      enabled: loaded.decisionCache?.enabled ?? defaults.decisionCache?.enabled ?? 1,
+    },
+    logging: {
+      logLevel: loaded.logging?.logLevel ?? defaults.logging?.logLevel ?? 'decision',
+      allowSampleRate: loaded.logging?.allowSampleRate ?? defaults.logging?.allowSampleRate ?? 1,
+      maxSegments: loaded.logging?.maxSegments ?? defaults.logging?.maxSegments ?? 3,
+      compressSegments: loaded.logging?.compressSegments ?? defaults.logging?.compressSegments ?? 0,
+      journal: loaded.logging?.journal ?? defaults.logging?.journal ?? 0,
+      metrics: loaded.logging?.metrics ?? defaults.logging?.metrics ?? 0,
+      record: loaded.logging?.record ?? defaults.logging?.record ?? 0,
+    },
     notifications: {
       _soundOptions: loaded.notifications?._soundOptions ?? defaults.notifications._soundOptions,
       enabled: loaded.notifications?.enabled ?? defaults.notifications.enabled,
@@ -239,6 +280,8 @@ export const useConfigStore = create<ConfigState>()(
           const exists = await invoke<boolean>('file_exists', { path: permissionsPath });
 
           let config: PermissionsConfig;
+          // 旧配置被迁移时标记为有未保存的更改，保存后 hook 才会读到迁移结果
+          let migrated = false;
 
           if (exists) {
             // 读取用户配置
@@ -252,6 +295,8 @@ export const useConfigStore = create<ConfigState>()(
               const loaded = JSON.parse(result.content);
               const defaults = await loadDefaultConfig();
               config = mergeWithDefaults(loaded, defaults);
+              migrated = Array.isArray(loaded.categories?.read?.commands)
+                && config.categories.read.commands.length !== loaded.categories.read.commands.length;
             } else {
               // 读取失败，使用默认配置
               config = await loadDefaultConfig();
@@ -265,7 +310,7 @@ export const useConfigStore = create<ConfigState>()(
             config,
             originalConfig: JSON.parse(JSON.stringify(config)),
             isLoading: false,
-            hasChanges: false,
+            hasChanges: migrated,
           });
         } catch (error) {
           const defaults = await loadDefaultConfig();
@@ -282,7 +327,7 @@ export const useConfigStore = create<ConfigState>()(
       saveConfig: async () => {
         set({ isSaving: true, error: null });
         try {
-          const { config } = get();
+          const { config, originalConfig } = get();
 
           // 获取有效的 .claude 目录（支持工作目录切换）
           const { getEffectiveClaudeDir } = useWorkspaceStore.getState();
@@ -298,6 +343,14 @@ export const useConfigStore = create<ConfigState>()(
             content: jsonContent,
           });
 
+          // trace 日志需要 debug 版本的 hook 模块，其他级别使用 release 版本：切换时重新写入已安装的模块
+          const isTrace = config?.logging?.logLevel === 'trace';
+          if (isTrace !== (originalConfig?.logging?.logLevel === 'trace')) {
+            // 动态导入，避免与 global-hook-installer 循环依赖
+            const { refreshHookModule } = await import('@/lib/global-hook-installer');
+            await refreshHookModule(claudeDir);
+          }
+
           set({
             originalConfig: JSON.parse(JSON.stringify(config)),
             isSaving: false,
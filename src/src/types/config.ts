@@ -62,6 +62,51 @@ export interface NotificationConfig {
   onPermissionRequest: NotificationItem;
 }
 
+/**
+ * 工作区配置
+ */
+export interface WorkspaceConfig {
+  additionalRoots: string[];
+  useRepositoryRoot?: number;
+}
+
+/**
+ * 目录覆盖配置（键为目录）
+ */
+export interface DirectoryOverride {
+  treatAs?: Record<string, string>;
+  switches?: Record<string, number>;
+}
+
+/**
+ * 文件规则（gitignore 风格模式）
+ */
+export interface FileRuleLists {
+  deny?: string[];
+  ask?: string[];
+  allow?: string[];
+}
+
+/**
+ * 决策缓存配置
+ */
+export interface DecisionCacheConfig {
+  enabled: number;
+}
+
+/**
+ * 日志配置
+ */
+export interface LoggingConfig {
+  logLevel: 'off' | 'decision' | 'trace';
+  allowSampleRate?: number;
+  maxSegments?: number;
+  compressSegments?: number;
+  journal?: number;
+  metrics?: number;
+  record?: number;
+}
+
 /**
  * 权限配置（permissions.json）
  */
@@ -70,6 +115,11 @@ export interface PermissionsConfig {
   _description?: {
     modes: string;
     categories: string;
+    workspace?: string;
+    directoryOverrides?: string;
+    fileRules?: string;
+    decisionCache?: string;
+    logging?: string;
     notifications: string;
   };
   language?: string;
@@ -80,6 +130,11 @@ export interface PermissionsConfig {
     bypassPermissions: ModePermissions;
   };
   categories: PermissionCategories;
+  workspace?: WorkspaceConfig;
+  directoryOverrides?: Record<string, DirectoryOverride>;
+  fileRules?: Record<string, FileRuleLists>;
+  decisionCache?: DecisionCacheConfig;
+  logging?: LoggingConfig;
   notifications: NotificationConfig;
 }
 